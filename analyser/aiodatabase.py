@@ -0,0 +1,45 @@
+"""Asyncio counterparts of the results database functions."""
+
+import database
+import viz.aiodatabase as viz_aiodatabase
+
+
+async def setup_database(db_path=database.DB_ADDRESS):
+    """
+    Async database.setup_database
+
+    Args:
+        db_path (str):      SQLite database path
+
+    Returns:
+        None
+    """
+    await viz_aiodatabase.run(database.setup_database, db_path)
+
+
+async def add_result(db_path=database.DB_ADDRESS, result=None):
+    """
+    Async database.add_result
+
+    Args:
+        db_path (str):              SQLite database path
+        result (result.Result):     Result object
+
+    Returns:
+        None
+    """
+    await viz_aiodatabase.run(database.add_result, db_path=db_path, result=result)
+
+
+async def query_result_by_uuid(db_path=database.DB_ADDRESS, uuid=None):
+    """
+    Async database.query_result_by_uuid
+
+    Args:
+        db_path (str):              SQLite database path
+        uuid (uuid.UUID)            UUID of the result to extract
+
+    Returns:
+        step (step.Step)            Retrieved step
+    """
+    return await viz_aiodatabase.run(database.query_result_by_uuid, db_path=db_path, uuid=uuid)
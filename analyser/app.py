@@ -2,20 +2,18 @@ from dash import dcc, Dash, html, dash_table, Input, Output, State, ctx, MATCH
 import pandas as pd
 import plotly.express as px
 
-from sqlalchemy import create_engine
 import dash_bootstrap_components as dbc
 
 import database
+import viz.database as viz_database
 
 
 app = Dash(__name__, external_stylesheets=[dbc.themes.SOLAR])
 
 
 def load_data():
-    engine = create_engine(database.DB_ADDRESS)
-    df = pd.read_sql_table("results", con=engine)
-    df = df.drop("result", axis=1)
-    df = df.drop("step", axis=1)
+    engine = viz_database.get_engine(database.DB_ADDRESS)
+    df = pd.read_sql(viz_database.select_scalars(database.Result), con=engine)
     return df
 
 
@@ -1,16 +1,41 @@
 """Make a class which is then added to the database."""
 
+import argparse
 import pathlib
+import pickle
+import sys
 
 import sqlalchemy
 import sqlalchemy.ext
 import sqlalchemy.orm
 
+import result as result_module
+import viz.codecs as viz_codecs
+import viz.database as viz_database
+
 
 RDBMS = "sqlite"
 DATABASE = pathlib.Path("analyser.db")
 DB_ADDRESS = f"{RDBMS}:///{DATABASE}"
 
+# Results are stored as plain attribute containers by the json/msgpack codecs
+viz_codecs.register_attrs("result", result_module.Result)
+
+
+class ResultUnpickler(pickle.Unpickler):
+    """
+    Unpickler of legacy result blobs
+
+    Rows written by running result.py directly pickled __main__.Result, which is
+    result.Result once imported as a module.
+    """
+
+    def find_class(self, module, name):
+        if (module, name) == ("__main__", "Result"):
+            return result_module.Result
+        return super().find_class(module, name)
+
+
 # Create base class for declarative models
 BASE = sqlalchemy.orm.declarative_base()
 
@@ -44,8 +69,9 @@ class Result(BASE):
     total_er = sqlalchemy.Column(sqlalchemy.Float)
     energy_conservation = sqlalchemy.Column(sqlalchemy.Float)
 
-    step = sqlalchemy.Column(sqlalchemy.PickleType)    
-    result = sqlalchemy.Column(sqlalchemy.PickleType)
+    # Deferred, so listing queries never read or decode the blobs
+    step = sqlalchemy.orm.deferred(sqlalchemy.Column(viz_database.CodecType()))
+    result = sqlalchemy.orm.deferred(sqlalchemy.Column(viz_database.CodecType()))
 
 
 def setup_database(db_path=DB_ADDRESS):
@@ -58,10 +84,9 @@ def setup_database(db_path=DB_ADDRESS):
     Returns:
         None
     """
-    # Create engine
-    engine = sqlalchemy.create_engine(str(db_path), echo=False)
     # Create tables
-    BASE.metadata.create_all(engine)
+    BASE.metadata.create_all(viz_database.get_engine(db_path))
+    viz_database.set_journal_mode(db_path)
 
 
 def add_result(db_path=DB_ADDRESS, result=None):
@@ -103,14 +128,9 @@ def add_result(db_path=DB_ADDRESS, result=None):
         result = result,
     )
 
-    engine = sqlalchemy.create_engine(db_path, echo=False)
-    session = sqlalchemy.orm.sessionmaker(bind=engine)()
-
-    # Add users to session
-    session.add(obj)
-
-    # Commit changes
-    session.commit()
+    # Add result to session, committed on exit
+    with viz_database.session_scope(db_path) as session:
+        session.add(obj)
 
 
 def query_result_by_uuid(db_path=DB_ADDRESS, uuid=None):
@@ -124,10 +144,39 @@ def query_result_by_uuid(db_path=DB_ADDRESS, uuid=None):
     Returns:
         step (step.Step)            Retrieved step
     """
-
-    engine = sqlalchemy.create_engine(db_path, echo=False)
-    session = sqlalchemy.orm.sessionmaker(bind=engine)()
-    obj = session.get(Result, uuid)
-    step = obj.step if obj is not None else None
+    with viz_database.session_scope(db_path) as session:
+        obj = session.get(Result, uuid)
+        step = obj.step if obj is not None else None
     return step
 
+
+def main(argv=sys.argv[1:]):
+    """
+    Re-encode the stored steps/results of existing databases with another codec
+
+    Args:
+        argv (list):        List of arguments (for pytest compatability)
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Migrate results databases")
+    parser.add_argument("fnames", type=pathlib.Path, nargs="+", help="Database files")
+    parser.add_argument("--codec", choices=list(viz_codecs.CODECS), default=viz_codecs.DEFAULT_CODEC)
+    args = parser.parse_args(argv)
+
+    for fname in args.fnames:
+        if not fname.is_file():
+            raise Exception(f'Database at "{fname}" not found')
+        count = viz_database.recode_blobs(
+            f"{RDBMS}:///{fname}",
+            Result.__table__,
+            ("step", "result"),
+            codec=args.codec,
+            unpickler=ResultUnpickler,
+        )
+        print(f"{fname}: re-encoded {count} results as {args.codec}")
+
+
+if __name__ == "__main__":
+    main()
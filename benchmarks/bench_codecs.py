@@ -0,0 +1,86 @@
+"""
+Benchmark step blob codecs, encode/decode throughput and size
+
+Encodes a workflow with each available codec, reports the best of --repeat
+encode and decode runs in steps/s, the blob size and the size of a database
+holding it as one add_step row.
+
+Usage:
+    python -m benchmarks.bench_codecs --workflows 100 --tasks 100
+"""
+
+import argparse
+import functools
+import pathlib
+import tempfile
+import time
+
+import viz.codecs as codecs
+import viz.database as database
+import viz.steps as steps
+
+
+def best(func, repeat, *args):
+    """
+    Best wallclock of repeated calls, and the last result
+
+    Args:
+        func (callable):        Function
+        repeat (int):           Number of calls
+
+    Returns:
+        seconds (float):        Shortest wallclock
+        result (object):        Return value
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main(argv=None):
+    """
+    Args:
+        argv (list):        List of arguments
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workflows", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    wf = steps.make_tmp_sweep(args.workflows, args.tasks)
+    nsteps = sum(1 for _ in steps.iter_steps(wf))
+    names = [name for name in codecs.CODECS if name != "msgpack" or codecs.msgpack is not None]
+
+    print(f"{'codec':<8} {'encode [steps/s]':>17} {'decode [steps/s]':>17} {'blob [kB]':>10} {'db [kB]':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in names:
+            encode, data = best(codecs.encode, args.repeat, wf, name)
+            # Trusted, the blob was just written
+            decode, _ = best(functools.partial(codecs.decode, allow_pickle=True), args.repeat, data)
+
+            fname = pathlib.Path(tmp) / f"{name}.db"
+            db_path = f"{database.RDBMS}:///{fname}"
+            database.setup_database(db_path)
+            codecs.DEFAULT_CODEC, default = name, codecs.DEFAULT_CODEC
+            try:
+                database.add_step(db_path=db_path, step=wf)
+            finally:
+                codecs.DEFAULT_CODEC = default
+            database.checkpoint(db_path, mode="TRUNCATE")
+            database.dispose_engines(db_path)
+
+            print(
+                f"{name:<8} {nsteps / encode:17.0f} {nsteps / decode:17.0f} "
+                f"{len(data) / 1024:10.0f} {fname.stat().st_size / 1024:10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
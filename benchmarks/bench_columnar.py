@@ -0,0 +1,91 @@
+"""
+Benchmark workflow aggregates on the object tree against the columnar store
+
+Times status counts, completed fraction and CPU hours computed by recursing over
+the viz.steps object tree and by viz.columnar vectorised operations, plus the
+one-off conversion to columns.
+
+Usage:
+    python -m benchmarks.bench_columnar --workflows 100 --tasks 1000
+"""
+
+import argparse
+import collections
+import time
+
+import viz.columnar as columnar
+import viz.steps as steps
+
+
+def tree_aggregates(wf):
+    """
+    Aggregates by recursion over the object tree
+
+    Args:
+        wf (steps.Workflow):    Workflow
+
+    Returns:
+        counts (collections.Counter):   Task status counts
+        completed (float):              Completed fraction
+        cpuhours (float):               CPU hours
+    """
+    counts = collections.Counter()
+    cpuseconds = 0
+
+    def visit(step):
+        nonlocal cpuseconds
+        if isinstance(step, steps.Workflow):
+            for child in step.steps:
+                visit(child)
+            return
+        counts[step.status] += 1
+        if step.scheduler is not None:
+            cpuseconds += step.scheduler.nodes * step.scheduler.ppn * step.scheduler.wallclock
+
+    visit(wf)
+    ntasks = sum(counts.values())
+    return counts, counts["completed"] / ntasks, cpuseconds / 3600
+
+
+def timed(func, *args):
+    """
+    Run func(*args), returning its result and wallclock
+
+    Args:
+        func (callable):        Function
+
+    Returns:
+        result (object):        Return value
+        seconds (float):        Elapsed time
+    """
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    """
+    Args:
+        argv (list):        List of arguments
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workflows", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    wf = steps.make_tmp_sweep(args.workflows, args.tasks)
+    cols, convert = timed(columnar.ColumnarWorkflow.from_workflow, wf)
+    _, tree = timed(tree_aggregates, wf)
+    _, vectorised = timed(cols.summary)
+
+    print(f"{len(cols)} nodes")
+    print(f"tree recursion   {tree:8.3f} s")
+    print(f"columnar         {vectorised:8.3f} s")
+    print(f"  (conversion    {convert:8.3f} s, once)")
+
+
+if __name__ == "__main__":
+    main()
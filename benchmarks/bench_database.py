@@ -0,0 +1,72 @@
+"""
+Benchmark writing a workflow to the database, per-step commits vs bulk ingest
+
+Usage:
+    python -m benchmarks.bench_database --workflows 100 --tasks 100
+"""
+
+import argparse
+import pathlib
+import tempfile
+import time
+
+import viz.database as database
+import viz.steps as steps
+
+
+def time_ingest(func, wf, db_path):
+    """
+    Time a single ingest of `wf` into a fresh database
+
+    Args:
+        func (callable):        Ingest function, called as func(db_path, wf)
+        wf (workflow.Workflow): Workflow to write
+        db_path (str):          Database URL
+
+    Returns:
+        elapsed (float):        Wallclock [s]
+    """
+    database.setup_database(db_path)
+    start = time.perf_counter()
+    func(db_path, wf)
+    elapsed = time.perf_counter() - start
+    database.dispose_engines(db_path)
+    return elapsed
+
+
+def per_step(db_path, wf):
+    """Current path: one add_step (and one commit) per node."""
+    for step in steps.iter_steps(wf):
+        database.add_step(db_path=db_path, step=step)
+
+
+def bulk(db_path, wf):
+    """Bulk path: one transaction, batched executemany."""
+    database.add_workflow(db_path=db_path, wf=wf)
+
+
+def main(argv=None):
+    """
+    Args:
+        argv (list):        List of arguments
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workflows", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    wf = steps.make_tmp_sweep(args.workflows, args.tasks)
+    nrows = sum(1 for _ in steps.iter_steps(wf))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, func in (("add_step", per_step), ("add_workflow", bulk)):
+            db_path = f"{database.RDBMS}:///{pathlib.Path(tmp) / name}.db"
+            elapsed = time_ingest(func, wf, db_path)
+            print(f"{name:<14} {nrows:>8} rows  {elapsed:8.3f} s  {nrows / elapsed:12.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark loading a workflow from SQLite, ORM session vs raw sqlite3
+
+Times query_step_by_uuid of viz.database against viz.fastdb on the same
+database, for a structured (column) workflow and for a lone step blob (in the
+default codec), and reports the best of --repeat runs.
+
+Usage:
+    python -m benchmarks.bench_fastdb --workflows 100 --tasks 100
+"""
+
+import argparse
+import pathlib
+import tempfile
+import time
+
+import viz.database as database
+import viz.fastdb as fastdb
+import viz.steps as steps
+
+
+def best(func, repeat, **kwargs):
+    """
+    Best wallclock of repeated calls
+
+    Args:
+        func (callable):        Function
+        repeat (int):           Number of calls
+
+    Returns:
+        seconds (float):        Shortest wallclock
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(**kwargs)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None):
+    """
+    Args:
+        argv (list):        List of arguments
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workflows", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    wf = steps.make_tmp_sweep(args.workflows, args.tasks)
+    nrows = sum(1 for _ in steps.iter_steps(wf))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for storage in ("columns", "blob"):
+            db_path = f"{database.RDBMS}:///{pathlib.Path(tmp) / storage}.db"
+            database.setup_database(db_path)
+            if storage == "columns":
+                database.add_workflow(db_path=db_path, wf=wf)
+            else:
+                database.add_step(db_path=db_path, step=wf)
+
+            for name, module in (("orm", database), ("sqlite3", fastdb)):
+                seconds = best(module.query_step_by_uuid, args.repeat, db_path=db_path, uuid=wf.uuid)
+                print(
+                    f"{storage:<8} {name:<8} {nrows:>8} steps  {seconds:8.3f} s  {nrows / seconds:12.0f} steps/s"
+                )
+            database.dispose_engines(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark memory per node of the workflow object tree
+
+Compares the slotted viz.steps classes against a replica of the previous
+__dict__-based layout (absolute pathlib.Path, uuid.UUID, datetime and status
+string per node).
+
+Usage:
+    python -m benchmarks.bench_memory --workflows 100 --tasks 1000
+"""
+
+import argparse
+import datetime
+import gc
+import pathlib
+import tracemalloc
+import uuid
+
+import viz.steps as steps
+
+
+class LegacyScheduler:
+    """Scheduler with an instance __dict__, as before slotting."""
+
+    def __init__(self):
+        self.type = "slurm"
+        self.partition = "serial"
+        self.nodes = 1
+        self.ppn = 1
+        self.procs = 1
+        self.wallclock = 1
+        self.wallclock_remaining = None
+        self.wallclock_expired = None
+
+
+class LegacyStep:
+    """Step with an instance __dict__, as before slotting."""
+
+    def __init__(self, name, status, path, type_):
+        self.name = name
+        self.status = status
+        self.path = path
+        self.uuid = uuid.uuid4()
+        self.ctime = datetime.datetime.now()
+        self.mtime = datetime.datetime.now()
+        self.scheduler = None
+        self.parent_flow_type = "serial"
+        self.type = type_
+
+
+def make_legacy_sweep(n_workflows, n_tasks):
+    """
+    Legacy-layout equivalent of steps.make_tmp_sweep
+    """
+    root = pathlib.Path().resolve() / "sweep"
+    wf = LegacyStep("sweep", "unstarted", root, "workflow")
+    wf.steps = []
+    for i in range(n_workflows):
+        sub = LegacyStep(f"model {i}", "unstarted", root / f"model_{i}", "workflow")
+        sub.steps = []
+        for j in range(n_tasks):
+            task = LegacyStep(f"step {j}", "completed", sub.path / f"step_{j}", "task")
+            task.scheduler = LegacyScheduler()
+            sub.steps.append(task)
+        wf.steps.append(sub)
+    return wf
+
+
+def measure(func, *args):
+    """
+    Bytes allocated by func(*args) and still alive afterwards
+
+    Args:
+        func (callable):        Builder
+
+    Returns:
+        obj (object):           Built object
+        nbytes (int):           Allocated bytes
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = func(*args)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, after - before
+
+
+def main(argv=None):
+    """
+    Args:
+        argv (list):        List of arguments
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workflows", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    nnodes = 1 + args.workflows * (1 + args.tasks)
+    for name, func in (("legacy", make_legacy_sweep), ("slotted", steps.make_tmp_sweep)):
+        _, nbytes = measure(func, args.workflows, args.tasks)
+        print(f"{name:<8} {nnodes:>9} nodes  {nbytes / 1e6:9.1f} MB  {nbytes / nnodes:7.0f} B/node")
+
+
+if __name__ == "__main__":
+    main()
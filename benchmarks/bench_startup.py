@@ -0,0 +1,72 @@
+"""
+Benchmark cold start of wf-table/wf-tree for each source
+
+Runs the CLI in a fresh interpreter several times per source on a small
+workflow and reports the median wallclock, less that of a bare interpreter.
+
+Usage:
+    python -m benchmarks.bench_startup --repeat 5
+"""
+
+import argparse
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import viz.database as database
+import viz.steps as steps
+
+
+def wallclock(argv, repeat):
+    """
+    Median wallclock of running a command in a fresh interpreter
+
+    Args:
+        argv (list):            Interpreter arguments
+        repeat (int):           Number of runs
+
+    Returns:
+        seconds (float):        Median wallclock
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *argv], stdout=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(argv=None):
+    """
+    Args:
+        argv (list):        List of arguments
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    wf = steps.make_tmp_workflow()
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = pathlib.Path(tmp)
+        steps.dump_workflow_pickle(wf, tmp / "test.pkl")
+        steps.dump_workflow_json(wf, tmp / "test.json")
+        database.setup_database(f"{database.RDBMS}:///{tmp / 'test.db'}")
+        database.add_workflow(f"{database.RDBMS}:///{tmp / 'test.db'}", wf)
+
+        baseline = wallclock(["-c", "pass"], args.repeat)
+        print(f"interpreter          {baseline * 1000:7.0f} ms")
+        for module in ("viz.table", "viz.tree"):
+            for source, fname in (("pkl", "test.pkl"), ("json", "test.json"), ("db", "test.db")):
+                command = ["-m", module, "--source", source, "--fname", str(tmp / fname), "--uuid", wf.uuid.hex]
+                seconds = wallclock(command, args.repeat) - baseline
+                print(f"{module:<10} {source:<5}     {seconds * 1000:7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark Table row formatting and rendering, in rows/s
+
+Compares the previous per-cell if/elif dispatch on the column name with the
+compiled per-column formatters of viz.table, then times rendering the first
+--render-rows rows with the streaming table to an in-memory console.
+
+Usage:
+    python -m benchmarks.bench_table --workflows 100 --tasks 1000
+"""
+
+import argparse
+import io
+import time
+
+import rich.console
+
+import viz.settings as settings
+import viz.steps as steps
+import viz.table as table
+
+
+def dispatch_row(step, columns):
+    """
+    Format a row by dispatching on the column name per cell, as before
+    """
+    rows = []
+    for column in columns:
+        if column == "status":
+            rows.append(f"[{settings.STATUS2COLOUR[step.status]}]{step.status}")
+        elif column == "uuid":
+            rows.append(step.uuid.hex)
+        elif column in ("ctime", "mtime"):
+            rows.append(getattr(step, column).strftime("%Y-%m-%d %H:%M:%S"))
+        elif column == "scheduler":
+            rows.append(step.scheduler.table if step.scheduler else None)
+        else:
+            rows.append(str(getattr(step, column)))
+    return rows
+
+
+def rate(nrows, func, *args):
+    """
+    Rows per second of func(*args)
+
+    Args:
+        nrows (int):            Number of rows processed
+        func (callable):        Function
+
+    Returns:
+        rate (float):           Rows/s
+    """
+    start = time.perf_counter()
+    func(*args)
+    return nrows / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    """
+    Args:
+        argv (list):        List of arguments
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workflows", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--render-rows", type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    wf = steps.make_tmp_sweep(args.workflows, args.tasks)
+    stps = list(steps.iter_steps(wf))[1:]
+    columns = settings.Settings().columns
+    formatters = table.compile_formatters(columns)
+
+    def dispatch():
+        for step in stps:
+            dispatch_row(step, columns)
+
+    def compiled():
+        for step in stps:
+            [formatter(step) for formatter in formatters]
+
+    def render():
+        view = table.Table(wf, columns=columns, show=False, limit=args.render_rows, stream=True)
+        console = rich.console.Console(file=io.StringIO(), width=200)
+        view.print_stream(console)
+
+    print(f"{len(stps)} rows")
+    print(f"dispatch formatting  {rate(len(stps), dispatch):12,.0f} rows/s")
+    print(f"compiled formatting  {rate(len(stps), compiled):12,.0f} rows/s")
+    nrender = min(args.render_rows, len(stps))
+    print(f"streamed rendering   {rate(nrender, render):12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
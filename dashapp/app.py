@@ -1,15 +1,204 @@
+import datetime
+import uuid
+
 from dash import dcc, Dash, html, dash_table, Input, Output, State, ctx
 import pandas as pd
+import sqlalchemy
 
-from sqlalchemy import create_engine
 import dash_bootstrap_components as dbc
 
+import viz.database as database
+
 
 DATABASE = "/Users/ellis/Documents/scripts/arboretum/orchestrator/orchestrator.db"
+PAGE_SIZE = 50
+TIME_WINDOWS = ["15m", "1h", "6h", "1d", "7d"]
+
+engine = database.get_engine(f"{database.RDBMS}:///{DATABASE}")
+COLUMNS = {column.name: column for column in database.scalar_columns(database.Step)}
+
+FILTER_OPERATORS = [
+    ["ge ", ">="],
+    ["le ", "<="],
+    ["lt ", "<"],
+    ["gt ", ">"],
+    ["ne ", "!="],
+    ["eq ", "="],
+    ["contains "],
+    ["datestartswith "],
+]
+
+
+def split_filter_part(filter_part):
+    """
+    Split one clause of a DataTable filter query into its parts
+
+    Args:
+        filter_part (str):      e.g. '{status} = "failed"'
+
+    Returns:
+        name (str):             Column name
+        operator (str):         Operator, e.g. "eq"
+        value (str, float):     Value to compare against
+    """
+    for operator_type in FILTER_OPERATORS:
+        for operator in operator_type:
+            if operator in filter_part:
+                name_part, value_part = filter_part.split(operator, 1)
+                name = name_part[name_part.find("{") + 1 : name_part.rfind("}")]
+
+                value_part = value_part.strip()
+                if not value_part:
+                    # Still being typed, e.g. '{status} = '
+                    return [None] * 3
+                v0 = value_part[0]
+                if v0 == value_part[-1] and v0 in ("'", '"', "`"):
+                    value = value_part[1:-1].replace("\\" + v0, v0)
+                else:
+                    try:
+                        value = float(value_part)
+                    except ValueError:
+                        value = value_part
+
+                return name, operator_type[0].strip(), value
+
+    return [None] * 3
+
+
+def coerce_value(column, value):
+    """
+    Convert a filter value to the Python type of the column it is compared with
+
+    Args:
+        column (sqlalchemy.Column):     Column
+        value (str, float):             Value from the filter query
+
+    Returns:
+        value (object):                 Converted value
+    """
+    python_type = column.type.python_type
+    if python_type is datetime.datetime:
+        return datetime.datetime.fromisoformat(str(value))
+    elif python_type is uuid.UUID:
+        return uuid.UUID(str(value))
+    elif python_type is int:
+        return int(value)
+    elif python_type is str:
+        return str(value)
+    return value
+
+
+def match_text(column, value):
+    """
+    Text a contains/datestartswith filter matches against the stored column
+
+    Args:
+        column (sqlalchemy.Column):     Column
+        value (str, float):             Value from the filter query
+
+    Returns:
+        text (str):                     Text to search for
+    """
+    if isinstance(value, float) and value.is_integer():
+        # split_filter_part reads bare numbers as floats, "12" not "12.0"
+        value = int(value)
+    text = str(value)
+    if column.type.python_type is uuid.UUID:
+        # The table shows hyphenated UUIDs, SQLite stores them as 32 hex digits
+        text = text.replace("-", "").lower()
+    return text
+
+
+def filter_clauses(filter_query):
+    """
+    Translate a DataTable filter query into SQL WHERE clauses
+
+    Args:
+        filter_query (str):     DataTable filter query
+
+    Returns:
+        clauses (list):         SQLAlchemy boolean expressions
+    """
+    clauses = []
+    for filter_part in (filter_query or "").split(" && "):
+        name, operator, value = split_filter_part(filter_part)
+        column = COLUMNS.get(name)
+        if column is None:
+            continue
+
+        if operator == "contains":
+            clauses.append(sqlalchemy.cast(column, sqlalchemy.String).contains(match_text(column, value)))
+            continue
+        elif operator == "datestartswith":
+            clauses.append(sqlalchemy.cast(column, sqlalchemy.String).startswith(match_text(column, value)))
+            continue
+
+        try:
+            value = coerce_value(column, value)
+        except ValueError:
+            # Half-typed values (e.g. a partial date) match nothing rather than erroring
+            clauses.append(sqlalchemy.false())
+            continue
+
+        if operator == "eq":
+            clauses.append(column == value)
+        elif operator == "ne":
+            clauses.append(column != value)
+        elif operator == "lt":
+            clauses.append(column < value)
+        elif operator == "le":
+            clauses.append(column <= value)
+        elif operator == "gt":
+            clauses.append(column > value)
+        elif operator == "ge":
+            clauses.append(column >= value)
+    return clauses
+
+
+def build_query(filter_query, sort_by, time_column="mtime", window=None, start=None, end=None):
+    """
+    Build the filtered and sorted SELECT over the scalar step columns
+
+    Args:
+        filter_query (str):     DataTable filter query
+        sort_by (list):         DataTable sort_by, [{"column_id": ..., "direction": ...}]
+        time_column (str):      Column the time range applies to, ctime or mtime
+        window (str, None):     Relative window, e.g. "1h"
+        start (str, None):      Range start date
+        end (str, None):        Range end date (inclusive)
+
+    Returns:
+        query (sqlalchemy.sql.Select):  Select statement
+    """
+    query = database.select_scalars(database.Step).where(*filter_clauses(filter_query))
+    query = query.where(
+        *database.time_range_clauses(COLUMNS[time_column], start=start, end=end, window=window)
+    )
+    for sort in sort_by or []:
+        column = COLUMNS.get(sort["column_id"])
+        if column is not None:
+            query = query.order_by(column.desc() if sort["direction"] == "desc" else column.asc())
+    # Stable paging when sort keys tie
+    return query.order_by(database.Step.id)
+
+
+def to_records(df):
+    """
+    Convert a page of rows to DataTable records
+
+    Args:
+        df (pandas.DataFrame):  Rows
+
+    Returns:
+        records (list):         List of dicts
+    """
+    for column in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = df[column].dt.strftime("%Y-%m-%d %H:%M:%S")
+        elif df[column].dtype == object:
+            df[column] = df[column].map(lambda value: str(value) if value is not None else None)
+    return df.astype(object).where(df.notna(), None).to_dict("records")
 
-engine = create_engine(f"sqlite:///{DATABASE}")
-df = pd.read_sql_table("steps", con=engine)
-df = df.drop("step", axis=1)
 
 app = Dash(__name__, external_stylesheets=[dbc.themes.SOLAR])
 
@@ -48,16 +237,53 @@ app.layout = dbc.Container(
             ],
             className="mb-4"
         ),
+        dbc.Row(
+            [
+                dbc.Col(
+                    dcc.RadioItems(
+                        id="time-column",
+                        options=[
+                            {"label": "Modified", "value": "mtime"},
+                            {"label": "Created", "value": "ctime"},
+                        ],
+                        value="mtime",
+                        inline=True,
+                        inputStyle={"marginRight": "0.5em", "marginLeft": "1em"},
+                    ),
+                    width="auto",
+                ),
+                dbc.Col(
+                    dcc.Dropdown(
+                        id="time-window",
+                        options=[{"label": f"Last {window}", "value": window} for window in TIME_WINDOWS],
+                        placeholder="Any time",
+                        clearable=True,
+                    ),
+                    width=2,
+                ),
+                dbc.Col(
+                    dcc.DatePickerRange(id="time-range", clearable=True),
+                    width="auto",
+                ),
+            ],
+            className="mb-3",
+            align="center",
+        ),
         dbc.Row(
             [
                 dbc.Col(
                     dash_table.DataTable(
                         id="data-table",
-                        data=df.to_dict("records"),
-                        sort_action="native",
-                        # page_size=10,
-                        filter_action="native",
-                        columns=[{"name": col, "id": col, "hideable": True} for col in df.columns],
+                        data=[],
+                        page_current=0,
+                        page_size=PAGE_SIZE,
+                        page_action="custom",
+                        sort_action="custom",
+                        sort_mode="multi",
+                        sort_by=[],
+                        filter_action="custom",
+                        filter_query="",
+                        columns=[{"name": col, "id": col, "hideable": True} for col in COLUMNS],
                         style_table={"overflowX": "auto"},
                         style_cell={
                             "textAlign": "left",
@@ -121,25 +347,56 @@ app.layout = dbc.Container(
 )
 
 
+@app.callback(
+    Output("data-table", "data"),
+    Output("data-table", "page_count"),
+    Input("data-table", "page_current"),
+    Input("data-table", "page_size"),
+    Input("data-table", "sort_by"),
+    Input("data-table", "filter_query"),
+    Input("time-column", "value"),
+    Input("time-window", "value"),
+    Input("time-range", "start_date"),
+    Input("time-range", "end_date"),
+)
+def update_table(page_current, page_size, sort_by, filter_query, time_column, window, start, end):
+    """
+    Fetch only the requested page of the filtered, sorted steps from the database
+    """
+    query = build_query(filter_query, sort_by, time_column, window, start, end)
+    count = sqlalchemy.select(sqlalchemy.func.count()).select_from(
+        query.order_by(None).subquery()
+    )
+    with engine.connect() as conn:
+        nrows = conn.execute(count).scalar()
+        df = pd.read_sql(query.limit(page_size).offset(page_current * page_size), con=conn)
+    page_count = max(1, -(-nrows // page_size))
+    return to_records(df), page_count
+
+
 @app.callback(
     Output("download", "data"),
     Input("btn-csv", "n_clicks"),
     Input("btn-json", "n_clicks"),
-    State("data-table", "derived_virtual_data"),
+    State("data-table", "sort_by"),
+    State("data-table", "filter_query"),
+    State("time-column", "value"),
+    State("time-window", "value"),
+    State("time-range", "start_date"),
+    State("time-range", "end_date"),
     prevent_initial_call=True,
 )
-def download_data(n_csv, n_json, table_data):
-    if not table_data:
-        return
-
+def download_data(n_csv, n_json, sort_by, filter_query, time_column, window, start, end):
     triggered_id = ctx.triggered_id
 
-    df_filtered = pd.DataFrame(table_data)
+    # The table only holds one page, so export the full filtered view from the database
+    query = build_query(filter_query, sort_by, time_column, window, start, end)
+    df_filtered = pd.read_sql(query, con=engine)
 
     if triggered_id == "btn-csv":
         return dcc.send_data_frame(df_filtered.to_csv, "orchestrator.csv", index=False)
     elif triggered_id == "btn-json":
-        return dict(content=df_filtered.to_json(orient="records", indent=2), filename="orchestrator.json")
+        return dict(content=df_filtered.to_json(orient="records", indent=2, date_format="iso"), filename="orchestrator.json")
 
 
 # Run the app
@@ -1,55 +1,266 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import uuid
 
-from flask import Flask, render_template, request
-from sqlalchemy import func
+from flask import Flask, abort, render_template, request, stream_template, url_for
+import sqlalchemy
 
 from models import SessionLocal
-from viz.database import Step
+from viz.database import Step, time_range_clauses
 
 
 app = Flask(__name__)
 
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+SORT_COLUMNS = {
+    "id": Step.id,
+    "path": Step.path,
+    "ctime": Step.ctime,
+    "mtime": Step.mtime,
+}
+
+
+def encode_cursor(value, id_):
+    """
+    Encode the sort value and id of the last row on a page as a cursor
+
+    Args:
+        value (object):         Sort column value
+        id_ (uuid.UUID):        Step id (tie breaker)
+
+    Returns:
+        cursor (str):           "<value>|<id hex>"
+    """
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, uuid.UUID):
+        value = value.hex
+    return f"{value}|{id_.hex}"
+
+
+def decode_cursor(cursor, column):
+    """
+    Decode a cursor from encode_cursor
+
+    Args:
+        cursor (str):                   Cursor
+        column (sqlalchemy.Column):     Sort column
+
+    Returns:
+        value (object):                 Sort column value
+        id_ (uuid.UUID):                Step id
+    """
+    value, id_ = cursor.rsplit("|", 1)
+    python_type = column.type.python_type
+    if python_type is datetime:
+        value = datetime.fromisoformat(value)
+    elif python_type is uuid.UUID:
+        value = uuid.UUID(value)
+    return value, uuid.UUID(id_)
+
+
+def keyset(query, sort_column, order="asc", after=None, before=None):
+    """
+    Restrict and sort a query to the rows after (or before) a cursor
+
+    Continuing from the last (sort value, id) seen makes each page an index
+    range scan rather than an ever-growing OFFSET. Pages before a cursor are
+    fetched in reverse order, nearest first.
+
+    Args:
+        query (sqlalchemy.sql.Select):  Filtered query
+        sort_column (sqlalchemy.Column):    Column to sort on
+        order (str):                    "asc" or "desc"
+        after (str, None):              Cursor of the row the page follows
+        before (str, None):             Cursor of the row the page precedes
+
+    Returns:
+        query (sqlalchemy.sql.Select):  Restricted and sorted query
+    """
+    descending = (order == "desc") != bool(before)
+    cursor = before or after
+    if cursor:
+        value, id_ = decode_cursor(cursor, sort_column)
+        if descending:
+            query = query.where(
+                sqlalchemy.or_(
+                    sort_column < value,
+                    sqlalchemy.and_(sort_column == value, Step.id < id_),
+                )
+            )
+        else:
+            query = query.where(
+                sqlalchemy.or_(
+                    sort_column > value,
+                    sqlalchemy.and_(sort_column == value, Step.id > id_),
+                )
+            )
+
+    # Sorting, with the id as tie breaker so the cursor is unique
+    if descending:
+        return query.order_by(sort_column.desc(), Step.id.desc())
+    return query.order_by(sort_column.asc(), Step.id.asc())
+
+
+class Page:
+    """
+    One keyset-paginated page of rows, fetched lazily as the template iterates
+
+    Attrs:
+        next_cursor (str, None):    Cursor for the following page, set once the
+                                    page has been iterated and more rows remain
+        prev_cursor (str, None):    Cursor for the preceding page, set once the
+                                    page has been iterated and earlier rows remain
+    """
+
+    def __init__(self, query, page_size, sort_column, backwards=False, has_previous=False):
+        """
+        Args:
+            query (sqlalchemy.sql.Select):  Query from keyset
+            page_size (int):                Rows per page, 0 for no limit
+            sort_column (sqlalchemy.Column):    Column the query is sorted on
+            backwards (bool):               Query was built with a before cursor
+            has_previous (bool):            Rows precede the page, e.g. after a
+                                            Next link
+
+        Returns:
+            None
+        """
+        self.query = query
+        self.page_size = page_size
+        self.sort_column = sort_column
+        self.backwards = backwards
+        self.has_previous = has_previous
+        self.next_cursor = None
+        self.prev_cursor = None
+
+    def __iter__(self):
+        query = self.query
+        if self.page_size:
+            # One extra row tells us whether there is another page
+            query = query.limit(self.page_size + 1)
+
+        session = SessionLocal()
+        try:
+            result = session.execute(query.execution_options(yield_per=500))
+            if self.backwards:
+                # Fetched nearest first, so buffer the (bounded) page and flip it
+                rows = result.all()
+                more = bool(self.page_size) and len(rows) > self.page_size
+                rows = rows[: self.page_size or None][::-1]
+                if rows:
+                    if more:
+                        self.prev_cursor = encode_cursor(rows[0].sort_key, rows[0].id)
+                    self.next_cursor = encode_cursor(rows[-1].sort_key, rows[-1].id)
+                for row in rows:
+                    yield row._mapping
+                return
+
+            last = None
+            for index, row in enumerate(result):
+                if self.page_size and index == self.page_size:
+                    self.next_cursor = encode_cursor(last.sort_key, last.id)
+                    break
+                if last is None and self.has_previous:
+                    self.prev_cursor = encode_cursor(row.sort_key, row.id)
+                last = row
+                yield row._mapping
+        finally:
+            session.close()
+
+    def next_url(self):
+        """
+        URL of the next page, keeping the current filters and sort
+        """
+        args = request.args.to_dict()
+        args.pop("before", None)
+        args["after"] = self.next_cursor
+        return url_for("index", **args)
+
+    def prev_url(self):
+        """
+        URL of the previous page, keeping the current filters and sort
+        """
+        args = request.args.to_dict()
+        args.pop("after", None)
+        args["before"] = self.prev_cursor
+        return url_for("index", **args)
+
 
 @app.route("/", methods=["GET"])
 def index():
-    session = SessionLocal()
-
     # Get filters from URL query string
     id_filter = request.args.get("id")
     path_filter = request.args.get("path")
     ctime_filter = request.args.get("ctime")
     mtime_filter = request.args.get("mtime")
+    ranges = {
+        name: request.args.get(name)
+        for name in (
+            "ctime_from", "ctime_to", "ctime_window",
+            "mtime_from", "mtime_to", "mtime_window",
+        )
+    }
     sort_by = request.args.get("sort_by", "ctime")
     order = request.args.get("order", "asc")
+    after = request.args.get("after")
+    before = request.args.get("before")
+    stream = request.args.get("stream", "") in ("1", "true", "yes")
+    page_size = request.args.get("page_size", PAGE_SIZE, type=int)
+
+    # Unlimited pages are only allowed when streaming, as nothing is buffered
+    if page_size < 0 or (page_size == 0 and not stream):
+        abort(400, "page_size must be positive")
+    page_size = min(page_size, MAX_PAGE_SIZE) if not stream else page_size
 
-    # query = session.query(Step.id, Step.path, Step.ctime, Step.mtime)
-    query = session.query(
+    sort_by = sort_by if sort_by in SORT_COLUMNS else "ctime"
+    sort_column = SORT_COLUMNS[sort_by]
+
+    query = sqlalchemy.select(
         Step.id.label("id"),
         Step.path.label("path"),
         Step.ctime.label("ctime"),
         Step.mtime.label("mtime"),
+        sort_column.label("sort_key"),
     )
 
     # Filtering
     if id_filter:
-        query = query.filter(Step.id == uuid.UUID(id_filter))
+        query = query.where(Step.id == uuid.UUID(id_filter))
     if path_filter:
-        query = query.filter(Step.path == path_filter)
-    if ctime_filter:
-        query = query.filter(
-            func.strftime("%Y-%m-%d %H:%M:%S", Step.ctime) == ctime_filter
-        )
-    if mtime_filter:
-        query = query.filter(
-            func.strftime("%Y-%m-%d %H:%M:%S", Step.mtime) == mtime_filter
-        )
+        query = query.where(Step.path == path_filter)
+    # Time filters compare the raw columns so the ctime/mtime indexes are used;
+    # an exact ctime/mtime matches anything within that second
+    try:
+        for name, column, exact in (
+            ("ctime", Step.ctime, ctime_filter),
+            ("mtime", Step.mtime, mtime_filter),
+        ):
+            if exact:
+                start = datetime.fromisoformat(exact)
+                query = query.where(
+                    *time_range_clauses(column, start=start, end=start + timedelta(seconds=1))
+                )
+            query = query.where(
+                *time_range_clauses(
+                    column,
+                    start=ranges[f"{name}_from"],
+                    end=ranges[f"{name}_to"],
+                    window=ranges[f"{name}_window"],
+                )
+            )
+    except ValueError as error:
+        abort(400, str(error))
 
     filters = [
         {"name": "id", "placeholder": "Filter by ID"},
         {"name": "path", "placeholder": "Filter by Path"},
-        {"name": "ctime", "placeholder": "Filter by Created Time"},
-        {"name": "mtime", "placeholder": "Filter by Modified Time"},
+        {"name": "ctime_from", "placeholder": "Created from (YYYY-MM-DD HH:MM)"},
+        {"name": "ctime_to", "placeholder": "Created before (YYYY-MM-DD HH:MM)"},
+        {"name": "ctime_window", "placeholder": "Created in last (e.g. 2h)"},
+        {"name": "mtime_from", "placeholder": "Modified from (YYYY-MM-DD HH:MM)"},
+        {"name": "mtime_to", "placeholder": "Modified before (YYYY-MM-DD HH:MM)"},
+        {"name": "mtime_window", "placeholder": "Modified in last (e.g. 2h)"},
     ]
 
     filter_values = {
@@ -57,14 +268,13 @@ def index():
         "path": path_filter,
         "ctime": ctime_filter,
         "mtime": mtime_filter,
+        **ranges,
     }
-    
-    # Sorting
-    sort_column = getattr(Step, sort_by, Step.ctime)
-    if order == "desc":
-        query = query.order_by(sort_column.desc())
-    else:
-        query = query.order_by(sort_column.asc())
+
+    try:
+        query = keyset(query, sort_column, order, after=after, before=before)
+    except ValueError:
+        abort(400, "Invalid cursor")
 
     # Abstraction
     columns = [
@@ -74,20 +284,22 @@ def index():
         {'name': 'mtime', 'label': 'Modified At'}
     ]
 
-    entries = query.all()
-    session.close()
-
-    return render_template(
-        "index.jinja.html",
-        entries=entries,
+    context = dict(
+        entries=Page(query, page_size, sort_column, backwards=bool(before), has_previous=bool(after)),
         filters=filters,
         filter_values=filter_values,
         sort_by=sort_by,
         order=order,
+        page_size=page_size,
         columns=columns,
         request=request,
     )
 
+    # Streaming renders (and queries) rows as the response is sent
+    if stream:
+        return stream_template("index.jinja.html", **context)
+    return render_template("index.jinja.html", **context)
+
 
 @app.template_filter("datetimefmt")
 def datetimefmt(value, fmt="%Y-%m-%d %H:%M:%S"):
@@ -1,5 +1,6 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import viz.database as database
 
-engine = create_engine('sqlite:////Users/ellis/Documents/scripts/arboretum/orchestrator/orchestrator.db', echo=True)
-SessionLocal = sessionmaker(bind=engine)
\ No newline at end of file
+DB_ADDRESS = 'sqlite:////Users/ellis/Documents/scripts/arboretum/orchestrator/orchestrator.db'
+
+engine = database.get_engine(DB_ADDRESS)
+SessionLocal = database.get_sessionmaker(DB_ADDRESS)
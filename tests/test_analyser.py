@@ -0,0 +1,48 @@
+"""
+Test re-encoding the analyser's legacy result blobs
+"""
+
+import importlib
+import pathlib
+import pickle
+
+import sqlalchemy
+
+import viz.database as viz_database
+
+
+ANALYSER = pathlib.Path(__file__).resolve().parents[1] / "analyser"
+
+
+def test_recode_main_results(tmp_path, monkeypatch):
+    """
+    Test results pickled as __main__.Result by running result.py are re-encoded
+    """
+    monkeypatch.syspath_prepend(str(ANALYSER))
+    result_module = importlib.import_module("result")
+    database = importlib.import_module("database")
+
+    result = result_module.Result()
+    result.name = "run"
+    # Protocol 0 names the class as text, as pickling from result.py would
+    legacy = pickle.dumps(result, protocol=0).replace(b"cresult\nResult\n", b"c__main__\nResult\n")
+    assert b"__main__" in legacy
+
+    db_path = f"{database.RDBMS}:///{tmp_path / 'test.db'}"
+    database.setup_database(db_path)
+    table = database.Result.__table__
+    with viz_database.get_engine(db_path).begin() as conn:
+        conn.execute(
+            table.insert().values(
+                id=result.id,
+                name=result.name,
+                result=sqlalchemy.literal(legacy, sqlalchemy.LargeBinary),
+            )
+        )
+
+    database.main([str(tmp_path / "test.db"), "--codec", "json"])
+    with viz_database.session_scope(db_path) as session:
+        recoded = session.get(database.Result, result.id).result
+    assert isinstance(recoded, result_module.Result)
+    assert vars(recoded) == vars(result)
+    viz_database.dispose_engines(db_path)
@@ -0,0 +1,116 @@
+"""
+Test the Dash app's server-side filtering and sorting
+"""
+
+import pytest
+
+pytest.importorskip("dash")
+pytest.importorskip("dash_bootstrap_components")
+
+import dashapp.app as app
+import viz.database as database
+
+
+@pytest.fixture
+def rows(tmp_path, workflow):
+    """
+    Scalar rows of the dummy workflow, and a function running a query against them
+    """
+    db_path = f"{database.RDBMS}:///{tmp_path / 'test.db'}"
+    database.setup_database(db_path)
+    database.add_workflow(db_path=db_path, wf=workflow)
+    engine = database.get_engine(db_path)
+
+    def run(query):
+        with engine.connect() as conn:
+            return conn.execute(query).all()
+
+    yield run(database.select_scalars(database.Step)), run
+    database.dispose_engines(db_path)
+
+
+def _ids(rows):
+    return sorted(row.id for row in rows)
+
+
+@pytest.mark.parametrize(
+    ("filter_part", "parts"),
+    [
+        ('{status} = "failed"', ("status", "eq", "failed")),
+        ("{status} eq 'failed'", ("status", "eq", "failed")),
+        ("{status} ne failed", ("status", "ne", "failed")),
+        ("{depth} >= 1", ("depth", "ge", 1.0)),
+        ("{depth} le 1", ("depth", "le", 1.0)),
+        ("{depth} < 2", ("depth", "lt", 2.0)),
+        ("{depth} gt 0", ("depth", "gt", 0.0)),
+        ('{name} contains "step \\" 1"', ("name", "contains", 'step " 1')),
+        ("{ctime} datestartswith 2024-01", ("ctime", "datestartswith", "2024-01")),
+        ("{status} = ", (None, None, None)),
+        ("{status} contains", (None, None, None)),
+        ("{status}", (None, None, None)),
+    ],
+)
+def test_split_filter_part(filter_part, parts):
+    """
+    Test filter clauses split into column, operator and value, and unfinished ones are dropped
+    """
+    assert tuple(app.split_filter_part(filter_part)) == parts
+
+
+def test_filter_operators(rows, workflow):
+    """
+    Test every operator selects the same rows as the equivalent Python predicate
+    """
+    rows, run = rows
+    task = workflow.steps[0].steps[0]
+    date = str(task.ctime)[:7]
+    cases = [
+        (f'{{status}} = "{task.status}"', lambda row: row.status == task.status),
+        (f'{{status}} != "{task.status}"', lambda row: row.status != task.status),
+        ("{depth} < 1", lambda row: row.depth < 1),
+        ("{depth} <= 1", lambda row: row.depth <= 1),
+        ("{depth} > 1", lambda row: row.depth > 1),
+        ("{depth} >= 1", lambda row: row.depth >= 1),
+        ("{name} contains step", lambda row: "step" in row.name),
+        ("{position} contains 1", lambda row: "1" in str(row.position)),
+        (f"{{ctime}} datestartswith {date}", lambda row: str(row.ctime).startswith(date)),
+        (f"{{id}} = {task.uuid}", lambda row: row.id == task.uuid),
+        # Hyphenated, as shown in the table
+        (f"{{id}} contains {str(task.uuid)[4:13].upper()}", lambda row: row.id == task.uuid),
+        (f"{{parent_id}} contains {str(workflow.uuid)[:13]}", lambda row: row.parent_id == workflow.uuid),
+        (
+            '{type} = "task" && {depth} > 1',
+            lambda row: row.type == "task" and row.depth > 1,
+        ),
+    ]
+    for filter_query, predicate in cases:
+        expected = _ids(row for row in rows if predicate(row))
+        assert expected, filter_query
+        assert _ids(run(app.build_query(filter_query, []))) == expected, filter_query
+
+
+def test_filter_ignored_and_unmatched(rows):
+    """
+    Test unknown columns and unfinished clauses are ignored, and unparsable values match nothing
+    """
+    rows, run = rows
+    for filter_query in ("", None, '{nope} = "x"', "{status} = ", "{status} = && {name} contains"):
+        assert _ids(run(app.build_query(filter_query, []))) == _ids(rows), filter_query
+    assert run(app.build_query("{ctime} > 2024-1", [])) == []
+    assert run(app.build_query("{id} = abc", [])) == []
+
+
+def test_sort(rows):
+    """
+    Test multi-column sorts, with ties broken by id
+    """
+    rows, run = rows
+    sort_by = [
+        {"column_id": "depth", "direction": "desc"},
+        {"column_id": "name", "direction": "asc"},
+        {"column_id": "nope", "direction": "asc"},
+    ]
+    got = run(app.build_query("", sort_by))
+    assert [row.id for row in got] == [
+        row.id for row in sorted(rows, key=lambda row: (-row.depth, row.name, row.id.hex))
+    ]
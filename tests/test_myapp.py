@@ -0,0 +1,146 @@
+"""
+Test the Flask app's keyset pagination
+"""
+
+import datetime
+import html
+import importlib
+import pathlib
+import re
+import uuid
+
+import pytest
+
+pytest.importorskip("flask")
+
+import viz.database as database
+import viz.steps as steps
+
+
+MYAPP = pathlib.Path(__file__).resolve().parents[1] / "myapp"
+PAGE_SIZE = 5
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """
+    Test client of the app over a database of tasks with tied creation times
+
+    Yields:
+        client (flask.testing.FlaskClient):     Client
+        expected (list):                        Step ids, by ascending (ctime, id)
+    """
+    monkeypatch.syspath_prepend(str(MYAPP))
+    app = importlib.import_module("myapp.app")
+
+    wf = steps.Workflow("main")
+    start = datetime.datetime(2024, 1, 1)
+    for index in range(12):
+        task = steps.make_tmp_task(f"step {index}", "completed")
+        # Four tasks per second, so pages end in the middle of ties
+        task.ctime = start + datetime.timedelta(seconds=index // 4)
+        wf.steps.append(task)
+    wf.ctime = start
+    wf.fix_paths()
+
+    db_path = f"{database.RDBMS}:///{tmp_path / 'test.db'}"
+    database.setup_database(db_path)
+    database.add_workflow(db_path=db_path, wf=wf)
+    monkeypatch.setattr(app, "SessionLocal", database.get_sessionmaker(db_path))
+
+    expected = sorted((step.ctime, step.uuid.hex) for step in steps.iter_steps(wf))
+    yield app.app.test_client(), [str(uuid.UUID(hexid)) for _, hexid in expected]
+    database.dispose_engines(db_path)
+
+
+def _page(client, url):
+    """
+    Step ids shown on a page, and its Previous and Next links
+    """
+    response = client.get(url)
+    assert response.status_code == 200
+    text = response.get_data(as_text=True)
+    links = {
+        label: html.unescape(href)
+        for href, label in re.findall(r'href="([^"]+)">(Previous|Next)</a>', text)
+    }
+    return re.findall(r"<td>([0-9a-f-]{36})</td>", text), links.get("Previous"), links.get("Next")
+
+
+def _walk(client, url, link):
+    """
+    Pages from url, following either the Previous or the Next links
+
+    Returns:
+        pages (list):           Step ids of each page
+        url (str):              URL of the final page
+    """
+    pages = []
+    while True:
+        ids, prev_url, next_url = _page(client, url)
+        pages.append(ids)
+        following = prev_url if link == "Previous" else next_url
+        if following is None:
+            return pages, url
+        url = following
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_next_and_previous(client, order):
+    """
+    Test Next walks every row once, in order and across ties, and Previous walks back
+    """
+    client, expected = client
+    expected = expected if order == "asc" else expected[::-1]
+
+    forward, last = _walk(client, f"/?sort_by=ctime&order={order}&page_size={PAGE_SIZE}", "Next")
+    assert [len(ids) for ids in forward] == [5, 5, 3]
+    assert sum(forward, []) == expected
+
+    backward, _ = _walk(client, last, "Previous")
+    assert backward == forward[::-1]
+
+
+def test_first_page(client):
+    """
+    Test the first page has no Previous link, also when reached through one
+    """
+    client, expected = client
+    ids, prev_url, next_url = _page(client, f"/?page_size={PAGE_SIZE}")
+    assert ids == expected[:PAGE_SIZE] and prev_url is None
+
+    ids, prev_url, _ = _page(client, next_url)
+    assert ids == expected[PAGE_SIZE : 2 * PAGE_SIZE]
+    ids, prev_url, next_url = _page(client, prev_url)
+    assert ids == expected[:PAGE_SIZE] and prev_url is None
+    assert _page(client, next_url)[0] == expected[PAGE_SIZE : 2 * PAGE_SIZE]
+
+
+def test_last_page(client):
+    """
+    Test a page ending exactly at the last row has no Next link
+    """
+    client, expected = client
+    ids, _, next_url = _page(client, f"/?page_size={len(expected)}")
+    assert ids == expected and next_url is None
+    ids, _, next_url = _page(client, f"/?page_size={len(expected) - 1}")
+    assert ids == expected[:-1]
+    ids, prev_url, next_url = _page(client, next_url)
+    assert ids == [expected[-1]] and prev_url is not None and next_url is None
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "garbage",
+        "2024-01-01T00:00:00|nothex",
+        "yesterday|0123456789abcdef0123456789abcdef",
+    ],
+)
+@pytest.mark.parametrize("direction", ["after", "before"])
+def test_malformed_cursor(client, cursor, direction):
+    """
+    Test malformed cursors are rejected as bad requests
+    """
+    client, _ = client
+    assert client.get(f"/?sort_by=ctime&{direction}={cursor}").status_code == 400
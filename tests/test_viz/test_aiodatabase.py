@@ -0,0 +1,81 @@
+"""
+Test asyncio database access
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+import viz.aiodatabase as aiodatabase
+import viz.database as database
+import viz.steps as steps
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """
+    A fresh database URL, disposed of after the test
+    """
+    fname = f"{database.RDBMS}:///{tmp_path / 'test.db'}"
+    yield fname
+    database.dispose_engines(fname)
+
+
+def test_round_trip(db_path, workflow):
+    """
+    Test steps are written, updated and read back through the coroutines
+    """
+
+    async def main():
+        await aiodatabase.setup_database(db_path)
+        count = await aiodatabase.add_workflow(db_path=db_path, wf=workflow)
+        task = workflow.steps[0].steps[0]
+        task.status = "failed"
+        await aiodatabase.upsert_steps(db_path=db_path, stps=(step for step in [task]))
+        by_uuid = await aiodatabase.query_step_by_uuid(db_path=db_path, uuid=workflow.uuid)
+        by_path = await aiodatabase.query_step_by_path(db_path=db_path, path=str(task.path))
+        rows = await aiodatabase.query_steps_modified_since(db_path=db_path)
+        await aiodatabase.checkpoint(db_path)
+        return count, by_uuid, by_path, rows
+
+    count, by_uuid, by_path, rows = asyncio.run(main())
+    assert count == len(rows) == len(list(steps.iter_steps(workflow)))
+    assert by_uuid.steps[0].steps[0].status == "failed"
+    assert by_path.uuid == workflow.steps[0].steps[0].uuid
+
+
+def test_gather(db_path, workflow):
+    """
+    Test many concurrent requests are served off the event loop's thread
+    """
+    database.setup_database(db_path)
+    database.add_workflow(db_path=db_path, wf=workflow)
+    threads = set()
+
+    def query(**kwargs):
+        threads.add(threading.current_thread().name)
+        return database.query_step_by_uuid(**kwargs)
+
+    async def main():
+        loop_thread = threading.current_thread().name
+        results = await asyncio.gather(
+            *(aiodatabase.query_step_by_uuid(db_path=db_path, uuid=workflow.uuid) for _ in range(200)),
+            *(aiodatabase.run(query, db_path=db_path, uuid=workflow.uuid) for _ in range(20)),
+        )
+        return loop_thread, results
+
+    loop_thread, results = asyncio.run(main())
+    assert len(results) == 220
+    assert all(wf.uuid == workflow.uuid for wf in results)
+    assert threads and loop_thread not in threads
+
+
+def test_shutdown():
+    """
+    Test the thread pool is recreated after shutdown
+    """
+    executor = aiodatabase.get_executor()
+    assert aiodatabase.get_executor() is executor
+    aiodatabase.shutdown()
+    assert aiodatabase.get_executor() is not executor
@@ -0,0 +1,189 @@
+"""
+Test blob codecs
+"""
+
+import datetime
+import pathlib
+import pickle
+import uuid
+
+import pytest
+import sqlalchemy
+
+import viz.codecs as codecs
+import viz.database as database
+import viz.settings as settings
+import viz.steps as steps
+
+
+CODECS = [
+    "pickle",
+    "json",
+    pytest.param("msgpack", marks=pytest.mark.skipif(codecs.msgpack is None, reason="msgpack not installed")),
+]
+
+
+class Record:
+    """
+    Attribute container for register_attrs
+    """
+
+
+codecs.register_attrs("test-record", Record)
+
+
+def _fields(wf):
+    """
+    Comparable fields of every step, in pre-order
+    """
+    return [
+        (
+            step.uuid,
+            step.name,
+            step.status,
+            step.path,
+            step.ctime,
+            step.mtime,
+            type(step),
+            step.parent_flow_type,
+            getattr(step, "flow_type", None),
+            step.scheduler.__getstate__() if step.scheduler else None,
+        )
+        for step in steps.iter_steps(wf)
+    ]
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_round_trip(workflow, codec):
+    """
+    Test workflows and tagged values survive every codec
+    """
+    data = codecs.encode(workflow, codec)
+    assert codecs.codec_of(data) == codec
+    assert _fields(codecs.decode(data, allow_pickle=True)) == _fields(workflow)
+
+    record = Record()
+    record.id = uuid.uuid4()
+    record.when = datetime.datetime.now(datetime.timezone.utc)
+    record.path = pathlib.Path("/tmp/run")
+    record.values = [1, 2.5, None, {"a": "b"}]
+    record.step = workflow.steps[0].steps[0]
+    decoded = codecs.decode(codecs.encode(record, codec), allow_pickle=True)
+    assert isinstance(decoded, Record)
+    assert {key: value for key, value in vars(decoded).items() if key != "step"} == {
+        key: value for key, value in vars(record).items() if key != "step"
+    }
+    assert _fields(decoded.step) == _fields(record.step)
+
+
+def test_header(workflow):
+    """
+    Test plain codecs are headed and legacy pickles are not
+    """
+    assert codecs.encode(workflow, "json").startswith(codecs.MAGIC + bytes((1, codecs.SCHEMA_VERSION)))
+    legacy = pickle.dumps(workflow)
+    assert codecs.codec_of(legacy) == "pickle"
+    assert codecs.decode(legacy, allow_pickle=True).uuid == workflow.uuid
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_ambiguous(codec):
+    """
+    Test dicts holding the type key round-trip as dicts, and lossy values are refused
+    """
+    values = [
+        {"$type": "step", "value": None},
+        {"$type": "dict", "value": [["a", 1]]},
+        {"outer": {"$type": "uuid", "value": {"$type": "path"}}, "id": uuid.UUID(int=1)},
+    ]
+    for value in values:
+        assert codecs.decode(codecs.encode(value, codec), allow_pickle=True) == value
+    if codec == "pickle":
+        return
+    with pytest.raises(Exception, match="Dict key 1"):
+        codecs.encode({1: [2, 3]}, codec)
+    with pytest.raises(Exception, match="Tuples"):
+        codecs.encode({"a": (2, 3)}, codec)
+    with pytest.raises(Exception, match="Dict key"):
+        codecs.encode({1: (2, 3)}, codec)
+
+
+def test_refusals(workflow, monkeypatch):
+    """
+    Test pickles are refused unless allowed, and newer schemas and unknown types are
+    """
+    data = codecs.encode(workflow, "pickle")
+    with pytest.raises(Exception, match="ALLOW_PICKLE"):
+        codecs.decode(data)
+    with pytest.raises(Exception, match="ALLOW_PICKLE"):
+        codecs.decode(data, allow_pickle=False)
+    assert codecs.decode(codecs.encode(workflow, "json")).uuid == workflow.uuid
+    monkeypatch.setattr(codecs, "ALLOW_PICKLE", True)
+    assert codecs.decode(data).uuid == workflow.uuid
+
+    newer = codecs.MAGIC + bytes((1, codecs.SCHEMA_VERSION + 1)) + b"{}"
+    with pytest.raises(Exception, match="newer"):
+        codecs.decode(newer)
+    with pytest.raises(Exception, match="cannot be encoded"):
+        codecs.encode(object(), "json")
+    with pytest.raises(Exception, match="not recognised"):
+        codecs.decode(codecs.MAGIC + bytes((1, 1)) + b'{"$type":"unknown","value":1}')
+    with pytest.raises(Exception, match="expected"):
+        codecs.decode(codecs.MAGIC + bytes((1, 1)) + b'{"$type":"uuid","value":"00","other":1}')
+
+
+def test_unpickler(workflow):
+    """
+    Test a custom unpickler resolves the classes of pickled blobs
+    """
+    resolved = []
+
+    class Unpickler(pickle.Unpickler):
+        def find_class(self, module, name):
+            resolved.append((module, name))
+            return super().find_class(module, name)
+
+    data = codecs.encode(workflow, "pickle")
+    assert codecs.decode(data, allow_pickle=True, unpickler=Unpickler).uuid == workflow.uuid
+    assert ("viz.steps", "Workflow") in resolved
+
+
+def test_allow_pickle_option(tmp_path, workflow, monkeypatch):
+    """
+    Test the views refuse pickled database steps unless --allow-pickle is given
+    """
+    monkeypatch.setattr(codecs, "ALLOW_PICKLE", False)
+    db_path = f"{database.RDBMS}:///{tmp_path / 'test.db'}"
+    database.setup_database(db_path)
+    monkeypatch.setattr(codecs, "DEFAULT_CODEC", "pickle")
+    database.add_step(db_path=db_path, step=workflow)
+    database.dispose_engines(db_path)
+
+    argv = ["--fname", str(tmp_path / "test.db"), "--uuid", workflow.uuid.hex]
+    with pytest.raises(Exception, match="--allow-pickle"):
+        settings.load_wf(settings.get_args(argv))
+    assert settings.load_wf(settings.get_args([*argv, "--allow-pickle"])).uuid == workflow.uuid
+
+
+def test_recode_blobs(tmp_path, workflow, monkeypatch):
+    """
+    Test stored pickles are re-encoded in place, once
+    """
+    db_path = f"{database.RDBMS}:///{tmp_path / 'test.db'}"
+    database.setup_database(db_path)
+    monkeypatch.setattr(codecs, "DEFAULT_CODEC", "pickle")
+    database.add_step(db_path=db_path, step=workflow)
+    monkeypatch.undo()
+
+    raw = sqlalchemy.type_coerce(database.Step.__table__.c.step, sqlalchemy.LargeBinary)
+
+    def stored():
+        with database.get_engine(db_path).connect() as conn:
+            return conn.execute(sqlalchemy.select(raw)).scalar()
+
+    assert codecs.codec_of(stored()) == "pickle"
+    database.main([str(tmp_path / "test.db"), "--codec", "json"])
+    assert codecs.codec_of(stored()) == "json"
+    assert database.recode_blobs(db_path, database.Step.__table__, ("step",), codec="json") == 0
+    assert _fields(database.query_step_by_uuid(db_path=db_path, uuid=workflow.uuid)) == _fields(workflow)
+    database.dispose_engines(db_path)
@@ -0,0 +1,107 @@
+""" 
+Test columnar workflow
+"""
+
+import collections
+
+import pytest
+
+import viz.columnar as columnar
+import viz.steps as steps
+
+
+def _flatten(step):
+    """
+    (uuid, name, status, path, ctime, type) of every step, in pre-order
+    """
+    rows = [(step.uuid, step.name, step.status, str(step.path), step.ctime, step.type)]
+    for child in getattr(step, "steps", []):
+        rows.extend(_flatten(child))
+    return rows
+
+
+def _tasks(step):
+    """
+    Every task under a step
+    """
+    if isinstance(step, steps.Workflow):
+        for child in step.steps:
+            yield from _tasks(child)
+    else:
+        yield step
+
+
+def test_round_trip(workflow):
+    """
+    Test conversion to columns and back preserves the tree
+    """
+    cols = columnar.ColumnarWorkflow.from_workflow(workflow)
+    assert len(cols) == len(_flatten(workflow))
+    loaded = cols.to_workflow()
+    assert _flatten(loaded) == _flatten(workflow)
+    assert loaded.steps[3].steps[1].scheduler.ppn == workflow.steps[3].steps[1].scheduler.ppn
+    assert loaded.index.find(path=workflow.steps[3].steps[1].path) is loaded.steps[3].steps[1]
+
+
+def test_structure(workflow):
+    """
+    Test parent, depth and sub-tree size columns
+    """
+    cols = columnar.ColumnarWorkflow.from_workflow(workflow)
+    assert cols.parent[0] == -1
+    assert cols.size[0] == len(cols)
+    row = 1 + cols.size[1]
+    assert cols.names[row] == workflow.steps[1].name
+    assert cols.depth[row] == 1
+    assert cols.paths[row + 2] == str(workflow.steps[1].steps[1].path)
+    assert (cols.parent[row + 1:row + cols.size[row]] == row).sum() == len(workflow.steps[1].steps)
+
+
+@pytest.mark.parametrize("n_workflows", [1, 10])
+def test_aggregates(n_workflows):
+    """
+    Test vectorised aggregates against a walk over the object tree
+    """
+    sweep = steps.make_tmp_sweep(n_workflows=n_workflows, n_tasks=20)
+    tasks = list(_tasks(sweep))
+    cols = columnar.ColumnarWorkflow.from_workflow(sweep)
+
+    assert cols.status_counts() == dict(collections.Counter(task.status for task in tasks))
+    completed = sum(task.status == "completed" for task in tasks) / len(tasks)
+    assert cols.completed_fraction() == pytest.approx(completed)
+    cpuhours = sum(
+        task.scheduler.nodes * task.scheduler.ppn * task.scheduler.wallclock for task in tasks
+    ) / 3600
+    assert cols.cpuhours() == pytest.approx(cpuhours)
+
+    summary = cols.summary(row=1)
+    assert summary["tasks"] == len(list(_tasks(sweep.steps[0])))
+
+
+def test_missing_times():
+    """
+    Test unset times round-trip through the int64 columns
+    """
+    task = steps.Task("task", "pending")
+    task.ctime = None
+    cols = columnar.ColumnarWorkflow.from_workflow(task)
+    assert cols.ctime[0] == columnar.NO_TIME
+    assert cols.to_workflow().ctime is None
+
+
+def test_many_statuses(workflow, monkeypatch):
+    """
+    Test status codes beyond the int8 range are stored without overflowing
+    """
+    monkeypatch.setattr(steps, "STATUSES", list(steps.STATUSES))
+    monkeypatch.setattr(steps, "_STATUS2CODE", dict(steps._STATUS2CODE))
+    for index in range(200):
+        steps.status_code(f"status {index}")
+    task = workflow.steps[0].steps[0]
+    task.status = "status 199"
+    assert task.status_code == steps.STATUSES.index("status 199") > 127
+
+    cols = columnar.ColumnarWorkflow.from_workflow(workflow)
+    assert steps.STATUSES[cols.status[cols.objects.index(task)]] == "status 199"
+    assert cols.status_counts()["status 199"] == 1
+    assert cols.to_workflow().steps[0].steps[0].status == "status 199"
@@ -0,0 +1,343 @@
+""" 
+Test database helpers
+"""
+
+import datetime
+import os
+import threading
+
+import pytest
+import sqlalchemy
+
+import viz.database as database
+import viz.fastdb as fastdb
+import viz.steps as steps
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """
+    A fresh database URL, disposed of after the test
+    """
+    fname = f"{database.RDBMS}:///{tmp_path / 'test.db'}"
+    database.setup_database(fname)
+    yield fname
+    database.dispose_engines(fname)
+
+
+def test_engine_cached(db_path):
+    """
+    Test engines and session factories are shared per URL
+    """
+    assert database.get_engine(db_path) is database.get_engine(db_path)
+    assert database.get_sessionmaker(db_path) is database.get_sessionmaker(db_path)
+
+
+def test_dispose_engines(db_path):
+    """
+    Test disposal drops the cached engine
+    """
+    engine = database.get_engine(db_path)
+    database.dispose_engines(db_path)
+    assert database.get_engine(db_path) is not engine
+
+
+def test_session_scope_rollback(db_path, workflow):
+    """
+    Test a failing session scope does not commit
+    """
+    with pytest.raises(RuntimeError):
+        with database.session_scope(db_path) as session:
+            session.add(database.Step(id=workflow.uuid, name=workflow.name))
+            raise RuntimeError()
+    assert database.query_step_by_uuid(db_path=db_path, uuid=workflow.uuid) is None
+
+
+def test_add_and_query_step(db_path, workflow):
+    """
+    Test a step round-trips through the database
+    """
+    database.add_step(db_path=db_path, step=workflow)
+    step = database.query_step_by_uuid(db_path=db_path, uuid=workflow.uuid)
+    assert step.uuid == workflow.uuid
+    step = database.query_step_by_path(db_path=db_path, path=str(workflow.path))
+    assert step.uuid == workflow.uuid
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, database.BATCH_SIZE])
+def test_add_workflow(db_path, workflow, batch_size):
+    """
+    Test bulk ingest writes one row per step
+    """
+    nsteps = len(list(steps.iter_steps(workflow)))
+    count = database.add_workflow(db_path=db_path, wf=workflow, batch_size=batch_size)
+    assert count == nsteps
+    with database.session_scope(db_path) as session:
+        assert session.query(database.Step).count() == nsteps
+    task = workflow.steps[0].steps[0]
+    assert database.query_step_by_uuid(db_path=db_path, uuid=task.uuid).name == task.name
+
+
+def test_upsert_steps(db_path, workflow):
+    """
+    Test upserts refresh status/wallclock of existing rows and insert new ones
+    """
+    database.add_workflow(db_path=db_path, wf=workflow, pickle=True)
+
+    task = workflow.steps[0].steps[0]
+    task.status = "running"
+    task.scheduler.wallclock_expired = 10
+    new = steps.make_tmp_task("extra", "pending")
+    count = database.upsert_steps(db_path=db_path, stps=[task, new], batch_size=1)
+    assert count == 2
+
+    wf = database.query_step_by_uuid(db_path=db_path, uuid=workflow.uuid)
+    loaded = wf.steps[0].steps[0]
+    assert loaded.status == "running"
+    assert loaded.scheduler.wallclock_expired == 10
+    loaded = database.query_step_by_uuid(db_path=db_path, uuid=new.uuid)
+    assert loaded.status == "pending"
+    with database.session_scope(db_path) as session:
+        assert session.get(database.Step, new.uuid).step is None
+
+
+def test_migrate_database(tmp_path):
+    """
+    Test missing columns are added to tables from older schemas
+    """
+    fname = f"{database.RDBMS}:///{tmp_path / 'old.db'}"
+    with database.get_engine(fname).begin() as conn:
+        conn.execute(
+            sqlalchemy.text(
+                "CREATE TABLE steps (id CHAR(32) PRIMARY KEY, name VARCHAR, status VARCHAR, "
+                "path VARCHAR, ctime DATETIME, mtime DATETIME, step BLOB)"
+            )
+        )
+    database.main([str(tmp_path / "old.db")])
+    inspector = sqlalchemy.inspect(database.get_engine(fname))
+    columns = {column["name"] for column in inspector.get_columns("steps")}
+    assert set(steps.VOLATILE_COLUMNS) <= columns
+    assert {"parent_id", "depth", "position"} <= columns
+    indexes = {index["name"] for index in inspector.get_indexes("steps")}
+    assert {"ix_steps_path", "ix_steps_status", "ix_steps_mtime"} <= indexes
+    assert "ix_steps_parent_id_position" in indexes
+    database.dispose_engines(fname)
+
+
+def test_path_query_uses_index(db_path, workflow):
+    """
+    Test path lookups are index searches rather than table scans
+    """
+    database.add_workflow(db_path=db_path, wf=workflow)
+    with database.get_engine(db_path).connect() as conn:
+        plan = conn.execute(
+            sqlalchemy.text("EXPLAIN QUERY PLAN SELECT id FROM steps WHERE path = :path"),
+            {"path": str(workflow.path)},
+        ).all()
+    assert "ix_steps_path" in " ".join(row[-1] for row in plan)
+
+
+def test_load_from_columns(db_path, workflow):
+    """
+    Test workflows written with add_workflow rebuild without pickles, from any node
+    """
+    database.add_workflow(db_path=db_path, wf=workflow)
+    with database.session_scope(db_path) as session:
+        assert session.query(database.Step).filter(database.Step.step.is_not(None)).count() == 0
+
+    wf = database.query_step_by_uuid(db_path=db_path, uuid=workflow.uuid)
+    assert [s.uuid for s in steps.iter_steps(wf)] == [
+        s.uuid for s in steps.iter_steps(workflow)
+    ]
+    assert isinstance(wf, steps.Workflow)
+    assert wf.steps[0].steps[0].scheduler.ppn == workflow.steps[0].steps[0].scheduler.ppn
+
+    sub = workflow.steps[2]
+    loaded = database.query_step_by_path(db_path=db_path, path=str(sub.path))
+    assert [s.name for s in loaded.steps] == [s.name for s in sub.steps]
+    assert isinstance(loaded.steps[0], steps.Task)
+
+
+def test_upsert_pickled_step(db_path, workflow):
+    """
+    Test upserted columns are overlaid on steps loaded from a pickle
+    """
+    database.add_step(db_path=db_path, step=workflow)
+    task = workflow.steps[1].steps[0]
+    task.status = "failed"
+    database.upsert_steps(db_path=db_path, stps=[task])
+
+    wf = database.query_step_by_uuid(db_path=db_path, uuid=workflow.uuid)
+    assert wf.steps[1].steps[0].status == "failed"
+
+
+def test_scalar_columns():
+    """
+    Test the pickled step is deferred and left out of listing queries
+    """
+    names = [column.name for column in database.scalar_columns(database.Step)]
+    assert "step" not in names
+    assert {"id", "name", "status", "path", "ctime", "mtime"} <= set(names)
+    assert "steps.step" not in str(database.select_scalars(database.Step))
+
+
+@pytest.mark.parametrize(
+    ("window", "delta"),
+    [
+        ("2h", datetime.timedelta(hours=2)),
+        ("last 30m", datetime.timedelta(minutes=30)),
+        ("1.5d", datetime.timedelta(days=1.5)),
+        (" 10 S ", datetime.timedelta(seconds=10)),
+    ],
+)
+def test_parse_window(window, delta):
+    """
+    Test relative time windows
+    """
+    assert database.parse_window(window) == delta
+
+
+def test_parse_window_invalid():
+    """
+    Test unknown windows are rejected
+    """
+    with pytest.raises(ValueError, match="not recognised"):
+        database.parse_window("yesterday")
+
+
+def test_time_range_clauses(db_path, workflow):
+    """
+    Test time ranges select on the raw (indexed) column
+    """
+    database.add_workflow(db_path=db_path, wf=workflow)
+    now = datetime.datetime.now()
+    day = now.date().isoformat()
+
+    def count(**kwargs):
+        clauses = database.time_range_clauses(database.Step.mtime, **kwargs)
+        query = sqlalchemy.select(sqlalchemy.func.count()).where(*clauses)
+        with database.session_scope(db_path) as session:
+            return session.execute(query.select_from(database.Step)).scalar()
+
+    nsteps = len(list(steps.iter_steps(workflow)))
+    assert count(start=day, end=day) == nsteps
+    assert count(window="1h", now=now) == nsteps
+    assert count(end=day.replace(day[:4], "2000")) == 0
+    assert "strftime" not in str(database.time_range_clauses(database.Step.mtime, start=day)[0])
+
+
+def test_query_steps_modified_since(db_path, workflow):
+    """
+    Test only rows modified at or after the given time are returned
+    """
+    database.add_workflow(db_path, workflow)
+    task = workflow.steps[1].steps[0]
+    task.mtime = datetime.datetime.now() + datetime.timedelta(hours=1)
+    database.upsert_steps(db_path, [task])
+
+    rows = database.query_steps_modified_since(db_path, task.mtime)
+    assert [row["id"] for row in rows] == [task.uuid]
+    assert set(rows[0].keys()) == {"id", *steps.VOLATILE_COLUMNS}
+    assert len(database.query_steps_modified_since(db_path)) == len(list(steps.iter_steps(workflow)))
+
+
+def test_sessionmaker_first(tmp_path):
+    """
+    Test a session factory can be created before the engine, in a fresh process
+    """
+    fname = f"{database.RDBMS}:///{tmp_path / 'test.db'}"
+    database._ENGINES.pop(fname, None)
+    database._SESSIONMAKERS.pop(fname, None)
+    try:
+        assert database.get_sessionmaker(fname).kw["bind"] is database.get_engine(fname)
+    finally:
+        database.dispose_engines(fname)
+
+
+def test_sqlite_pragmas(db_path):
+    """
+    Test SQLite databases are set up in WAL mode with tuned connections
+    """
+    with database.get_engine(db_path).connect() as conn:
+
+        def pragma(name):
+            return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("busy_timeout") == database.BUSY_TIMEOUT
+    assert database.set_journal_mode("sqlite://") == "memory"
+
+
+def test_checkpoint(db_path, workflow):
+    """
+    Test a truncating checkpoint empties the write-ahead log
+    """
+    database.add_workflow(db_path=db_path, wf=workflow)
+    wal = f"{db_path.removeprefix(f'{database.RDBMS}:///')}-wal"
+    assert os.path.getsize(wal) > 0
+    busy, _, _ = database.checkpoint(db_path, mode="truncate")
+    assert busy == 0
+    assert os.path.getsize(wal) == 0
+    with pytest.raises(Exception, match="not recognised"):
+        database.checkpoint(db_path, mode="later")
+
+
+def test_concurrent_readers(db_path, workflow):
+    """
+    Test readers (ORM and sqlite3) keep loading whole workflows while a writer
+    commits status updates to the same file
+    """
+    database.add_workflow(db_path=db_path, wf=workflow)
+    nsteps = len(list(steps.iter_steps(workflow)))
+    tasks = [step for step in steps.iter_steps(workflow) if step.type == "task"]
+    done = threading.Event()
+    errors = []
+    reads = [0] * 4
+
+    def write():
+        try:
+            for i in range(50):
+                for task in tasks:
+                    task.status = "running" if i % 2 else "completed"
+                    task.mtime = datetime.datetime.now()
+                database.upsert_steps(db_path=db_path, stps=tasks)
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            done.set()
+
+    def read(reader):
+        backend = fastdb if reader % 2 else database
+        try:
+            while not done.is_set() or reads[reader] == 0:
+                wf = backend.query_step_by_uuid(db_path=db_path, uuid=workflow.uuid)
+                assert len(list(steps.iter_steps(wf))) == nsteps
+                reads[reader] += 1
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=write)]
+    threads += [threading.Thread(target=read, args=(reader,)) for reader in range(len(reads))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert all(reads)
+    assert database.query_step_by_uuid(db_path=db_path, uuid=tasks[0].uuid).status == "running"
+
+
+def test_migrate_requires_steps_table(tmp_path, capsys):
+    """
+    Test migrating a file without a steps table fails with a clear error
+    """
+    fname = f"{database.RDBMS}:///{tmp_path / 'other.db'}"
+    with database.get_engine(fname).begin() as conn:
+        conn.execute(sqlalchemy.text("CREATE TABLE other (id INTEGER PRIMARY KEY)"))
+    with pytest.raises(SystemExit):
+        database.main([str(tmp_path / "other.db")])
+    assert 'no "steps" table' in capsys.readouterr().err
+    with pytest.raises(Exception, match="not a steps database"):
+        database.migrate_database(fname)
+    database.dispose_engines(fname)
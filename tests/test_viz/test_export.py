@@ -0,0 +1,106 @@
+""" 
+Test machine-readable table output
+"""
+
+import csv
+import json
+
+import pytest
+
+import viz.export as export
+import viz.steps as steps
+import viz.table as table
+
+
+def _expected(workflow):
+    """
+    (name, status, path, uuid) of every step shown in the table
+    """
+    return [
+        [step.name, step.status, str(step.path), step.uuid.hex]
+        for step in list(steps.iter_steps(workflow))[1:]
+    ]
+
+
+@pytest.mark.parametrize("fmt", ["csv", "tsv", "jsonl"])
+def test_export(tmp_path, workflow, fmt):
+    """
+    Test each text format holds every row of the table
+    """
+    fname = tmp_path / f"test.{fmt}"
+    export.export(workflow, fmt, output=fname, columns=["name", "status", "path", "uuid", "ctime"])
+
+    with open(fname, newline="") as fobj:
+        if fmt == "jsonl":
+            rows = [json.loads(line) for line in fobj]
+            keys = list(rows[0])
+            rows = [list(row.values()) for row in rows]
+        else:
+            rows = list(csv.reader(fobj, delimiter="\t" if fmt == "tsv" else ","))
+            keys, rows = rows[0], rows[1:]
+
+    assert keys == ["name", "status", "path", "uuid", "ctime"]
+    assert [row[:4] for row in rows] == _expected(workflow)
+    assert rows[0][4] == workflow.steps[0].ctime.isoformat()
+
+
+def test_export_window(capsys, workflow):
+    """
+    Test offset/limit and stdout output through the CLI
+    """
+    export.export(workflow, "csv", columns=["name", "scheduler"], offset=2, limit=3)
+    rows = list(csv.reader(capsys.readouterr().out.splitlines()))
+    assert rows[0] == ["name", *export.SCHEDULER_FIELDS]
+    expected = list(steps.iter_steps(workflow))[3:6]
+    assert [row[0] for row in rows[1:]] == [step.name for step in expected]
+    assert rows[1][3] == str(expected[0].scheduler.nodes)
+
+
+def test_export_unscheduled(tmp_path, workflow):
+    """
+    Test steps without a scheduler have null scheduler fields, and times match isoformat
+    """
+    workflow.steps[0].steps[0].ctime = workflow.steps[0].steps[0].ctime.replace(microsecond=0)
+    workflow.steps[0].steps[1].ctime = workflow.steps[0].steps[1].ctime.replace(microsecond=1)
+    fname = tmp_path / "test.jsonl"
+    export.export(workflow, "jsonl", output=fname, columns=["ctime", "scheduler"])
+    rows = [json.loads(line) for line in fname.read_text().splitlines()]
+
+    expected = list(steps.iter_steps(workflow))[1:]
+    assert [row["ctime"] for row in rows] == [step.ctime.isoformat() for step in expected]
+    for row, step in zip(rows, expected):
+        if step.scheduler is None:
+            assert [row[field] for field in export.SCHEDULER_FIELDS] == [None] * 5
+        else:
+            assert row["nodes"] == step.scheduler.nodes and row["ppn"] == step.scheduler.ppn
+    assert any(step.scheduler is None for step in expected)
+
+    export.export(workflow, "csv", output=tmp_path / "test.csv", columns=["name", "scheduler"])
+    with open(tmp_path / "test.csv", newline="") as fobj:
+        row = list(csv.reader(fobj))[1]
+    assert workflow.steps[0].scheduler is None and row == [workflow.steps[0].name, "", "", "", "", ""]
+
+
+def test_table_format(tmp_path, workflow):
+    """
+    Test wf-table --format writes the file instead of a rich table
+    """
+    steps.dump_workflow_pickle(workflow, tmp_path / "test.pkl")
+    output = tmp_path / "out.jsonl"
+    table.main(
+        argv=[
+            "--source", "pkl", "--fname", str(tmp_path / "test.pkl"),
+            "--uuid", workflow.uuid.hex, "--format", "jsonl", "--output", str(output),
+        ]
+    )
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [row["uuid"] for row in rows] == [row[3] for row in _expected(workflow)]
+
+
+def test_parquet_requires_pyarrow(monkeypatch, workflow, tmp_path):
+    """
+    Test a helpful error without pyarrow
+    """
+    monkeypatch.setattr(export, "pyarrow", None)
+    with pytest.raises(Exception, match="pip install pyarrow"):
+        export.export(workflow, "parquet", output=tmp_path / "test.parquet", columns=["name"])
@@ -0,0 +1,112 @@
+"""
+Test read-only SQLite fast path
+"""
+
+import sqlite3
+
+import pytest
+
+import viz.database as database
+import viz.fastdb as fastdb
+import viz.steps as steps
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """
+    A fresh database URL, disposed of after the test
+    """
+    fname = f"{database.RDBMS}:///{tmp_path / 'test.db'}"
+    database.setup_database(fname)
+    yield fname
+    database.dispose_engines(fname)
+
+
+def _fields(wf):
+    """
+    Comparable fields of every step, in pre-order
+    """
+    return [
+        (
+            step.uuid,
+            step.name,
+            step.status,
+            step.path,
+            step.ctime,
+            step.mtime,
+            type(step),
+            step.scheduler.__getstate__() if step.scheduler else None,
+        )
+        for step in steps.iter_steps(wf)
+    ]
+
+
+def test_columns():
+    """
+    Test the shared column names match the ORM model
+    """
+    assert steps.COLUMNS == tuple(column.name for column in database.scalar_columns(database.Step))
+    assert set(steps.VOLATILE_COLUMNS) <= set(steps.COLUMNS)
+
+
+@pytest.mark.parametrize("pickle", [False, True])
+def test_matches_orm(db_path, workflow, pickle, monkeypatch):
+    """
+    Test steps load the same as through the ORM, from columns or a pickle
+    """
+    if pickle:
+        database.add_step(db_path=db_path, step=workflow)
+        tasks = [workflow.steps[1].steps[0], workflow.steps[-1].steps[-1]]
+        for task in tasks:
+            task.status = "failed"
+        database.upsert_steps(db_path=db_path, stps=tasks)
+        # Volatile columns are read in several batches
+        monkeypatch.setattr(fastdb, "VOLATILE_BATCH", 3)
+    else:
+        database.add_workflow(db_path=db_path, wf=workflow)
+
+    expected = database.query_step_by_uuid(db_path=db_path, uuid=workflow.uuid)
+    loaded = fastdb.query_step_by_uuid(db_path=db_path, uuid=workflow.uuid)
+    assert _fields(loaded) == _fields(expected)
+    if pickle:
+        assert loaded.steps[1].steps[0].status == loaded.steps[-1].steps[-1].status == "failed"
+
+    # Only the root has a row when pickled
+    sub = workflow if pickle else workflow.steps[2]
+    expected = database.query_step_by_path(db_path=db_path, path=str(sub.path))
+    loaded = fastdb.query_step_by_path(db_path=db_path, path=str(sub.path))
+    assert _fields(loaded) == _fields(expected)
+
+    assert fastdb.query_step_by_uuid(db_path=db_path, uuid=steps.Task("x", "pending").uuid) is None
+    assert fastdb.query_step_by_path(db_path=db_path, path="/missing") is None
+
+
+def test_read_only(db_path, tmp_path):
+    """
+    Test connections cannot write, nor create a missing database
+    """
+    with fastdb.connect(db_path) as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM steps")
+    with pytest.raises(sqlite3.OperationalError):
+        with fastdb.connect(f"sqlite:///{tmp_path / 'missing.db'}"):
+            pass
+    assert not (tmp_path / "missing.db").exists()
+
+
+@pytest.mark.parametrize(
+    ("url", "supported"),
+    [
+        ("sqlite:///orchestrator.db", True),
+        ("sqlite:////abs/orchestrator.db", True),
+        ("sqlite://", False),
+        ("sqlite:///:memory:", False),
+        ("sqlite:///orchestrator.db?timeout=5", False),
+        ("postgresql://host/db", False),
+    ],
+)
+def test_supported(url, supported):
+    """
+    Test only plain SQLite file URLs take the fast path
+    """
+    assert fastdb.supported(url) is supported
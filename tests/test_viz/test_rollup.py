@@ -0,0 +1,125 @@
+""" 
+Test workflow status roll-up
+"""
+
+import collections
+
+import numpy as np
+import pytest
+
+import viz.database as database
+import viz.rollup as rollup
+import viz.steps as steps
+
+
+def _expected(step):
+    """
+    Status of a step by the roll-up rules, recursing over the object tree
+    """
+    if not isinstance(step, steps.Workflow) or not step.steps:
+        return step.status
+    children = [_expected(child) for child in step.steps]
+    if "failed" in children:
+        return "failed"
+    for status in ("completed", "unstarted"):
+        if all(child == status for child in children):
+            return status
+    for status in ("running", "pending"):
+        if status in children:
+            return status
+    return "running"
+
+
+def _workflows(step):
+    """
+    Every workflow at or below a step
+    """
+    if isinstance(step, steps.Workflow):
+        yield step
+        for child in step.steps:
+            yield from _workflows(child)
+
+
+@pytest.mark.parametrize(
+    ("children", "status"),
+    [
+        ([], "pending"),
+        (["completed", "failed", "running"], "failed"),
+        (["completed", "completed"], "completed"),
+        (["unstarted", "unstarted"], "unstarted"),
+        (["completed", "pending", "running"], "running"),
+        (["completed", "pending"], "pending"),
+        (["completed", "unstarted"], "running"),
+    ],
+)
+def test_derive_status(children, status):
+    """
+    Test the roll-up rules
+    """
+    counts = np.zeros((1, len(steps.STATUSES)), dtype=np.int64)
+    for child in children:
+        counts[0, steps.status_code(child)] += 1
+    current = np.array([steps.status_code("pending")], dtype=np.int8)
+    assert steps.STATUSES[rollup.derive_status(counts, current)[0]] == status
+
+
+def test_recompute():
+    """
+    Test every workflow status and count is derived from its tasks
+    """
+    sweep = steps.make_tmp_sweep(n_workflows=10, n_tasks=5)
+    sweep.steps[3].steps[2] = steps.Workflow("nested", steps=[steps.Task("a", "failed")])
+    roll = rollup.StatusRollup(sweep)
+    for wf in _workflows(sweep):
+        assert wf.status == _expected(wf)
+
+    tasks = [task for model in sweep.steps for task in model.steps if task.type == "task"]
+    tasks.append(sweep.steps[3].steps[2].steps[0])
+    assert roll.counts() == dict(collections.Counter(task.status for task in tasks))
+    assert roll.counts(sweep.steps[3].steps[2]) == {"failed": 1}
+
+
+def test_update(tmp_path):
+    """
+    Test a single task change only rolls up its ancestors, and reaches the database
+    """
+    wf = steps.Workflow("main", steps=[
+        steps.Workflow("model A", steps=[steps.Task("a1", "completed"), steps.Task("a2", "running")]),
+        steps.Workflow("model B", steps=[steps.Task("b1", "completed")]),
+    ])
+    wf.fix_paths()
+    for step in wf.steps:
+        step.fix_paths()
+    roll = rollup.StatusRollup(wf)
+    assert [step.status for step in (wf, *wf.steps)] == ["running", "running", "completed"]
+
+    fname = f"{database.RDBMS}:///{tmp_path / 'test.db'}"
+    database.setup_database(fname)
+    database.add_workflow(fname, wf)
+
+    task = wf.steps[0].steps[1]
+    changed = roll.update(task, "completed", db_path=fname)
+    assert changed == [task, wf.steps[0], wf]
+    assert wf.status == "completed"
+    assert roll.counts() == {"completed": 3}
+    assert roll.counts(wf.steps[0]) == {"completed": 2}
+    assert database.query_step_by_uuid(fname, wf.uuid).status == "completed"
+
+    assert roll.update(wf.steps[1].steps[0], "completed") == []
+    task = wf.steps[0].steps[0]
+    assert roll.update(task, "failed") == [task, wf.steps[0], wf]
+    assert roll.update(task, "pending") == [task, wf.steps[0], wf]
+    assert wf.steps[0].status == wf.status == "pending"
+
+    # Parent unchanged, so the roll-up stops there
+    task = wf.steps[0].steps[1]
+    assert roll.update(task, "running") == [task, wf.steps[0], wf]
+    assert roll.update(task, "failed") == [task, wf.steps[0], wf]
+    assert roll.update(wf.steps[0].steps[0], "completed") == [wf.steps[0].steps[0]]
+    assert roll.counts() == {"failed": 1, "completed": 2}
+
+    # Workflow statuses only follow their children
+    with pytest.raises(Exception, match="rolled up from its children"):
+        roll.update(wf.steps[1], "failed")
+    assert wf.steps[1].status == "completed"
+    assert roll.counts() == {"failed": 1, "completed": 2}
@@ -0,0 +1,98 @@
+""" 
+Test CLI start-up imports
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+import viz.database as database
+import viz.steps as steps
+
+
+def _importtime(argv):
+    """
+    Run a command with -X importtime
+
+    Returns:
+        imports (dict):     Module name to cumulative import time [us]
+        top (dict):         The same, for the top-level imports only
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *argv],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = {}
+    top = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                imports[name.strip()] = int(cumulative)
+                # Nested imports are indented, and counted in their parent's time
+                if not name[1:].startswith(" "):
+                    top[name.strip()] = int(cumulative)
+    return imports, top
+
+
+def _command_imports(argv):
+    """
+    Imports of a command, and their total time on top of the interpreter's own
+    start-up
+
+    Returns:
+        imports (dict):     Module name to cumulative import time [us]
+        total (int):        Import time of the command [us]
+    """
+    startup, _ = _importtime(["-c", "pass"])
+    imports, top = _importtime(argv)
+    return imports, sum(value for name, value in top.items() if name not in startup)
+
+
+@pytest.mark.parametrize("module", ["viz.table", "viz.tree"])
+def test_pickle_startup(tmp_path, module):
+    """
+    Test the pickle path never loads SQLAlchemy, NumPy only once the workflow is
+    summarised, and imports within budget
+    """
+    wf = steps.make_tmp_workflow()
+    steps.dump_workflow_pickle(wf, tmp_path / "test.pkl")
+    imports, total = _command_imports(
+        ["-m", module, "--source", "pkl", "--fname", str(tmp_path / "test.pkl"), "--uuid", wf.uuid.hex]
+    )
+
+    assert [name for name in imports if name.split(".")[0] == "sqlalchemy"] == []
+    # The command's imports take 150-180 ms, of which rich ~60 ms and NumPy (for
+    # the summary) ~80 ms; SQLAlchemy alone would add ~350 ms
+    assert total < 300_000, total
+
+    imports, _ = _importtime(["-c", f"import {module}"])
+    assert [name for name in imports if name.split(".")[0] in ("sqlalchemy", "numpy")] == []
+
+
+def test_database_startup(tmp_path):
+    """
+    Test an SQLite database is read without importing SQLAlchemy
+    """
+    wf = steps.make_tmp_workflow()
+    db_path = f"{database.RDBMS}:///{tmp_path / 'test.db'}"
+    database.setup_database(db_path)
+    database.add_workflow(db_path=db_path, wf=wf)
+    database.dispose_engines(db_path)
+    imports, _ = _importtime(
+        ["-m", "viz.table", "--source", "db", "--fname", str(tmp_path / "test.db"), "--uuid", wf.uuid.hex]
+    )
+    assert "viz.fastdb" in imports
+    assert [name for name in imports if name.split(".")[0] == "sqlalchemy"] == []
+
+
+def test_rollup_startup():
+    """
+    Test the roll-up and the dummy workflows do not import SQLAlchemy
+    """
+    imports, _ = _importtime(["-c", "import viz.steps as steps; steps.make_tmp_workflow()"])
+    assert "viz.rollup" in imports
+    assert [name for name in imports if name.split(".")[0] == "sqlalchemy"] == []
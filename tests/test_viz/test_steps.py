@@ -0,0 +1,350 @@
+""" 
+Test Step/Workflow objects
+"""
+
+import datetime
+import io
+import json
+import pathlib
+import pickle
+import subprocess
+import sys
+import uuid
+
+import pytest
+
+import viz.jsonstream as jsonstream
+import viz.settings as settings
+import viz.steps as steps
+
+
+def test_index_find(workflow):
+    """
+    Test steps at any depth are found by UUID and path
+    """
+    task = workflow.steps[3].steps[1]
+    assert workflow.index.find(uuid=task.uuid) is task
+    assert workflow.index.find(path=task.path) is task
+    assert workflow.index.find(uuid=workflow.uuid) is workflow
+    assert workflow.index.find() is workflow
+    assert len(workflow.index) == 1 + 5 + 5 * 5 + 1
+
+
+def test_index_parents(workflow):
+    """
+    Test parent pointers and depths
+    """
+    task = workflow.steps[3].steps[1]
+    assert workflow.index.parent(task) is workflow.steps[3]
+    assert list(workflow.index.ancestors(task)) == [workflow.steps[3], workflow]
+    assert workflow.index.depth(task) == 2
+    assert workflow.index.parent(workflow) is None
+
+
+def test_index_order(workflow):
+    """
+    Test steps are kept in pre-order, the table's row order
+    """
+    index = workflow.index
+    assert index.steps == list(steps.iter_steps(workflow))
+    assert all(index.steps[index.rows[step.uuid]] is step for step in index.steps)
+    assert index._by_path is None
+
+
+def test_index_duplicate_path(workflow):
+    """
+    Test ambiguous paths raise
+    """
+    workflow.steps[0].path = workflow.steps[1].path
+    workflow.reindex()
+    with pytest.raises(Exception, match="More than one object"):
+        workflow.index.find(path=workflow.steps[1].path)
+
+
+def test_index_not_pickled(workflow):
+    """
+    Test the cached index is rebuilt rather than pickled
+    """
+    assert workflow.index is workflow.index
+    loaded = pickle.loads(pickle.dumps(workflow))
+    assert loaded._index is None
+    assert loaded.index.find(uuid=workflow.steps[0].uuid).name == workflow.steps[0].name
+
+
+def test_load_wf_nested(tmp_path, workflow):
+    """
+    Test load_wf finds nested steps in pickles
+    """
+    fname = tmp_path / "test.pkl"
+    steps.dump_workflow_pickle(workflow, fname)
+    task = workflow.steps[2].steps[-1]
+    args = settings.get_args(["--source", "pkl", "--fname", str(fname), "--uuid", task.uuid.hex])
+    assert settings.load_wf(args).uuid == task.uuid
+
+
+@pytest.mark.parametrize(
+    ("command", "argv"),
+    [
+        ("table", ["--max-depth", "1"]),
+        ("table", ["--collapse-completed"]),
+        ("tree", ["--format", "csv"]),
+        ("tree", ["--pager"]),
+        (None, ["--offset", "1"]),
+        ("table", ["--offset", "-1"]),
+        ("tree", ["--limit", "-1"]),
+        ("tree", ["--max-depth", "-1"]),
+        ("table", ["--output", "out.csv"]),
+        ("table", ["--format", "csv", "--watch"]),
+        ("table", ["--watch", "--pager"]),
+        ("tree", ["--source", "json", "--watch"]),
+        ("tree", ["--watch", "--refresh", "0"]),
+    ],
+)
+def test_get_args_refused(command, argv):
+    """
+    Test options of other commands, negative counts and ignored combinations are refused
+    """
+    with pytest.raises(SystemExit):
+        settings.get_args(argv, command)
+
+
+def test_get_args(tmp_path):
+    """
+    Test each command gets its own options
+    """
+    args = settings.get_args(["--offset", "2", "--max-depth", "0"], "tree")
+    assert (args.offset, args.limit, args.max_depth, args.collapse_completed) == (2, None, 0, False)
+    assert not hasattr(args, "format")
+    args = settings.get_args(["--format", "csv", "--output", str(tmp_path / "out.csv")], "table")
+    assert (args.format, args.stream, args.pager, args.watch) == ("csv", False, False, False)
+    assert not hasattr(args, "max_depth")
+
+
+def _flatten(step):
+    """
+    (uuid, name, status, path) of every step, in pre-order
+    """
+    rows = [(step.uuid, step.name, step.status, str(step.path))]
+    for child in getattr(step, "steps", []):
+        rows.extend(_flatten(child))
+    return rows
+
+
+def test_json_round_trip(tmp_path, workflow):
+    """
+    Test the JSON writer and reader round-trip a whole workflow
+    """
+    fname = tmp_path / "test.json"
+    steps.dump_workflow_json(workflow, fname)
+    loaded = steps.load_workflow_json(fname)
+    assert _flatten(loaded) == _flatten(workflow)
+    assert loaded.steps[0].steps[2].scheduler.ppn == workflow.steps[0].steps[2].scheduler.ppn
+    assert loaded.steps[0].ctime == workflow.steps[0].ctime
+
+
+@pytest.mark.parametrize("key", ["uuid", "path"])
+def test_json_sub_tree(tmp_path, workflow, key):
+    """
+    Test sub-trees are found at any depth when streaming
+    """
+    fname = tmp_path / "test.json"
+    steps.dump_workflow_json(workflow, fname)
+    for step in (workflow, workflow.steps[4], workflow.steps[2].steps[-1]):
+        loaded = steps.load_workflow_json(fname, **{key: getattr(step, key)})
+        assert _flatten(loaded) == _flatten(step)
+    assert steps.load_workflow_json(fname, path="/does/not/exist") is None
+
+
+def test_json_keys_out_of_order(tmp_path):
+    """
+    Test hand-written files with "steps" before the identifying keys still load
+    """
+    task = steps.make_tmp_task("a task", "running")
+    wf = steps.Workflow("wf", steps=[task])
+    node = steps.step_to_dict(wf)
+    node = {"steps": [steps.step_to_dict(task)], **node}
+    fname = tmp_path / "test.json"
+    fname.write_text(json.dumps({"format": steps.JSON_FORMAT, "version": steps.JSON_VERSION, "workflow": node}))
+    assert steps.load_workflow_json(fname, uuid=task.uuid).name == "a task"
+    assert steps.load_workflow_json(fname, uuid=wf.uuid).steps[0].uuid == task.uuid
+
+
+@pytest.mark.parametrize("key", [None, "uuid", "path"])
+def test_json_header(tmp_path, workflow, key):
+    """
+    Test other documents and newer versions are refused
+    """
+    fname = tmp_path / "test.json"
+    steps.dump_workflow_json(workflow, fname)
+    document = json.loads(fname.read_text())
+    kwargs = {} if key is None else {key: getattr(workflow.steps[1], key)}
+
+    for header, error in (
+        ({"format": "something-else"}, "Not a workflow JSON file"),
+        ({"format": None}, "Not a workflow JSON file"),
+        ({"version": steps.JSON_VERSION + 1}, "newer than the supported version"),
+    ):
+        fname.write_text(json.dumps({**document, **header}))
+        with pytest.raises(Exception, match=error):
+            steps.load_workflow_json(fname, **kwargs)
+
+
+def test_json_duplicate_path(tmp_path, workflow):
+    """
+    Test ambiguous paths raise, like the pickle and database loaders
+    """
+    workflow.steps[3].steps[4].path = workflow.steps[1].steps[0].path
+    fname = tmp_path / "test.json"
+    steps.dump_workflow_json(workflow, fname)
+    with pytest.raises(Exception, match="More than one object"):
+        steps.load_workflow_json(fname, path=workflow.steps[1].steps[0].path)
+    assert steps.load_workflow_json(fname, uuid=workflow.steps[3].steps[4].uuid).name == "step 5"
+
+
+@pytest.mark.parametrize("buffer_size", [1, 2, 3, 7, 1024])
+def test_basic_parse_fallback(buffer_size):
+    """
+    Test the stdlib tokenizer across chunk boundaries
+    """
+    document = {
+        "a": [1, -2.5e3, True, False, None, "x\"y\u00e9"],
+        "b": {"c": [], "d": {}, "e": 10},
+        "f": "",
+    }
+    events = iter(jsonstream._basic_parse(io.StringIO(json.dumps(document)), buffer_size))
+    assert jsonstream.build_value(events, *next(events)) == document
+
+
+def test_slots(workflow):
+    """
+    Test steps are slotted but keep their attribute API
+    """
+    task = workflow.steps[0].steps[0]
+    assert not hasattr(task, "__dict__")
+    assert not hasattr(task.scheduler, "__dict__")
+    assert isinstance(task.uuid, uuid.UUID)
+    assert isinstance(task.ctime, datetime.datetime)
+    assert task.type == "task" and workflow.type == "workflow"
+
+    now = datetime.datetime.now()
+    task.mtime = now
+    task.status = "running"
+    assert task.mtime == now
+    assert task.status == "running"
+    task.status = "a new status"
+    assert task.status == "a new status"
+    assert steps.status_code("a new status") == steps.STATUSES.index("a new status")
+
+
+def test_relative_paths(workflow):
+    """
+    Test linked paths are stored relative to the parent but, as plain attributes
+    did, stay put when the parent's path changes
+    """
+    model = workflow.steps[0]
+    task = model.steps[0]
+    # make_tmp_workflow moves the models below main after fixing their tasks' paths
+    assert model.path == workflow.path / "model_a"
+    assert task.path == pathlib.Path().resolve() / "model_a" / "step_1"
+
+    model.fix_paths()
+    assert task.path == model.path / "step_1"
+    assert task.parent is model and task.path_segment == "step_1"
+
+    model.path = pathlib.Path("/elsewhere/model")
+    assert model.path == pathlib.Path("/elsewhere/model")
+    assert task.path == workflow.path / "model_a" / "step_1"
+    model.fix_paths()
+    assert task.path == pathlib.Path("/elsewhere/model/step_1")
+    task.path = "/somewhere/else"
+    assert task.path == pathlib.Path("/somewhere/else")
+    assert task.path_segment is None
+
+
+def test_stored_times(workflow):
+    """
+    Test naive times are exposed as stored microseconds, and aware ones are not
+    """
+    task = workflow.steps[0].steps[0]
+    task.ctime = datetime.datetime(2025, 1, 1, 0, 0, 1)
+    assert task.ctime_micros == 1_735_689_601_000_000
+    task.mtime = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    assert task.mtime_micros is None and task.mtime.tzinfo is not None
+    task.mtime = None
+    assert task.mtime_micros is None
+
+
+def test_cached_attributes(workflow):
+    """
+    Test workflow paths and UUIDs are stored objects rather than rebuilt per access
+    """
+    model = workflow.steps[0]
+    model.fix_paths()
+    assert model.path is model.path
+    assert model.uuid is model.uuid
+    steps._link(workflow.steps[1], model.steps[0])
+    assert model.steps[0].path == workflow.path / "model_a" / "step_1"
+
+
+def test_pickle_round_trip(workflow):
+    """
+    Test slotted steps pickle, including relative paths
+    """
+    workflow.steps[0].fix_paths()
+    loaded = pickle.loads(pickle.dumps(workflow))
+    assert _flatten(loaded) == _flatten(workflow)
+    assert loaded.steps[0].steps[0].scheduler.nodes == workflow.steps[0].steps[0].scheduler.nodes
+    assert loaded.steps[0].steps[0].scheduler.type == workflow.steps[0].steps[0].scheduler.type
+    assert isinstance(loaded.steps[0].steps[0]._path, str)
+
+    # A pickled child does not pull in its parent
+    task = workflow.steps[0].steps[0]
+    loaded = pickle.loads(pickle.dumps(task))
+    assert loaded._parent is None
+    assert loaded.path == task.path
+
+
+def test_pickled_status(tmp_path):
+    """
+    Test registered statuses survive a pickle loaded in a fresh process, whatever
+    its registration order
+    """
+    task = steps.Task("x", "cancelled")
+    steps.dump_workflow_pickle(task, tmp_path / "test.pkl")
+    script = (
+        "import pickle, sys; import viz.steps as steps; steps.status_code('held'); "
+        "print(pickle.load(open(sys.argv[1], 'rb')).status)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script, str(tmp_path / "test.pkl")],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=pathlib.Path(__file__).resolve().parents[2],
+    )
+    assert result.stdout.strip() == "cancelled"
+
+
+def test_legacy_pickle_state():
+    """
+    Test __dict__ state from pickles of the unslotted classes is restored
+    """
+    state = {
+        "name": "old",
+        "status": "completed",
+        "path": pathlib.Path("/old"),
+        "uuid": uuid.uuid4(),
+        "ctime": datetime.datetime(2025, 1, 1),
+        "mtime": datetime.datetime(2025, 1, 2),
+        "scheduler": None,
+        "parent_flow_type": "serial",
+        "steps": [],
+        "flow_type": "serial",
+        "type": "workflow",
+    }
+    wf = steps.Workflow.__new__(steps.Workflow)
+    wf.__setstate__(state)
+    assert wf.status == "completed"
+    assert wf.path == pathlib.Path("/old")
+    assert wf.mtime == datetime.datetime(2025, 1, 2)
+    assert wf.index.find() is wf
@@ -2,9 +2,14 @@
 Test Table view
 """
 
+import io
+import re
+
 import pytest
+import rich.console
 
 import viz.database as database
+import viz.settings as settings
 import viz.steps as steps
 import viz.table as table
 
@@ -16,8 +21,8 @@ import viz.table as table
         ("db", "test.db", "path"),
         ("pkl", "test.pkl", "uuid"),
         ("pkl", "test.pkl", "path"),
-        #  ("json", "test.json", "uuid"),
-        #  ("json", "test.json", "path"),
+        ("json", "test.json", "uuid"),
+        ("json", "test.json", "path"),
     ],
 )
 def test_table(tmp_path, workflow, source, path, key):
@@ -47,3 +52,95 @@ def test_table(tmp_path, workflow, source, path, key):
     table.main(
         argv=["--source", source, "--fname", str(tmp_path / path), f"--{key}", value]
     )
+
+
+def _names(output):
+    """
+    Step names in printed table output, in order
+    """
+    names = []
+    for line in output.splitlines():
+        cells = re.split(r"\s{2,}", line.replace("│", "  ").strip())
+        if len(cells) > 1 and cells[1] in steps.STATUSES:
+            names.append(cells[0])
+    return names
+
+
+@pytest.mark.parametrize(("offset", "limit"), [(0, None), (3, 10), (30, None)])
+def test_stream(workflow, offset, limit):
+    """
+    Test streamed chunks hold the same rows as the full table
+    """
+    expected = [step.name for step in steps.iter_steps(workflow)][1 + offset :]
+    expected = expected[:limit] if limit is not None else expected
+
+    view = table.Table(
+        workflow, columns=["name", "status"], show=False, offset=offset, limit=limit, stream=True
+    )
+    console = rich.console.Console(file=io.StringIO(), width=200)
+    view.print_stream(console, chunk_size=4)
+    output = console.file.getvalue()
+    assert _names(output) == expected
+    assert output.count("Status") == 1
+
+    view = table.Table(workflow, columns=["name", "status"], show=False, offset=offset, limit=limit)
+    console = rich.console.Console(file=io.StringIO(), width=200)
+    console.print(view.renderable())
+    assert _names(console.file.getvalue()) == expected
+
+
+def test_pager(workflow, capfd, monkeypatch):
+    """
+    Test streamed output is piped through the pager
+    """
+    monkeypatch.setenv("PAGER", "cat")
+    table.Table(workflow, columns=["name", "status"], pager=True)
+    output = re.sub(r"\x1b\[[0-9;]*m", "", capfd.readouterr().out)
+    assert _names(output) == [step.name for step in steps.iter_steps(workflow)][1:]
+
+
+def test_compile_formatters(workflow):
+    """
+    Test compiled formatters match formatting each cell from the step
+    """
+    columns = ["name", "status", "path", "uuid", "ctime", "mtime", "scheduler"]
+    formatters = table.compile_formatters(columns)
+    for step in list(steps.iter_steps(workflow))[1:]:
+        assert [formatter(step) for formatter in formatters] == [
+            step.name,
+            f"[{settings.STATUS2COLOUR[step.status]}]{step.status}",
+            str(step.path),
+            step.uuid.hex,
+            step.ctime.strftime("%Y-%m-%d %H:%M:%S"),
+            step.mtime.strftime("%Y-%m-%d %H:%M:%S"),
+            step.scheduler.table if step.scheduler else None,
+        ]
+
+
+def test_registered_status():
+    """
+    Test statuses without a colour are formatted in white
+    """
+    (formatter,) = table.compile_formatters(["status"])
+    assert formatter(steps.Task("x", "cancelled")) == "[white]cancelled"
+
+
+def test_refresh_paths(workflow):
+    """
+    Test refreshed rows show the paths of moved workflows rather than cached prefixes
+    """
+    def fix_paths():
+        for step in steps.iter_steps(workflow):
+            if isinstance(step, steps.Workflow):
+                step.fix_paths()
+
+    fix_paths()
+    shown = table.Table(workflow, show=False, columns=["name", "path"])
+    stps = list(steps.iter_steps(workflow))[1:]
+    assert [shown.format_row(step)[1] for step in stps] == [str(step.path) for step in stps]
+
+    workflow.path = workflow.path.parent / "moved"
+    fix_paths()
+    shown.refresh(stps)
+    assert [shown.format_row(step)[1] for step in stps] == [str(step.path) for step in stps]
+    assert all("moved" in str(step.path) for step in stps)
@@ -3,6 +3,7 @@ Test Tree view
 """
 
 import pytest
+import rich.text
 
 import viz.database as database
 import viz.steps as steps
@@ -16,8 +17,8 @@ import viz.tree as tree
         ("db", "test.db", "path"),
         ("pkl", "test.pkl", "uuid"),
         ("pkl", "test.pkl", "path"),
-        #  ("json", "test.json", "uuid"),
-        #  ("json", "test.json", "path"),
+        ("json", "test.json", "uuid"),
+        ("json", "test.json", "path"),
     ],
 )
 def test_tree(tmp_path, workflow, source, path, key):
@@ -47,3 +48,89 @@ def test_tree(tmp_path, workflow, source, path, key):
     tree.main(
         argv=["--source", source, "--fname", str(tmp_path / path), f"--{key}", value]
     )
+
+
+def _labels(branch):
+    """
+    Labels of a rendered tree, in pre-order
+    """
+    labels = [branch.label]
+    for child in branch.children:
+        labels.extend(_labels(child))
+    return labels
+
+
+@pytest.mark.parametrize("pass_changed", [True, False])
+def test_refresh(workflow, pass_changed):
+    """
+    Test refreshing only re-renders the changed steps
+    """
+    view = tree.Tree(workflow, show=False)
+    task = workflow.steps[1].steps[2]
+    untouched = view.tree.children[3]
+    task.status = "failed" if task.status != "failed" else "running"
+
+    view.refresh([task] if pass_changed else None)
+    assert view.tree.children[1].children[2].label == view.label(task)
+    assert view.tree.children[3] is untouched
+    assert _labels(view.tree) == _labels(tree.Tree(workflow, show=False).tree)
+
+    # Structural change
+    workflow.steps[3].steps.append(steps.Task("extra", "pending"))
+    view.refresh([workflow.steps[3]] if pass_changed else None)
+    assert view.tree.children[3] is untouched
+    assert _labels(view.tree) == _labels(tree.Tree(workflow, show=False).tree)
+
+
+def test_registered_status(workflow):
+    """
+    Test statuses without a colour are rendered in white
+    """
+    task = workflow.steps[0].steps[0]
+    task.status = "cancelled"
+    view = tree.Tree(workflow, show=False)
+    assert view.tree.children[0].children[0].label == f"[white]{task.name}"
+
+
+def _nested():
+    """
+    main > (model A: 2 completed tasks, model B: nested workflow + failed task)
+    """
+    model_a = steps.Workflow("model A", "completed", [steps.Task("a1", "completed"), steps.Task("a2", "completed")])
+    nested = steps.Workflow("nested", "running", [steps.Task("n1", "running"), steps.Task("n2", "completed")])
+    model_b = steps.Workflow("model B", "failed", [nested, steps.Task("b1", "failed")])
+    wf = steps.Workflow("main", "failed", [model_a, model_b])
+    wf.fix_paths()
+    return wf
+
+
+@pytest.mark.parametrize(
+    ("options", "labels"),
+    [
+        ({"max_depth": 1}, ["model A (2 completed)", "model B (1 running, 1 failed, 1 completed)"]),
+        ({"max_depth": 2}, ["model A", "a1", "a2", "model B", "nested (1 running, 1 completed)", "b1"]),
+        ({"collapse_completed": True}, ["model A (2 completed)", "model B", "nested", "n1", "n2", "b1"]),
+        ({"offset": 4, "limit": 2}, ["model B", "nested", "n1"]),
+        ({"offset": 6}, ["model B", "nested", "n2", "b1"]),
+    ],
+)
+def test_window(options, labels):
+    """
+    Test depth limits, collapsing and windowing only render the visible nodes
+    """
+    view = tree.Tree(_nested(), show=False, **options)
+    rendered = [rich.text.Text.from_markup(label).plain for label in _labels(view.tree)[1:]]
+    assert rendered == labels
+
+
+def test_window_refresh():
+    """
+    Test a status change re-folds the windowed tree
+    """
+    wf = _nested()
+    view = tree.Tree(wf, show=False, collapse_completed=True)
+    assert view.nvisible == 6
+    task = wf.steps[1].steps[0].steps[0]
+    task.status = "completed"
+    view.refresh([task])
+    assert view.nvisible == 4
@@ -0,0 +1,134 @@
+""" 
+Test watch mode
+"""
+
+import argparse
+import datetime
+import io
+import types
+
+import pytest
+import rich.console
+
+import viz.database as database
+import viz.settings as settings
+import viz.table as table
+import viz.tree as tree
+import viz.watch as watch
+
+
+@pytest.mark.parametrize("view", [tree.Tree, table.Table])
+def test_watch(tmp_path, workflow, view):
+    """
+    Test changed rows are patched into the workflow and the view
+    """
+    fname = tmp_path / "test.db"
+    db_path = f"{database.RDBMS}:///{fname}"
+    database.setup_database(db_path)
+    database.add_workflow(db_path, workflow)
+
+    wf = database.query_step_by_uuid(db_path, workflow.uuid)
+    shown = view(wf, show=False)
+
+    task = workflow.steps[2].steps[1]
+    task.status = "failed" if task.status != "failed" else "running"
+    task.mtime = datetime.datetime.now() + datetime.timedelta(seconds=1)
+    database.upsert_steps(db_path, [task])
+
+    args = argparse.Namespace(source="db", fname=fname, refresh=0)
+    output = io.StringIO()
+    watch.watch(shown, args, max_iterations=2, console=rich.console.Console(file=output))
+    assert wf.index.find(uuid=task.uuid).status == task.status
+    assert task.name in output.getvalue()
+    if view is tree.Tree:
+        assert shown.tree.children[2].children[1].label == shown.label(task)
+
+
+def test_watch_rolls_up(tmp_path, workflow):
+    """
+    Test task statuses are rolled up to the shown workflows
+    """
+    fname = tmp_path / "test.db"
+    db_path = f"{database.RDBMS}:///{fname}"
+    database.setup_database(db_path)
+    database.add_workflow(db_path, workflow)
+
+    wf = database.query_step_by_uuid(db_path, workflow.uuid)
+    shown = tree.Tree(wf, show=False)
+
+    task = workflow.steps[0].steps[0]
+    task.status = "failed"
+    task.mtime = datetime.datetime.now() + datetime.timedelta(seconds=1)
+    database.upsert_steps(db_path, [task])
+
+    args = argparse.Namespace(source="db", fname=fname, refresh=0)
+    watch.watch(shown, args, max_iterations=1, console=rich.console.Console(file=io.StringIO()))
+    assert wf.status == wf.steps[0].status == "failed"
+    assert shown.tree.children[0].label == shown.label(wf.steps[0])
+
+
+def test_watch_stale_statuses(tmp_path, workflow):
+    """
+    Test stored workflow statuses lagging their tasks are rolled up before the first frame
+    """
+    model = workflow.steps[0]
+    for task in model.steps:
+        task.status = "completed"
+    model.steps[-1].status = "failed"
+    model.status = "completed"
+    fname = tmp_path / "test.db"
+    db_path = f"{database.RDBMS}:///{fname}"
+    database.setup_database(db_path)
+    database.add_workflow(db_path, workflow)
+
+    wf = database.query_step_by_uuid(db_path, workflow.uuid)
+    assert wf.steps[0].status == "completed"
+    shown = tree.Tree(wf, show=False)
+    args = argparse.Namespace(source="db", fname=fname, refresh=0)
+    watch.watch(shown, args, max_iterations=0, console=rich.console.Console(file=io.StringIO()))
+    assert wf.steps[0].status == "failed"
+    assert shown.tree.children[0].label == f"[red]{model.name}"
+
+
+def test_watch_colour(tmp_path, workflow, monkeypatch):
+    """
+    Test the console follows the colour setting
+    """
+    fname = tmp_path / "test.db"
+    db_path = f"{database.RDBMS}:///{fname}"
+    database.setup_database(db_path)
+    database.add_workflow(db_path, workflow)
+
+    consoles = []
+
+    class Console(rich.console.Console):
+        def __init__(self, **kwargs):
+            consoles.append(kwargs)
+            super().__init__(file=io.StringIO(), **kwargs)
+
+    monkeypatch.setattr(watch.rich.console, "Console", Console)
+    options = settings.Settings()
+    options.colour = None
+    shown = table.Table(database.query_step_by_uuid(db_path, workflow.uuid), options=options, show=False)
+    args = argparse.Namespace(source="db", fname=fname, refresh=0)
+    watch.watch(shown, args, max_iterations=1)
+    assert consoles == [{"color_system": None}]
+
+
+def test_watch_needs_workflow(workflow):
+    """
+    Test watch mode is refused for a task
+    """
+    args = argparse.Namespace(source="db", fname="test.db", refresh=0)
+    view = types.SimpleNamespace(wf=workflow.steps[0].steps[0])
+    with pytest.raises(Exception, match="needs a workflow"):
+        watch.watch(view, args, max_iterations=1)
+
+
+def test_watch_needs_database(workflow):
+    """
+    Test watch mode is refused for file sources
+    """
+    args = argparse.Namespace(source="pkl", fname="test.pkl", refresh=0)
+    with pytest.raises(Exception, match="only supported with a database"):
+        watch.watch(tree.Tree(workflow, show=False), args, max_iterations=1)
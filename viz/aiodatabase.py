@@ -0,0 +1,216 @@
+"""
+Asyncio counterparts of the viz.database query and insert functions
+
+Each coroutine runs its synchronous counterpart on a shared thread pool, so an
+async front-end can have many requests in flight on one process without a
+blocked worker per query. Unlike SQLAlchemy's asyncio extension this needs no
+async driver (e.g. aiosqlite), so it works with every database the synchronous
+API does; SQLite databases in WAL mode serve the concurrent reads in parallel.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import threading
+
+import viz.database as database
+import viz.fastdb as fastdb
+
+
+# Threads running database calls; no more than the engine's default connection
+# pool (5 + 10 overflow), so a thread never waits for a pooled connection
+MAX_WORKERS = 10
+
+_EXECUTOR = None
+_LOCK = threading.Lock()
+
+
+def get_executor():
+    """
+    Get the thread pool shared by the coroutines, creating it on first use
+
+    Returns:
+        executor (concurrent.futures.ThreadPoolExecutor):   Thread pool
+    """
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=MAX_WORKERS, thread_name_prefix="viz-database"
+                )
+    return _EXECUTOR
+
+
+def shutdown(wait=True):
+    """
+    Shut the shared thread pool down; it is recreated if used again
+
+    Args:
+        wait (bool):        Wait for queued calls to finish
+
+    Returns:
+        None
+    """
+    global _EXECUTOR
+    with _LOCK:
+        executor, _EXECUTOR = _EXECUTOR, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+async def run(func, *args, **kwargs):
+    """
+    Run a blocking database call on the shared thread pool
+
+    Args:
+        func (callable):    Synchronous function
+        *args:              Positional arguments
+        **kwargs:           Keyword arguments
+
+    Returns:
+        result (object):    Return value of func
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+def _reader(db_path):
+    """
+    Module to read steps with, the sqlite3 fast path for SQLite files
+
+    Args:
+        db_path (str):      Database URL
+
+    Returns:
+        module (module):    viz.fastdb or viz.database
+    """
+    return fastdb if fastdb.supported(db_path) else database
+
+
+async def setup_database(db_path=database.DB_ADDRESS):
+    """
+    Async database.setup_database
+
+    Args:
+        db_path (str):      SQLite database path
+
+    Returns:
+        None
+    """
+    await run(database.setup_database, db_path)
+
+
+async def add_step(db_path=database.DB_ADDRESS, step=None, parent=None, depth=0, position=0, pickle=True):
+    """
+    Async database.add_step
+
+    Args:
+        db_path (str):              SQLite database path
+        step (step.Step, None):     Step object
+        parent (step.Step, None):   Parent workflow
+        depth (int):                Depth below the top-level workflow
+        position (int):             Index in the parent's steps
+        pickle (bool):              Store the pickled step
+
+    Returns:
+        None
+    """
+    await run(
+        database.add_step,
+        db_path=db_path,
+        step=step,
+        parent=parent,
+        depth=depth,
+        position=position,
+        pickle=pickle,
+    )
+
+
+async def add_workflow(db_path=database.DB_ADDRESS, wf=None, batch_size=database.BATCH_SIZE, pickle=False):
+    """
+    Async database.add_workflow
+
+    Args:
+        db_path (str):              SQLite database path
+        wf (step.Workflow):         Workflow object
+        batch_size (int):           Number of rows per executemany call
+        pickle (bool):              Also store each pickled step
+
+    Returns:
+        count (int):                Number of rows inserted
+    """
+    return await run(database.add_workflow, db_path=db_path, wf=wf, batch_size=batch_size, pickle=pickle)
+
+
+async def upsert_steps(db_path=database.DB_ADDRESS, stps=None, batch_size=database.BATCH_SIZE):
+    """
+    Async database.upsert_steps
+
+    Args:
+        db_path (str):              SQLite database path
+        stps (iterable):            Step objects
+        batch_size (int):           Number of rows per executemany call
+
+    Returns:
+        count (int):                Number of rows written
+    """
+    # Consume a lazy iterable on the loop's thread, not the worker's
+    return await run(database.upsert_steps, db_path=db_path, stps=list(stps), batch_size=batch_size)
+
+
+async def query_step_by_uuid(db_path=database.DB_ADDRESS, uuid=None):
+    """
+    Async database.query_step_by_uuid, through viz.fastdb for SQLite files
+
+    Args:
+        db_path (str):              SQLite database path
+        uuid (uuid.UUID)            UUID of step to extract
+
+    Returns:
+        step (step.Step)            Retrieved step
+    """
+    return await run(_reader(db_path).query_step_by_uuid, db_path=db_path, uuid=uuid)
+
+
+async def query_step_by_path(db_path=database.DB_ADDRESS, path=None):
+    """
+    Async database.query_step_by_path, through viz.fastdb for SQLite files
+
+    Args:
+        db_path (str):              SQLite database path
+        path (pathlib.Path)         Path of the step to extract
+
+    Returns:
+        step (step.Step)            Retrieved step
+    """
+    return await run(_reader(db_path).query_step_by_path, db_path=db_path, path=path)
+
+
+async def query_steps_modified_since(db_path=database.DB_ADDRESS, since=None):
+    """
+    Async database.query_steps_modified_since
+
+    Args:
+        db_path (str):              SQLite database path
+        since (datetime.datetime):  Earliest mtime, or None for every row
+
+    Returns:
+        rows (list):                Row mappings of id and VOLATILE_COLUMNS,
+                                    oldest first
+    """
+    return await run(database.query_steps_modified_since, db_path=db_path, since=since)
+
+
+async def checkpoint(db_path=database.DB_ADDRESS, mode="PASSIVE"):
+    """
+    Async database.checkpoint
+
+    Args:
+        db_path (str):      SQLite database path
+        mode (str):         One of database.CHECKPOINT_MODES
+
+    Returns:
+        result (tuple):     (busy, pages in the log, pages checkpointed)
+    """
+    return await run(database.checkpoint, db_path=db_path, mode=mode)
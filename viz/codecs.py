@@ -0,0 +1,408 @@
+"""
+Serialisation of the step/result blobs stored in the databases
+
+Blobs written by the "json" and "msgpack" codecs start with a short header, the
+magic bytes, the codec and the schema version of the encoded structure, so a
+reader picks the right codec per row and refuses blobs newer than it
+understands. Header-less blobs are (legacy) pickles, which can run arbitrary
+code when loaded, so they are only read with ALLOW_PICKLE on (wf-table/wf-tree
+--allow-pickle) or by recode_blobs, which rewrites them with a plain codec.
+
+Objects are encoded as plain JSON-compatible structures; only registered types
+(steps, UUIDs, datetimes, paths and anything added with register/register_attrs)
+are rebuilt on decoding, so decoding never runs arbitrary code.
+"""
+
+import datetime
+import io
+import json
+import os
+import pathlib
+import pickle
+import uuid
+
+import viz.steps as steps
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+MAGIC = b"\x00vz"
+# Version of the plain structure, bumped on incompatible changes
+SCHEMA_VERSION = 1
+DEFAULT_CODEC = "json"
+# Header-less blobs are pickles, which can run arbitrary code when loaded; only
+# turn this on for databases written by trusted code
+ALLOW_PICKLE = False
+
+# Key marking a registered type in the plain structure: {"$type": name, "value": ...}
+TYPE_KEY = "$type"
+# Type of a dict that holds TYPE_KEY itself, stored as a list of [key, value] pairs
+ESCAPED_DICT = "dict"
+
+# type -> (name, to_plain), name -> from_plain
+_TO_PLAIN = {}
+_FROM_PLAIN = {}
+
+
+def register(name, cls, to_plain, from_plain):
+    """
+    Make a type encodable by the plain (json/msgpack) codecs
+
+    Args:
+        name (str):             Name stored in the blob; never change it
+        cls (type):             Type, subclasses included
+        to_plain (callable):    Object to JSON-compatible value
+        from_plain (callable):  Inverse of to_plain
+
+    Returns:
+        None
+    """
+    _TO_PLAIN[cls] = (name, to_plain)
+    _FROM_PLAIN[name] = from_plain
+
+
+def register_attrs(name, cls):
+    """
+    Register a plain attribute container, encoded as its __dict__
+
+    Args:
+        name (str):             Name stored in the blob
+        cls (type):             Type
+
+    Returns:
+        None
+    """
+
+    def from_plain(fields):
+        obj = cls.__new__(cls)
+        obj.__dict__.update(fields)
+        return obj
+
+    register(name, cls, lambda obj: {key: to_plain(value) for key, value in vars(obj).items()}, from_plain)
+
+
+def to_plain(obj):
+    """
+    JSON-compatible structure of an object, with registered types tagged
+
+    Args:
+        obj (object):           Object
+
+    Returns:
+        plain (object):         Dicts, lists, strings, numbers, bools and None
+    """
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    if isinstance(obj, dict):
+        for key in obj:
+            if not isinstance(key, str):
+                raise Exception(f'Dict key {key!r} cannot be encoded, only str keys survive decoding')
+        if TYPE_KEY in obj:
+            return {TYPE_KEY: ESCAPED_DICT, "value": [[key, to_plain(value)] for key, value in obj.items()]}
+        return {key: to_plain(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [to_plain(value) for value in obj]
+    if isinstance(obj, tuple):
+        raise Exception("Tuples cannot be encoded, they would decode as lists; use a list")
+    for cls in type(obj).__mro__:
+        registered = _TO_PLAIN.get(cls)
+        if registered is not None:
+            name, func = registered
+            return {TYPE_KEY: name, "value": func(obj)}
+    raise Exception(f'Type "{type(obj).__name__}" cannot be encoded, register it in viz.codecs')
+
+
+def _from_plain(node):
+    """
+    Object hook rebuilding tagged types; inner values are already rebuilt
+
+    Args:
+        node (dict):            Decoded JSON object
+
+    Returns:
+        obj (object):           Rebuilt object, or the dict itself
+    """
+    if TYPE_KEY not in node:
+        return node
+    name = node[TYPE_KEY]
+    if node.keys() != {TYPE_KEY, "value"}:
+        raise Exception(f'Tagged value of type "{name}" has keys {sorted(node)}, expected "value" only')
+    if name == ESCAPED_DICT:
+        return dict(node["value"])
+    from_plain = _FROM_PLAIN.get(name)
+    if from_plain is None:
+        raise Exception(f'Type "{name}" not recognised, register it in viz.codecs')
+    return from_plain(node["value"])
+
+
+def _step_to_plain(step, parent_path=None):
+    """
+    Compact node of a step and its children
+
+    Schema (version 1), a list of:
+        type (str, None):           "task", "workflow" or None for a bare Step
+        uuid (str):                 UUID hex
+        path (str, list):           Final component when directly below the
+                                    parent, otherwise [full path]
+        name (str):                 Name
+        status (str):               Status
+        ctime (int, str):           Creation time, microseconds since the epoch
+                                    (ISO 8601 if timezone aware)
+        mtime (int, str):           Modification time, as ctime
+        parent_flow_type (str):     Flow type of the parent
+        flow_type (str, None):      Workflows only, "serial" or "parallel"
+        scheduler (list, None):     Scheduler type, partition, nodes, ppn, procs,
+                                    wallclock, wallclock_expired and
+                                    wallclock_remaining
+        steps (list, None):         Workflows only, child nodes
+
+    Args:
+        step (steps.Step):          Step
+        parent_path (str):          Path of the parent, if any
+
+    Returns:
+        node (list):                Step fields
+    """
+    path = str(step.path)
+    head, _, name = path.rpartition(os.sep)
+    scheduler = step.scheduler
+    workflow = isinstance(step, steps.Workflow)
+    return [
+        step.type,
+        step.uuid.hex,
+        name if parent_path is not None and name and head == parent_path else [path],
+        step.name,
+        step.status,
+        _time_to_plain(step._ctime),
+        _time_to_plain(step._mtime),
+        step.parent_flow_type,
+        step.flow_type if workflow else None,
+        None if scheduler is None else [
+            scheduler.type,
+            scheduler.partition,
+            scheduler.nodes,
+            scheduler.ppn,
+            scheduler.procs,
+            scheduler.wallclock,
+            scheduler.wallclock_expired,
+            scheduler.wallclock_remaining,
+        ],
+        [_step_to_plain(child, path) for child in step.steps] if workflow else None,
+    ]
+
+
+def _step_from_plain(node, parent=None, parent_path=None):
+    """
+    Inverse of _step_to_plain
+
+    Args:
+        node (list):                Step fields
+        parent (steps.Workflow):    Parent workflow, if any
+        parent_path (str):          Path of the parent, if any
+
+    Returns:
+        step (steps.Step):          Step, Task or Workflow instance
+    """
+    kind, hexid, path, name, status, ctime, mtime, parent_flow_type, flow_type, scheduler, children = node
+    path = path[0] if isinstance(path, list) else f"{parent_path}{os.sep}{path}"
+    scheduler = scheduler or (None,) * 8
+    step = steps.step_from_row(
+        {
+            "id": uuid.UUID(hexid),
+            "name": name,
+            "status": status,
+            "path": path,
+            "ctime": _time_from_plain(ctime),
+            "mtime": _time_from_plain(mtime),
+            "type": kind,
+            "flow_type": flow_type,
+            "scheduler_type": scheduler[0],
+            "partition": scheduler[1],
+            "nodes": scheduler[2],
+            "ppn": scheduler[3],
+            "procs": scheduler[4],
+            "wallclock": scheduler[5],
+            "wallclock_expired": scheduler[6],
+            "wallclock_remaining": scheduler[7],
+        },
+        parent,
+        parent_path,
+    )
+    step.parent_flow_type = parent_flow_type
+    for child in children or ():
+        step.steps.append(_step_from_plain(child, step, path))
+    return step
+
+
+def _time_to_plain(value):
+    """
+    Stored step time (see steps._to_micros) as a plain value
+
+    Args:
+        value (int, datetime.datetime, None):   Microseconds or aware datetime
+
+    Returns:
+        value (int, str, None):                 Microseconds or ISO 8601
+    """
+    return value.isoformat() if isinstance(value, datetime.datetime) else value
+
+
+def _time_from_plain(value):
+    """
+    Inverse of _time_to_plain
+
+    Args:
+        value (int, str, None):                 Microseconds or ISO 8601
+
+    Returns:
+        value (datetime.datetime, None):        Datetime
+    """
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value)
+    return steps._from_micros(value)
+
+
+register("step", steps.Step, _step_to_plain, _step_from_plain)
+register("uuid", uuid.UUID, lambda value: value.hex, uuid.UUID)
+register("datetime", datetime.datetime, datetime.datetime.isoformat, datetime.datetime.fromisoformat)
+register("path", pathlib.PurePath, str, pathlib.Path)
+
+
+class PickleCodec:
+    """
+    Legacy codec, a bare pickle as written by PickleType (readable by old versions)
+    """
+
+    name = "pickle"
+    code = None
+
+    def dumps(self, obj):
+        return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data, unpickler=None):
+        unpickler = pickle.Unpickler if unpickler is None else unpickler
+        return unpickler(io.BytesIO(data)).load()
+
+
+class JsonCodec:
+    """
+    Compact JSON of the plain structure
+    """
+
+    name = "json"
+    code = 1
+
+    def dumps(self, obj):
+        return json.dumps(to_plain(obj), separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data):
+        return json.loads(data, object_hook=_from_plain)
+
+
+class MsgpackCodec:
+    """
+    MessagePack of the plain structure (requires msgpack)
+    """
+
+    name = "msgpack"
+    code = 2
+
+    def dumps(self, obj):
+        if msgpack is None:
+            raise Exception('The msgpack codec requires msgpack, install it with "pip install msgpack"')
+        return msgpack.packb(to_plain(obj), use_bin_type=True)
+
+    def loads(self, data):
+        if msgpack is None:
+            raise Exception('The msgpack codec requires msgpack, install it with "pip install msgpack"')
+        return msgpack.unpackb(data, object_hook=_from_plain, raw=False, strict_map_key=False)
+
+
+CODECS = {codec.name: codec for codec in (PickleCodec(), JsonCodec(), MsgpackCodec())}
+_CODE2CODEC = {codec.code: codec for codec in CODECS.values() if codec.code is not None}
+
+
+def get_codec(name=None):
+    """
+    Codec by name
+
+    Args:
+        name (str, None):       One of CODECS, None for DEFAULT_CODEC
+
+    Returns:
+        codec (object):         Codec
+    """
+    name = DEFAULT_CODEC if name is None else name
+    codec = CODECS.get(name)
+    if codec is None:
+        raise Exception(f'Codec "{name}" not recognised, expected one of {", ".join(CODECS)}')
+    return codec
+
+
+def encode(obj, codec=None):
+    """
+    Encode an object as a blob
+
+    Args:
+        obj (object):           Object
+        codec (str, None):      One of CODECS, None for DEFAULT_CODEC
+
+    Returns:
+        data (bytes):           Blob, with a header unless pickled
+    """
+    codec = get_codec(codec)
+    if codec.code is None:
+        return codec.dumps(obj)
+    return MAGIC + bytes((codec.code, SCHEMA_VERSION)) + codec.dumps(obj)
+
+
+def codec_of(data):
+    """
+    Name of the codec a blob was written with
+
+    Args:
+        data (bytes):           Blob
+
+    Returns:
+        name (str):             Codec name
+    """
+    data = bytes(data[: len(MAGIC) + 1])
+    if not data.startswith(MAGIC):
+        return PickleCodec.name
+    codec = _CODE2CODEC.get(data[len(MAGIC)])
+    if codec is None:
+        raise Exception(f"Blob codec {data[len(MAGIC)]} not recognised")
+    return codec.name
+
+
+def decode(data, allow_pickle=None, unpickler=None):
+    """
+    Decode a blob written by encode (or PickleType), whatever its codec
+
+    Args:
+        data (bytes):               Blob
+        allow_pickle (bool, None):  Load pickled blobs, None for ALLOW_PICKLE
+        unpickler (type, None):     pickle.Unpickler (sub)class for pickled
+                                    blobs, e.g. to map moved classes
+
+    Returns:
+        obj (object):               Object
+    """
+    codec = CODECS[codec_of(data)]
+    if codec.code is None:
+        if not (ALLOW_PICKLE if allow_pickle is None else allow_pickle):
+            raise Exception(
+                "Refusing to load a pickled blob, as viz.codecs.ALLOW_PICKLE is off; "
+                're-encode it with "python -m viz.database DB --codec json", or pass --allow-pickle '
+                "if its writers are trusted"
+            )
+        return codec.loads(data, unpickler)
+    version = data[len(MAGIC) + 1]
+    if version > SCHEMA_VERSION:
+        raise Exception(
+            f"Blob schema version {version} is newer than the supported version {SCHEMA_VERSION}"
+        )
+    return codec.loads(data[len(MAGIC) + 2 :])
@@ -0,0 +1,355 @@
+"""
+Columnar (array-backed) representation of a workflow
+
+Each step is one row, in pre-order, so every sub-tree is a contiguous slice and
+aggregates over a workflow are vectorised NumPy operations rather than a Python
+recursion over the object tree.
+"""
+
+import datetime
+import os
+import uuid
+
+import numpy as np
+
+import viz.steps as steps
+
+
+# Sentinel for a missing ctime/mtime
+NO_TIME = np.iinfo(np.int64).min
+# Status codes (indices into steps.STATUSES), room for registered statuses
+STATUS_DTYPE = np.int16
+
+
+def _micros(value):
+    """
+    Datetime as int64 microseconds, converting timezone aware values to UTC
+
+    Args:
+        value (datetime.datetime, None):    Datetime
+
+    Returns:
+        micros (int):                       Microseconds, NO_TIME for None
+    """
+    if value is None:
+        return NO_TIME
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return steps._to_micros(value)
+
+
+def _datetime(micros):
+    """
+    Inverse of _micros
+
+    Args:
+        micros (int):                       Microseconds
+
+    Returns:
+        value (datetime.datetime, None):    Naive datetime
+    """
+    if micros == NO_TIME:
+        return None
+    return steps._from_micros(micros)
+
+
+class ColumnarWorkflow:
+    """
+    Workflow stored as one array per attribute
+
+    Attrs:
+        status (np.ndarray):            int16 status code (index into steps.STATUSES)
+        parent (np.ndarray):            int64 row of the parent, -1 for the root
+        depth (np.ndarray):             int32 depth below the root
+        position (np.ndarray):          int32 index in the parent's steps
+        size (np.ndarray):              int64 number of rows in each sub-tree,
+                                        including itself
+        is_workflow (np.ndarray):       bool, row is a Workflow
+        ctime (np.ndarray):             int64 creation time [us since epoch], NO_TIME if unset
+        mtime (np.ndarray):             int64 modification time [us since epoch], NO_TIME if unset
+        nodes (np.ndarray):             int64 scheduler nodes, 0 without scheduler
+        ppn (np.ndarray):               int64 scheduler procs per node
+        wallclock (np.ndarray):         int64 requested wallclock [s]
+        wallclock_expired (np.ndarray): int64 expired wallclock [s], 0 if unknown
+        names (list):                   Step names
+        uuids (list):                   UUIDs as ints
+        types (list):                   Step types ("task", "workflow", None)
+        flow_types (list):              Workflow flow types, None for tasks
+        schedulers (list):              (type, partition, procs, wallclock_expired,
+                                        wallclock_remaining) or None per row
+        objects (list):                 Source steps, when built from an object tree
+    """
+
+    def __init__(self, nrows):
+        """
+        Initialise empty columns
+
+        Args:
+            nrows (int):        Number of rows
+
+        Returns:
+            None
+        """
+        self.status = np.zeros(nrows, dtype=STATUS_DTYPE)
+        self.parent = np.full(nrows, -1, dtype=np.int64)
+        self.depth = np.zeros(nrows, dtype=np.int32)
+        self.position = np.zeros(nrows, dtype=np.int32)
+        self.size = np.ones(nrows, dtype=np.int64)
+        self.is_workflow = np.zeros(nrows, dtype=bool)
+        self.ctime = np.zeros(nrows, dtype=np.int64)
+        self.mtime = np.zeros(nrows, dtype=np.int64)
+        self.nodes = np.zeros(nrows, dtype=np.int64)
+        self.ppn = np.zeros(nrows, dtype=np.int64)
+        self.wallclock = np.zeros(nrows, dtype=np.int64)
+        self.wallclock_expired = np.zeros(nrows, dtype=np.int64)
+        self.names = [None] * nrows
+        self.uuids = [None] * nrows
+        self.types = [None] * nrows
+        self.flow_types = [None] * nrows
+        self.schedulers = [None] * nrows
+        self.objects = [None] * nrows
+        self._segments = [None] * nrows
+        self._paths = None
+
+    def __len__(self):
+        return len(self.status)
+
+    @classmethod
+    def from_workflow(cls, wf):
+        """
+        Convert an object tree to columns in a single pre-order traversal
+
+        Args:
+            wf (steps.Workflow):        Workflow
+
+        Returns:
+            columns (ColumnarWorkflow): Columnar workflow
+        """
+        objects, parents, depths, positions = [], [], [], []
+        rows = {}
+        for step, parent, depth, position in steps.walk(wf):
+            rows[id(step)] = len(objects)
+            objects.append(step)
+            parents.append(-1 if parent is None else rows[id(parent)])
+            depths.append(depth)
+            positions.append(position)
+
+        # Whole columns at a time, reading the compact storage behind the Step
+        # properties (status codes, integer times, path segments) as is
+        if len(steps.STATUSES) > np.iinfo(STATUS_DTYPE).max + 1:
+            raise Exception(f"More than {np.iinfo(STATUS_DTYPE).max + 1} statuses registered")
+        self = cls(len(objects))
+        self.objects = objects
+        self.parent[:] = parents
+        self.depth[:] = depths
+        self.position[:] = positions
+        self.is_workflow[:] = [isinstance(step, steps.Workflow) for step in objects]
+        self.status[:] = [step.status_code for step in objects]
+        self.ctime[:] = [
+            micros if (micros := step.ctime_micros) is not None else _micros(step.ctime)
+            for step in objects
+        ]
+        self.mtime[:] = [
+            micros if (micros := step.mtime_micros) is not None else _micros(step.mtime)
+            for step in objects
+        ]
+        self.names = [step.name for step in objects]
+        self.uuids = [step.uuid.int for step in objects]
+        self.types = [step.type for step in objects]
+        self.flow_types = [getattr(step, "flow_type", None) for step in objects]
+
+        # Paths relative to the parent are kept as a single component
+        self._segments = [
+            segment if parent >= 0 and (segment := step.path_segment) is not None else str(step.path)
+            for step, parent in zip(objects, parents)
+        ]
+
+        schedulers = [step.scheduler for step in objects]
+        self.schedulers = [
+            None
+            if scheduler is None
+            else (
+                scheduler.type,
+                scheduler.partition,
+                scheduler.procs,
+                scheduler.wallclock_expired,
+                scheduler.wallclock_remaining,
+            )
+            for scheduler in schedulers
+        ]
+        for column in ("nodes", "ppn", "wallclock", "wallclock_expired"):
+            getattr(self, column)[:] = [
+                0 if scheduler is None else getattr(scheduler, column) or 0
+                for scheduler in schedulers
+            ]
+
+        self._compute_sizes()
+        return self
+
+    def _compute_sizes(self):
+        """
+        Sub-tree sizes, accumulated bottom-up one depth level at a time
+
+        Args:
+
+        Returns:
+            None
+        """
+        self.size[:] = 1
+        for depth in range(int(self.depth.max(initial=0)), 0, -1):
+            rows = np.flatnonzero(self.depth == depth)
+            np.add.at(self.size, self.parent[rows], self.size[rows])
+
+    @property
+    def paths(self):
+        """
+        Full path strings, built once from the parent paths and path components
+
+        Returns:
+            paths (list):       Path strings
+        """
+        if self._paths is None:
+            paths = []
+            append = paths.append
+            for parent, segment in zip(self.parent.tolist(), self._segments):
+                if parent >= 0 and not segment.startswith(os.sep):
+                    segment = f"{paths[parent]}{os.sep}{segment}"
+                append(segment)
+            self._paths = paths
+        return self._paths
+
+    def uuid(self, row):
+        """
+        UUID of a row
+
+        Args:
+            row (int):          Row
+
+        Returns:
+            uuid (uuid.UUID):   UUID
+        """
+        return uuid.UUID(int=self.uuids[row])
+
+    def subtree(self, row):
+        """
+        Slice covering a row and all its descendants
+
+        Args:
+            row (int):          Row
+
+        Returns:
+            rows (slice):       Rows of the sub-tree
+        """
+        return slice(row, row + int(self.size[row]))
+
+    def status_counts(self, row=0, tasks_only=True):
+        """
+        Number of steps in each status
+
+        Args:
+            row (int):          Root of the sub-tree to count
+            tasks_only (bool):  Only count tasks, not (sub)workflows
+
+        Returns:
+            counts (dict):      Status to count, for statuses present
+        """
+        rows = self.subtree(row)
+        status = self.status[rows]
+        if tasks_only:
+            status = status[~self.is_workflow[rows]]
+        counts = np.bincount(status, minlength=len(steps.STATUSES))
+        return {steps.STATUSES[code]: int(count) for code, count in enumerate(counts) if count}
+
+    def completed_fraction(self, row=0):
+        """
+        Fraction of tasks completed
+
+        Args:
+            row (int):          Root of the sub-tree
+
+        Returns:
+            fraction (float):   Completed tasks / tasks, 0 if there are no tasks
+        """
+        rows = self.subtree(row)
+        tasks = ~self.is_workflow[rows]
+        ntasks = int(tasks.sum())
+        if ntasks == 0:
+            return 0.0
+        completed = self.status[rows][tasks] == steps.status_code("completed")
+        return int(completed.sum()) / ntasks
+
+    def cpuhours(self, row=0, requested=True):
+        """
+        Total CPU hours of the tasks
+
+        Args:
+            row (int):          Root of the sub-tree
+            requested (bool):   Use the requested wallclock, else the expired
+
+        Returns:
+            cpuhours (float):   CPU hours
+        """
+        rows = self.subtree(row)
+        wallclock = self.wallclock[rows] if requested else self.wallclock_expired[rows]
+        tasks = ~self.is_workflow[rows]
+        procs = self.nodes[rows] * self.ppn[rows]
+        return float((procs * wallclock)[tasks].sum()) / 3600.0
+
+    def summary(self, row=0):
+        """
+        Headline numbers for a (sub)workflow
+
+        Args:
+            row (int):          Root of the sub-tree
+
+        Returns:
+            summary (dict):     tasks, counts, completed fraction and CPU hours
+        """
+        rows = self.subtree(row)
+        return {
+            "tasks": int((~self.is_workflow[rows]).sum()),
+            "counts": self.status_counts(row),
+            "completed": self.completed_fraction(row),
+            "cpuhours": self.cpuhours(row),
+        }
+
+    def to_workflow(self):
+        """
+        Convert back to an object tree
+
+        Args:
+
+        Returns:
+            wf (steps.Step):    Root step
+        """
+        objs = []
+        paths = self.paths
+        for row in range(len(self)):
+            scheduler = self.schedulers[row] or (None,) * 5
+            record = {
+                "id": self.uuid(row),
+                "name": self.names[row],
+                "status": steps.STATUSES[self.status[row]],
+                "path": paths[row],
+                "ctime": _datetime(int(self.ctime[row])),
+                "mtime": _datetime(int(self.mtime[row])),
+                "type": self.types[row],
+                "flow_type": self.flow_types[row],
+                "scheduler_type": scheduler[0],
+                "partition": scheduler[1],
+                "nodes": int(self.nodes[row]),
+                "ppn": int(self.ppn[row]),
+                "procs": scheduler[2],
+                "wallclock": int(self.wallclock[row]),
+                "wallclock_expired": scheduler[3],
+                "wallclock_remaining": scheduler[4],
+            }
+            step = steps.step_from_row(record)
+            parent = self.parent[row]
+            if parent >= 0:
+                parent = objs[parent]
+                step.parent_flow_type = parent.flow_type
+                parent.steps.append(step)
+                steps._link(parent, step)
+            objs.append(step)
+        return objs[0]
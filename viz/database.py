@@ -2,20 +2,83 @@
 Misc database functions
 """
 
+import argparse
+import contextlib
+import datetime
 import pathlib
+import re
+import sys
+import threading
 
 import sqlalchemy
+import sqlalchemy.event
 import sqlalchemy.ext
 import sqlalchemy.orm
 
+import viz.codecs as codecs
+import viz.steps as steps
+
 
 RDBMS = "sqlite"
 DATABASE = pathlib.Path("orchestrator.db")
 DB_ADDRESS = f"{RDBMS}:///{DATABASE}"
+BATCH_SIZE = 1000
+
+# SQLite tuning: write-ahead logging lets readers (dashboards, wf-tree) run while
+# the orchestrator writes, fsyncing only at checkpoints is safe in WAL mode, and
+# a writer waits [ms] for a lock rather than failing with "database is locked"
+JOURNAL_MODE = "wal"
+SYNCHRONOUS = "normal"
+BUSY_TIMEOUT = 5000
+# Pages in the WAL before a commit checkpoints it back into the database
+WAL_AUTOCHECKPOINT = 1000
+CHECKPOINT_MODES = ("PASSIVE", "FULL", "RESTART", "TRUNCATE")
+
+# Units accepted in relative time windows, e.g. "last 2h"
+WINDOW_UNITS = {
+    "s": "seconds",
+    "m": "minutes",
+    "h": "hours",
+    "d": "days",
+    "w": "weeks",
+}
 
 # Create base class for declarative models
 BASE = sqlalchemy.orm.declarative_base()
 
+# Process-wide engine/sessionmaker registry, keyed by database URL (re-entrant, as
+# get_sessionmaker creates the engine while holding it)
+_ENGINES = {}
+_SESSIONMAKERS = {}
+_LOCK = threading.RLock()
+
+
+class CodecType(sqlalchemy.types.TypeDecorator):
+    """
+    Blob column holding an object serialised by viz.codecs
+
+    Values are written with the given codec (DEFAULT_CODEC if None) and read with
+    whichever codec the stored blob names, so rows written by PickleType or
+    another codec stay readable.
+    """
+
+    impl = sqlalchemy.LargeBinary
+    cache_ok = True
+
+    def __init__(self, codec=None):
+        """
+        Args:
+            codec (str, None):  One of codecs.CODECS, None for codecs.DEFAULT_CODEC
+        """
+        super().__init__()
+        self.codec = codec
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else codecs.encode(value, self.codec)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else codecs.decode(value)
+
 
 # Define models
 class Step(BASE):
@@ -24,14 +87,176 @@ class Step(BASE):
     """
 
     __tablename__ = "steps"
+    __table_args__ = (
+        sqlalchemy.Index("ix_steps_parent_id_position", "parent_id", "position"),
+    )
 
     id = sqlalchemy.Column(sqlalchemy.UUID, primary_key=True)
     name = sqlalchemy.Column(sqlalchemy.String)
-    status = sqlalchemy.Column(sqlalchemy.String)
-    path = sqlalchemy.Column(sqlalchemy.String)
-    ctime = sqlalchemy.Column(sqlalchemy.DateTime)
-    mtime = sqlalchemy.Column(sqlalchemy.DateTime)
-    step = sqlalchemy.Column(sqlalchemy.PickleType)
+    status = sqlalchemy.Column(sqlalchemy.String, index=True)
+    path = sqlalchemy.Column(sqlalchemy.String, index=True)
+    ctime = sqlalchemy.Column(sqlalchemy.DateTime, index=True)
+    mtime = sqlalchemy.Column(sqlalchemy.DateTime, index=True)
+
+    # Tree structure
+    parent_id = sqlalchemy.Column(sqlalchemy.UUID)
+    depth = sqlalchemy.Column(sqlalchemy.Integer)
+    position = sqlalchemy.Column(sqlalchemy.Integer)
+    type = sqlalchemy.Column(sqlalchemy.String)
+    flow_type = sqlalchemy.Column(sqlalchemy.String)
+
+    # Scheduler
+    scheduler_type = sqlalchemy.Column(sqlalchemy.String)
+    partition = sqlalchemy.Column(sqlalchemy.String)
+    nodes = sqlalchemy.Column(sqlalchemy.Integer)
+    ppn = sqlalchemy.Column(sqlalchemy.Integer)
+    procs = sqlalchemy.Column(sqlalchemy.Integer)
+    wallclock = sqlalchemy.Column(sqlalchemy.Integer)
+    wallclock_expired = sqlalchemy.Column(sqlalchemy.Integer)
+    wallclock_remaining = sqlalchemy.Column(sqlalchemy.Integer)
+
+    # Optional serialised Step, only needed for rows without child rows. Deferred,
+    # so it is only read from disk (and decoded) when explicitly accessed
+    step = sqlalchemy.orm.deferred(sqlalchemy.Column(CodecType()))
+
+
+def scalar_columns(model):
+    """
+    Get the columns of a model that are loaded eagerly, i.e. everything but the
+    deferred blob columns
+
+    Args:
+        model (BASE):       Declarative model class
+
+    Returns:
+        columns (list):     sqlalchemy.Column instances
+    """
+    mapper = sqlalchemy.inspect(model)
+    return [prop.columns[0] for prop in mapper.column_attrs if not prop.deferred]
+
+
+def select_scalars(model):
+    """
+    Build a SELECT over the scalar columns of a model, for listing/table views
+
+    Args:
+        model (BASE):       Declarative model class
+
+    Returns:
+        query (sqlalchemy.sql.Select):  Select statement
+    """
+    return sqlalchemy.select(*scalar_columns(model))
+
+
+def get_engine(db_path=DB_ADDRESS):
+    """
+    Get the pooled engine for a database, creating it on first use
+
+    Engines are cached per URL for the lifetime of the process, so repeated calls
+    share one connection pool rather than re-opening the database every time.
+
+    Args:
+        db_path (str):      Database URL
+
+    Returns:
+        engine (sqlalchemy.engine.Engine):  Cached engine
+    """
+    db_path = str(db_path)
+    engine = _ENGINES.get(db_path)
+    if engine is None:
+        with _LOCK:
+            engine = _ENGINES.get(db_path)
+            if engine is None:
+                engine = sqlalchemy.create_engine(db_path, echo=False, pool_pre_ping=True)
+                if engine.dialect.name == "sqlite":
+                    sqlalchemy.event.listen(engine, "connect", _sqlite_pragmas)
+                _ENGINES[db_path] = engine
+    return engine
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Tune every new SQLite connection; these pragmas only last for the connection,
+    whereas the journal mode is stored in the database by set_journal_mode
+
+    Args:
+        dbapi_connection (sqlite3.Connection):  New connection
+        connection_record (ConnectionRecord):   Pool record
+
+    Returns:
+        None
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT}")
+    cursor.execute(f"PRAGMA synchronous = {SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA wal_autocheckpoint = {WAL_AUTOCHECKPOINT}")
+    cursor.close()
+
+
+def get_sessionmaker(db_path=DB_ADDRESS):
+    """
+    Get the cached session factory bound to a database's engine
+
+    Args:
+        db_path (str):      Database URL
+
+    Returns:
+        factory (sqlalchemy.orm.sessionmaker):  Session factory
+    """
+    db_path = str(db_path)
+    factory = _SESSIONMAKERS.get(db_path)
+    if factory is None:
+        with _LOCK:
+            factory = _SESSIONMAKERS.get(db_path)
+            if factory is None:
+                factory = sqlalchemy.orm.sessionmaker(
+                    bind=get_engine(db_path), expire_on_commit=False
+                )
+                _SESSIONMAKERS[db_path] = factory
+    return factory
+
+
+@contextlib.contextmanager
+def session_scope(db_path=DB_ADDRESS):
+    """
+    Provide a transactional scope around a series of operations
+
+    Commits on success, rolls back on error and always closes the session.
+
+    Args:
+        db_path (str):      Database URL
+
+    Yields:
+        session (sqlalchemy.orm.Session):   Open session
+    """
+    session = get_sessionmaker(db_path)()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def dispose_engines(db_path=None):
+    """
+    Dispose of cached engines and close their pooled connections
+
+    Args:
+        db_path (str, None):    Database URL to dispose, or None for all of them
+
+    Returns:
+        None
+    """
+    with _LOCK:
+        keys = list(_ENGINES) if db_path is None else [str(db_path)]
+        for key in keys:
+            _SESSIONMAKERS.pop(key, None)
+            engine = _ENGINES.pop(key, None)
+            if engine is not None:
+                engine.dispose()
 
 
 def setup_database(db_path=DB_ADDRESS):
@@ -44,42 +269,398 @@ def setup_database(db_path=DB_ADDRESS):
     Returns:
         None
     """
-    # Create engine
-    engine = sqlalchemy.create_engine(str(db_path), echo=False)
     # Create tables
-    BASE.metadata.create_all(engine)
+    BASE.metadata.create_all(get_engine(db_path))
+    migrate_database(db_path)
+
+
+def set_journal_mode(db_path=DB_ADDRESS, mode=JOURNAL_MODE):
+    """
+    Set the journal mode of an SQLite database
+
+    The mode is persistent, so this only needs doing once per file (it is done by
+    setup_database/migrate_database); other databases are left alone.
+
+    Args:
+        db_path (str):      SQLite database path
+        mode (str):         Journal mode, e.g. "wal" or "delete"
+
+    Returns:
+        mode (str, None):   Resulting journal mode, None if not SQLite
+    """
+    engine = get_engine(db_path)
+    if engine.dialect.name != "sqlite":
+        return None
+    with engine.connect() as conn:
+        # In-memory databases stay in "memory" mode
+        return conn.exec_driver_sql(f"PRAGMA journal_mode = {mode}").scalar()
+
+
+def checkpoint(db_path=DB_ADDRESS, mode="PASSIVE"):
+    """
+    Copy the write-ahead log of an SQLite database back into the database
+
+    Commits checkpoint automatically every WAL_AUTOCHECKPOINT pages, but only as
+    far as the oldest open reader allows, so a log can keep growing under
+    constant reads; a long-running writer should call this with "TRUNCATE" when
+    idle to reset it.
+
+    Args:
+        db_path (str):      SQLite database path
+        mode (str):         One of CHECKPOINT_MODES
+
+    Returns:
+        result (tuple):     (busy, pages in the log, pages checkpointed), busy is
+                            1 if a "FULL"/"RESTART"/"TRUNCATE" checkpoint was
+                            blocked by another connection
+    """
+    mode = mode.upper()
+    if mode not in CHECKPOINT_MODES:
+        raise Exception(f'Checkpoint mode "{mode}" not recognised')
+    with get_engine(db_path).connect() as conn:
+        return tuple(conn.exec_driver_sql(f"PRAGMA wal_checkpoint({mode})").one())
+
+
+def migrate_database(db_path=DB_ADDRESS):
+    """
+    Bring an existing database up to the current schema
+
+    Tables created by older versions are missing columns and indexes added since;
+    columns are added in place (nullable, so existing rows are untouched) and any
+    missing indexes are built. SQLite databases are switched to WAL mode.
+
+    Args:
+        db_path (str):      SQLite database path
+
+    Returns:
+        None
+    """
+    engine = get_engine(db_path)
+    inspector = sqlalchemy.inspect(engine)
+    if not inspector.has_table(Step.__tablename__):
+        raise Exception(f'No "{Step.__tablename__}" table in "{db_path}", not a steps database')
+    existing = {column["name"] for column in inspector.get_columns(Step.__tablename__)}
+    with engine.begin() as conn:
+        for column in Step.__table__.columns:
+            if column.name not in existing:
+                ctype = column.type.compile(dialect=engine.dialect)
+                conn.execute(
+                    sqlalchemy.text(
+                        f"ALTER TABLE {Step.__tablename__} ADD COLUMN {column.name} {ctype}"
+                    )
+                )
+        for index in Step.__table__.indexes:
+            index.create(conn, checkfirst=True)
+    set_journal_mode(db_path)
+
+
+def recode_blobs(
+    db_path=DB_ADDRESS, table=None, columns=(), codec=None, batch_size=BATCH_SIZE, unpickler=None
+):
+    """
+    Re-encode the serialised blobs of existing rows with another codec
+
+    Blobs are read and written as raw bytes, bypassing the model's column type,
+    and only those not already in the target codec are rewritten. Each batch is
+    its own transaction, so an interrupted run can simply be repeated. Legacy
+    pickles are loaded whatever codecs.ALLOW_PICKLE says, as converting them is
+    the point; only run this on databases written by trusted code.
+
+    Args:
+        db_path (str):              Database path
+        table (sqlalchemy.Table):   Table, e.g. Step.__table__
+        columns (tuple):            Blob column names
+        codec (str, None):          One of codecs.CODECS, None for the default
+        batch_size (int):           Rows per transaction
+        unpickler (type, None):     pickle.Unpickler (sub)class for legacy pickles
+
+    Returns:
+        count (int):                Number of rows re-encoded
+    """
+    engine = get_engine(db_path)
+    (key,) = table.primary_key.columns
+    blobs = [sqlalchemy.type_coerce(table.c[column], sqlalchemy.LargeBinary) for column in columns]
+    codec = codecs.get_codec(codec).name
+
+    with engine.connect() as conn:
+        ids = conn.execute(
+            sqlalchemy.select(key).where(sqlalchemy.or_(*(table.c[column].is_not(None) for column in columns)))
+        ).scalars().all()
+
+    count = 0
+    for chunk in _chunks(ids, batch_size):
+        with engine.begin() as conn:
+            for row in conn.execute(sqlalchemy.select(key, *blobs).where(key.in_(chunk))).all():
+                values = {
+                    column: sqlalchemy.literal(
+                        codecs.encode(codecs.decode(blob, allow_pickle=True, unpickler=unpickler), codec),
+                        sqlalchemy.LargeBinary,
+                    )
+                    for column, blob in zip(columns, row[1:])
+                    if blob is not None and codecs.codec_of(blob) != codec
+                }
+                if values:
+                    conn.execute(table.update().where(key == row[0]).values(**values))
+                    count += 1
+    return count
+
+
+def _chunks(iterable, size):
+    """
+    Split an iterable into lists of at most `size` items
+
+    Args:
+        iterable (iterable):        Items
+        size (int):                 Chunk size
+
+    Yields:
+        chunk (list):               Items
+    """
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def step_to_row(step, parent=None, depth=0, position=0, pickle=True):
+    """
+    Build the column values for a step
+
+    Args:
+        step (step.Step):           Step object
+        parent (step.Step, None):   Parent workflow
+        depth (int):                Depth below the top-level workflow
+        position (int):             Index in the parent's steps
+        pickle (bool):              Include the pickled step
 
+    Returns:
+        row (dict):                 Column name to value
+    """
+    scheduler = step.scheduler
+    row = {
+        "id": step.uuid,
+        "name": step.name,
+        "status": step.status,
+        "path": str(step.path),
+        "ctime": step.ctime,
+        "mtime": step.mtime,
+        "parent_id": parent.uuid if parent is not None else None,
+        "depth": depth,
+        "position": position,
+        "type": getattr(step, "type", None),
+        "flow_type": getattr(step, "flow_type", None),
+        "scheduler_type": scheduler.type if scheduler else None,
+        "partition": scheduler.partition if scheduler else None,
+        "nodes": scheduler.nodes if scheduler else None,
+        "ppn": scheduler.ppn if scheduler else None,
+        "procs": scheduler.procs if scheduler else None,
+        "wallclock": scheduler.wallclock if scheduler else None,
+        "wallclock_expired": scheduler.wallclock_expired if scheduler else None,
+        "wallclock_remaining": scheduler.wallclock_remaining if scheduler else None,
+        "step": step if pickle else None,
+    }
+    return row
+
+
+def iter_rows(wf, pickle=False):
+    """
+    Walk a (sub)workflow depth-first, yielding the row for every step
+
+    Args:
+        wf (step.Step):             Root step
+        pickle (bool):              Include the pickled step
 
-def add_step(db_path=DB_ADDRESS, step=None):
+    Yields:
+        row (dict):                 Column name to value, in pre-order
+    """
+    for step, parent, depth, position in steps.walk(wf):
+        yield step_to_row(step, parent, depth, position, pickle=pickle)
+
+
+def add_step(db_path=DB_ADDRESS, step=None, parent=None, depth=0, position=0, pickle=True):
     """
     Add sample data to the database
 
     Args:
         db_path (str):              SQLite database path
         step (step.Step, None):     Step object
+        parent (step.Step, None):   Parent workflow
+        depth (int):                Depth below the top-level workflow
+        position (int):             Index in the parent's steps
+        pickle (bool):              Store the pickled step
 
     Returns:
         None
     """
     # Build wrapper class
-    obj = Step(
-        id=step.uuid,
-        name=step.name,
-        status=step.status,
-        path=str(step.path),
-        ctime=step.ctime,
-        mtime=step.mtime,
-        step=step,
+    obj = Step(**step_to_row(step, parent, depth, position, pickle=pickle))
+
+    # Add step to session, committed on exit
+    with session_scope(db_path) as session:
+        session.add(obj)
+
+
+def add_workflow(db_path=DB_ADDRESS, wf=None, batch_size=BATCH_SIZE, pickle=False):
+    """
+    Add every step of a workflow to the database in a single transaction
+
+    The tree is walked once and rows are inserted with executemany in batches of
+    `batch_size`, so the whole workflow costs one commit rather than one per step.
+    The tree structure is stored in the parent_id/depth/position columns, so the
+    pickled step is not needed to load it back.
+
+    Args:
+        db_path (str):              SQLite database path
+        wf (step.Workflow):         Workflow object
+        batch_size (int):           Number of rows per executemany call
+        pickle (bool):              Also store each pickled step
+
+    Returns:
+        count (int):                Number of rows inserted
+    """
+    insert = Step.__table__.insert()
+    count = 0
+    with get_engine(db_path).begin() as conn:
+        for batch in _chunks(iter_rows(wf, pickle=pickle), batch_size):
+            conn.execute(insert, batch)
+            count += len(batch)
+    return count
+
+
+def _upsert_statement(engine):
+    """
+    Build an INSERT that only updates the volatile columns on a primary key clash
+
+    Args:
+        engine (sqlalchemy.engine.Engine):  Engine, used to pick the dialect
+
+    Returns:
+        stmt (sqlalchemy.sql.Insert):       Upsert statement
+    """
+    table = Step.__table__
+    dialect = engine.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            import sqlalchemy.dialects.sqlite as dialect_module
+        else:
+            import sqlalchemy.dialects.postgresql as dialect_module
+        stmt = dialect_module.insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.id],
+            set_={column: stmt.excluded[column] for column in steps.VOLATILE_COLUMNS},
+        )
+    elif dialect == "mysql":
+        import sqlalchemy.dialects.mysql as dialect_module
+
+        stmt = dialect_module.insert(table)
+        return stmt.on_duplicate_key_update(
+            {column: stmt.inserted[column] for column in steps.VOLATILE_COLUMNS}
+        )
+    raise Exception(f'Upsert not supported for "{dialect}" databases')
+
+
+def upsert_steps(db_path=DB_ADDRESS, stps=None, batch_size=BATCH_SIZE):
+    """
+    Insert or refresh steps, touching only the volatile scalar columns
+
+    New steps are inserted as top-level rows without a pickled step (use
+    add_workflow to insert structure); existing rows only have
+    VOLATILE_COLUMNS (status, mtime, scheduler wallclock) overwritten, so a
+    status heartbeat never re-pickles or rewrites whole workflows.
+
+    Args:
+        db_path (str):              SQLite database path
+        stps (iterable):            Step objects
+        batch_size (int):           Number of rows per executemany call
+
+    Returns:
+        count (int):                Number of rows written
+    """
+    engine = get_engine(db_path)
+    stmt = _upsert_statement(engine)
+    rows = (step_to_row(step, pickle=False) for step in stps)
+    count = 0
+    with engine.begin() as conn:
+        for batch in _chunks(rows, batch_size):
+            conn.execute(stmt, batch)
+            count += len(batch)
+    return count
+
+
+def _refresh_volatile(session, step):
+    """
+    Overwrite the volatile attributes of an unpickled (sub)workflow with the
+    current column values, as upsert_steps does not rewrite the pickle
+
+    Args:
+        session (sqlalchemy.orm.Session):   Open session
+        step (step.Step):                   Unpickled step
+
+    Returns:
+        None
+    """
+    lookup = {stp.uuid: stp for stp in steps.iter_steps(step)}
+    columns = [getattr(Step, column) for column in steps.VOLATILE_COLUMNS]
+    for ids in _chunks(lookup, 500):
+        for row in session.execute(
+            sqlalchemy.select(Step.id, *columns).where(Step.id.in_(ids))
+        ):
+            steps.apply_volatile(lookup[row.id], row._mapping)
+
+
+def query_subtree(session, uuid):
+    """
+    Load the rows of a step and all of its descendants with one recursive query
+
+    Args:
+        session (sqlalchemy.orm.Session):   Open session
+        uuid (uuid.UUID):                   UUID of the root step
+
+    Returns:
+        rows (list):                        Row mappings, parents before children
+    """
+    table = Step.__table__
+    columns = scalar_columns(Step)
+    pickled = table.c.step.is_not(None).label("pickled")
+
+    tree = (
+        sqlalchemy.select(*columns, pickled)
+        .where(table.c.id == uuid)
+        .cte("tree", recursive=True)
+    )
+    tree = tree.union_all(
+        sqlalchemy.select(*columns, pickled).join(tree, table.c.parent_id == tree.c.id)
     )
+    query = sqlalchemy.select(tree).order_by(tree.c.depth, tree.c.parent_id, tree.c.position)
+    return [row._mapping for row in session.execute(query)]
+
+
+def _load_step(session, uuid):
+    """
+    Rebuild a step and its sub-tree from the database
 
-    engine = sqlalchemy.create_engine(db_path, echo=False)
-    session = sqlalchemy.orm.sessionmaker(bind=engine)()
+    Rows written with their structure are rebuilt from plain columns; a lone row
+    that only carries a pickled step (e.g. from add_step) is unpickled instead.
 
-    # Add users to session
-    session.add(obj)
+    Args:
+        session (sqlalchemy.orm.Session):   Open session
+        uuid (uuid.UUID):                   UUID of the root step
 
-    # Commit changes
-    session.commit()
+    Returns:
+        step (step.Step, None):             Retrieved step
+    """
+    rows = query_subtree(session, uuid)
+    if len(rows) == 0:
+        return None
+    if len(rows) == 1 and rows[0]["pickled"]:
+        step = session.execute(sqlalchemy.select(Step.step).where(Step.id == uuid)).scalar()
+        _refresh_volatile(session, step)
+        return step
+    return steps.workflow_from_rows(rows)
 
 
 def query_step_by_uuid(db_path=DB_ADDRESS, uuid=None):
@@ -93,11 +674,8 @@ def query_step_by_uuid(db_path=DB_ADDRESS, uuid=None):
     Returns:
         step (step.Step)            Retrieved step
     """
-
-    engine = sqlalchemy.create_engine(db_path, echo=False)
-    session = sqlalchemy.orm.sessionmaker(bind=engine)()
-    obj = session.get(Step, uuid)
-    step = obj.step if obj is not None else None
+    with session_scope(db_path) as session:
+        step = _load_step(session, uuid)
     return step
 
 
@@ -110,14 +688,136 @@ def query_step_by_path(db_path=DB_ADDRESS, path=None):
     Returns:
         step (step.Step)            Retrieved step
     """
-    engine = sqlalchemy.create_engine(db_path, echo=False)
-    session = sqlalchemy.orm.sessionmaker(bind=engine)()
-    objs = session.query(Step).filter(Step.path == path).all()
-    # Make this not a failure
-    if len(objs) > 1:
-        raise Exception(f'More than one object with the path "{path}"')
-    if len(objs) == 0 or objs[0] is None:
-        step = None
-    else:
-        step = objs[0].step
+    with session_scope(db_path) as session:
+        # Only the (indexed) id is needed to check uniqueness, and at most two rows
+        query = sqlalchemy.select(Step.id).where(Step.path == path).limit(2)
+        ids = session.execute(query).scalars().all()
+        # Make this not a failure
+        if len(ids) > 1:
+            raise Exception(f'More than one object with the path "{path}"')
+        step = _load_step(session, ids[0]) if ids else None
     return step
+
+
+def query_steps_modified_since(db_path=DB_ADDRESS, since=None):
+    """
+    Volatile columns of the steps modified at or after a time
+
+    Uses the mtime index, so polling for changes only reads the changed rows.
+    Rows modified exactly at `since` are returned again, so no change sharing
+    the last seen timestamp is missed.
+
+    Args:
+        db_path (str):              SQLite database path
+        since (datetime.datetime):  Earliest mtime, or None for every row
+
+    Returns:
+        rows (list):                Row mappings of id and VOLATILE_COLUMNS,
+                                    oldest first
+    """
+    columns = [getattr(Step, column) for column in steps.VOLATILE_COLUMNS]
+    query = sqlalchemy.select(Step.id, *columns).order_by(Step.mtime)
+    if since is not None:
+        query = query.where(Step.mtime >= since)
+    with session_scope(db_path) as session:
+        return [row._mapping for row in session.execute(query)]
+
+
+def parse_window(window):
+    """
+    Parse a relative time window, e.g. "2h", "last 30m", "1.5d"
+
+    Args:
+        window (str):               Window
+
+    Returns:
+        delta (datetime.timedelta): Window length
+    """
+    match = re.fullmatch(r"\s*(?:last\s+)?(\d+(?:\.\d+)?)\s*([smhdw])\s*", window.lower())
+    if match is None:
+        raise ValueError(f'Time window "{window}" not recognised, expected e.g. "2h"')
+    return datetime.timedelta(**{WINDOW_UNITS[match.group(2)]: float(match.group(1))})
+
+
+def parse_time(value, end=False):
+    """
+    Parse an ISO date or datetime
+
+    Args:
+        value (str, datetime.datetime):     Date/datetime
+        end (bool):                         Value is the end of a range, so a bare
+                                            date means the end of that day
+
+    Returns:
+        value (datetime.datetime):          Datetime
+    """
+    if isinstance(value, datetime.datetime):
+        return value
+    parsed = datetime.datetime.fromisoformat(value.strip())
+    if end and re.fullmatch(r"\d{4}-\d{2}-\d{2}", value.strip()):
+        parsed += datetime.timedelta(days=1)
+    return parsed
+
+
+def time_range_clauses(column, start=None, end=None, window=None, now=None):
+    """
+    Build range conditions on a raw datetime column
+
+    The column is compared directly (never wrapped in a function), so the
+    conditions are answered from the column's index. The range is half-open,
+    [start, end).
+
+    Args:
+        column (sqlalchemy.Column):         DateTime column
+        start (str, datetime, None):        Range start
+        end (str, datetime, None):          Range end, a bare date includes that day
+        window (str, None):                 Relative window ending now, e.g. "2h"
+        now (datetime.datetime, None):      Reference time for `window`
+
+    Returns:
+        clauses (list):                     SQLAlchemy boolean expressions
+    """
+    clauses = []
+    if start:
+        clauses.append(column >= parse_time(start))
+    if end:
+        clauses.append(column < parse_time(end, end=True))
+    if window:
+        now = now if now is not None else datetime.datetime.now()
+        clauses.append(column >= now - parse_window(window))
+    return clauses
+
+
+def main(argv=sys.argv[1:]):
+    """
+    Migrate existing databases to the current schema
+
+    Args:
+        argv (list):        List of arguments (for pytest compatability)
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Migrate steps databases")
+    parser.add_argument("fnames", type=pathlib.Path, nargs="+", help="Database files")
+    parser.add_argument(
+        "--codec",
+        choices=list(codecs.CODECS),
+        default=None,
+        help="Also re-encode stored steps with this codec",
+    )
+    args = parser.parse_args(argv)
+
+    for fname in args.fnames:
+        if not fname.is_file():
+            parser.error(f'database "{fname}" not found')
+        if not sqlalchemy.inspect(get_engine(f"{RDBMS}:///{fname}")).has_table(Step.__tablename__):
+            parser.error(f'"{fname}" has no "{Step.__tablename__}" table, not a steps database')
+        migrate_database(f"{RDBMS}:///{fname}")
+        if args.codec is not None:
+            count = recode_blobs(f"{RDBMS}:///{fname}", Step.__table__, ("step",), codec=args.codec)
+            print(f"{fname}: re-encoded {count} steps as {args.codec}")
+
+
+if __name__ == "__main__":
+    main()
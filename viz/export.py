@@ -0,0 +1,265 @@
+"""
+Machine-readable table output (CSV, TSV, JSON lines, Parquet)
+
+Rows are written straight from a columnar copy of the workflow with whole
+columns converted at once, bypassing rich entirely.
+"""
+
+import contextlib
+import csv
+import json
+import json.encoder
+import sys
+
+import numpy as np
+
+import viz.columnar as columnar
+import viz.steps as steps
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+FORMATS = ("csv", "tsv", "jsonl", "parquet")
+
+# Machine-readable fields of the scheduler column
+SCHEDULER_FIELDS = ("scheduler_type", "partition", "nodes", "ppn", "wallclock")
+
+
+def _times(micros):
+    """
+    ISO 8601 strings of int64 microsecond times, empty where unset
+
+    As datetime.isoformat, the fraction is left out of whole seconds.
+
+    Args:
+        micros (np.ndarray):        Times
+
+    Returns:
+        times (np.ndarray):         Strings
+    """
+    times = np.datetime_as_string(micros.astype("datetime64[us]"))
+    whole = micros % 1_000_000 == 0
+    if whole.any():
+        times = times.astype(object)
+        times[whole] = np.datetime_as_string(micros[whole].astype("datetime64[us]"), unit="s")
+    times[micros == columnar.NO_TIME] = ""
+    return times
+
+
+def _scheduled(values, mask):
+    """
+    Scheduler column with None for the steps without a scheduler
+
+    Args:
+        values (np.ndarray):        int64 column, 0 without scheduler
+        mask (np.ndarray):          Rows with a scheduler
+
+    Returns:
+        values (np.ndarray):        Column, object dtype if any row has no scheduler
+    """
+    if mask.all():
+        return values
+    values = values.astype(object)
+    values[~mask] = None
+    return values
+
+
+def export_columns(cols, columns, offset=0, limit=None):
+    """
+    Output columns for the steps below the root, in table order
+
+    Args:
+        cols (ColumnarWorkflow):    Columnar workflow
+        columns (list):             Table column names
+        offset (int):               Number of rows skipped
+        limit (int):                Maximum number of rows, None for all
+
+    Returns:
+        data (dict):                Field name to list or array of values
+    """
+    # Row 0 is the root, which the table does not show
+    start = 1 + offset
+    stop = len(cols) if limit is None else min(len(cols), start + limit)
+    rows = slice(start, stop)
+
+    data = {}
+    for column in columns:
+        if column == "name":
+            data["name"] = cols.names[rows]
+        elif column == "status":
+            data["status"] = np.array(steps.STATUSES, dtype=object)[cols.status[rows]]
+        elif column == "path":
+            data["path"] = cols.paths[rows]
+        elif column == "uuid":
+            data["uuid"] = [f"{uuid:032x}" for uuid in cols.uuids[rows]]
+        elif column in ("ctime", "mtime"):
+            data[column] = _times(getattr(cols, column)[rows])
+        elif column == "scheduler":
+            schedulers = cols.schedulers[rows]
+            mask = np.array([scheduler is not None for scheduler in schedulers], dtype=bool)
+            schedulers = [scheduler or (None, None) for scheduler in schedulers]
+            data["scheduler_type"] = [scheduler[0] for scheduler in schedulers]
+            data["partition"] = [scheduler[1] for scheduler in schedulers]
+            data["nodes"] = _scheduled(cols.nodes[rows], mask)
+            data["ppn"] = _scheduled(cols.ppn[rows], mask)
+            data["wallclock"] = _scheduled(cols.wallclock[rows], mask)
+        else:
+            raise Exception(f'Column "{column}" cannot be exported')
+    return data
+
+
+def write_delimited(data, fobj, delimiter=","):
+    """
+    Write columns as CSV/TSV with a header row
+
+    When no value needs quoting, lines are joined directly rather than going
+    through the csv module field by field.
+
+    Args:
+        data (dict):                Field name to values
+        fobj (io.TextIOBase):       Output
+        delimiter (str):            Field delimiter
+
+    Returns:
+        None
+    """
+    writer = csv.writer(fobj, delimiter=delimiter, lineterminator="\n")
+    writer.writerow(data.keys())
+
+    texts = [_text(values) for values in data.values()]
+    special = (delimiter, '"', "\n", "\r")
+    if any(char in "".join(text) for text in texts for char in special):
+        writer.writerows(zip(*texts))
+    else:
+        fobj.writelines(f"{line}\n" for line in map(delimiter.join, zip(*texts)))
+
+
+def write_jsonl(data, fobj):
+    """
+    Write columns as one JSON object per line
+
+    Values are JSON-encoded a column at a time and substituted into a fixed
+    line template.
+
+    Args:
+        data (dict):                Field name to values
+        fobj (io.TextIOBase):       Output
+
+    Returns:
+        None
+    """
+    template = "{" + ", ".join(f"{json.dumps(key)}: %s" for key in data) + "}\n"
+    encoded = [_json(values) for values in data.values()]
+    fobj.writelines(template % values for values in zip(*encoded))
+
+
+def _text(values):
+    """
+    Column as strings for delimited output, empty for None
+
+    Args:
+        values (list, np.ndarray):  Column
+
+    Returns:
+        values (list):              Strings
+    """
+    if isinstance(values, np.ndarray) and values.dtype != object:
+        return values.astype(str).tolist()
+    return ["" if value is None else str(value) for value in values]
+
+
+def _json(values):
+    """
+    Column as JSON-encoded values
+
+    Args:
+        values (list, np.ndarray):  Column
+
+    Returns:
+        values (list):              JSON fragments
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind in "iu":
+        return values.astype(str).tolist()
+    encode = json.encoder.encode_basestring
+    return [
+        "null" if value is None else encode(value) if isinstance(value, str) else json.dumps(value)
+        for value in _python(values)
+    ]
+
+
+def write_parquet(data, fname):
+    """
+    Write columns as a Parquet file (requires pyarrow)
+
+    Args:
+        data (dict):                Field name to values
+        fname (pathlib.Path):       Output file
+
+    Returns:
+        None
+    """
+    if pyarrow is None:
+        raise Exception('Parquet output requires pyarrow, install it with "pip install pyarrow"')
+    if fname is None:
+        raise Exception("Parquet output needs an --output file")
+    arrays = {
+        key: pyarrow.array(values.tolist() if values.dtype == object else values)
+        if isinstance(values, np.ndarray)
+        else pyarrow.array(values)
+        for key, values in data.items()
+    }
+    pyarrow.parquet.write_table(pyarrow.table(arrays), fname)
+
+
+def _python(values):
+    """
+    Plain Python values of a column, so writers do not format NumPy scalars
+
+    Args:
+        values (list, np.ndarray):  Column
+
+    Returns:
+        values (list):              Column
+    """
+    return values.tolist() if isinstance(values, np.ndarray) else values
+
+
+def export(wf, fmt, output=None, columns=None, offset=0, limit=None):
+    """
+    Write the table of a workflow in a machine-readable format
+
+    Args:
+        wf (steps.Workflow):        Workflow
+        fmt (str):                  One of FORMATS
+        output (pathlib.Path):      Output file, stdout if None
+        columns (list):             Table column names
+        offset (int):               Number of rows skipped
+        limit (int):                Maximum number of rows, None for all
+
+    Returns:
+        None
+    """
+    if fmt not in FORMATS:
+        raise Exception(f'Output format "{fmt}" not recognised')
+    if fmt == "parquet" and pyarrow is None:
+        raise Exception('Parquet output requires pyarrow, install it with "pip install pyarrow"')
+    cols = columnar.ColumnarWorkflow.from_workflow(wf)
+    data = export_columns(cols, columns, offset=offset, limit=limit)
+
+    if fmt == "parquet":
+        write_parquet(data, output)
+        return
+
+    with contextlib.ExitStack() as stack:
+        if output is None:
+            fobj = sys.stdout
+        else:
+            fobj = stack.enter_context(open(output, "w", newline="", encoding="utf-8"))
+        if fmt == "jsonl":
+            write_jsonl(data, fobj)
+        else:
+            write_delimited(data, fobj, delimiter="\t" if fmt == "tsv" else ",")
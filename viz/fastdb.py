@@ -0,0 +1,235 @@
+"""
+Read-only SQLite fast path for the CLI views
+
+Queries go straight through the stdlib sqlite3 module on a read-only connection
+and return plain tuples, skipping SQLAlchemy's session and column type machinery
+(and its import). Only SQLite file URLs are supported; use viz.database for
+anything else.
+"""
+
+import contextlib
+import datetime
+import pathlib
+import sqlite3
+import uuid
+
+import viz.codecs as codecs
+import viz.steps as steps
+
+
+SCHEME = "sqlite:///"
+
+# Memory mapped I/O for reads [bytes]
+MMAP_SIZE = 256 * 1024**2
+
+# Steps whose volatile columns are read per query, within SQLite's parameter limit
+VOLATILE_BATCH = 500
+
+# Statements are constant and parameterised, so sqlite3 compiles each once per
+# connection and reuses it from its statement cache
+SELECT_SUBTREE = f"""
+WITH RECURSIVE tree AS (
+    SELECT {", ".join(steps.COLUMNS)}, step IS NOT NULL AS pickled FROM steps WHERE id = ?
+    UNION ALL
+    SELECT {", ".join(f"steps.{column}" for column in steps.COLUMNS)}, steps.step IS NOT NULL
+    FROM steps JOIN tree ON steps.parent_id = tree.id
+)
+SELECT * FROM tree ORDER BY depth, parent_id, position
+"""
+SELECT_IDS_BY_PATH = "SELECT id FROM steps WHERE path = ? LIMIT 2"
+SELECT_PICKLE = "SELECT step FROM steps WHERE id = ?"
+# Filled with VOLATILE_BATCH placeholders, or fewer for the last batch
+SELECT_VOLATILE = f"SELECT id, {', '.join(steps.VOLATILE_COLUMNS)} FROM steps WHERE id IN ({{}})"
+
+
+def sqlite_file(db_path):
+    """
+    File of an SQLite database URL
+
+    Args:
+        db_path (str):              Database URL
+
+    Returns:
+        fname (pathlib.Path, None): Database file, None if the URL is not a plain
+                                    SQLite file URL
+    """
+    db_path = str(db_path)
+    if not db_path.startswith(SCHEME) or "?" in db_path:
+        return None
+    fname = db_path[len(SCHEME) :]
+    if fname in ("", ":memory:"):
+        return None
+    return pathlib.Path(fname)
+
+
+def supported(db_path):
+    """
+    Whether a database URL can be read with the fast path
+
+    Args:
+        db_path (str):              Database URL
+
+    Returns:
+        supported (bool):           URL is an SQLite file
+    """
+    return sqlite_file(db_path) is not None
+
+
+@contextlib.contextmanager
+def connect(db_path):
+    """
+    Open a read-only connection to an SQLite database
+
+    Args:
+        db_path (str):              SQLite database URL
+
+    Yields:
+        conn (sqlite3.Connection):  Connection, closed on exit
+    """
+    fname = sqlite_file(db_path)
+    if fname is None:
+        raise Exception(f'Database "{db_path}" is not an SQLite file')
+    # mode=ro never creates the file or takes a write lock
+    conn = sqlite3.connect(f"{fname.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        yield conn
+    finally:
+        conn.close()
+
+
+def _datetime(value):
+    """
+    Datetime of a stored SQLite timestamp
+
+    Args:
+        value (str, None):          ISO timestamp, as written by SQLAlchemy
+
+    Returns:
+        value (datetime.datetime, None):    Datetime
+    """
+    return None if value is None else datetime.datetime.fromisoformat(value)
+
+
+def _uuid(value):
+    """
+    UUID of a stored SQLite UUID
+
+    Args:
+        value (str, None):          32 character hex
+
+    Returns:
+        value (uuid.UUID, None):    UUID
+    """
+    return None if value is None else uuid.UUID(value)
+
+
+def query_subtree(conn, uuid):
+    """
+    Rows of a step and all of its descendants, with one recursive query
+
+    Args:
+        conn (sqlite3.Connection):  Connection
+        uuid (uuid.UUID):           UUID of the root step
+
+    Returns:
+        rows (list):                Tuples of steps.COLUMNS and whether a serialised
+                                    step is stored, parents before children
+    """
+    return conn.execute(SELECT_SUBTREE, (uuid.hex,)).fetchall()
+
+
+def _row(values):
+    """
+    Column mapping of a raw row, with UUIDs and times converted
+
+    Args:
+        values (tuple):             Row of steps.COLUMNS
+
+    Returns:
+        row (dict):                 Column name to value, as steps.step_from_row
+                                    expects
+    """
+    row = dict(zip(steps.COLUMNS, values))
+    row["id"] = _uuid(row["id"])
+    row["parent_id"] = _uuid(row["parent_id"])
+    row["ctime"] = _datetime(row["ctime"])
+    row["mtime"] = _datetime(row["mtime"])
+    return row
+
+
+def _load_pickled(conn, uuid):
+    """
+    Decode a step stored only as a serialised blob, e.g. by database.add_step
+
+    The volatile columns may have been refreshed since the step was stored, so
+    they are copied back onto it, fetched for the whole sub-tree at once.
+
+    Args:
+        conn (sqlite3.Connection):  Connection
+        uuid (uuid.UUID):           UUID of the step
+
+    Returns:
+        step (step.Step):           Decoded step
+    """
+    (blob,) = conn.execute(SELECT_PICKLE, (uuid.hex,)).fetchone()
+    step = codecs.decode(blob)
+    lookup = {stp.uuid.hex: stp for stp in steps.iter_steps(step)}
+    ids = list(lookup)
+    for start in range(0, len(ids), VOLATILE_BATCH):
+        batch = ids[start : start + VOLATILE_BATCH]
+        select = SELECT_VOLATILE.format(", ".join("?" * len(batch)))
+        for hexid, *values in conn.execute(select, batch):
+            row = dict(zip(steps.VOLATILE_COLUMNS, values))
+            row["mtime"] = _datetime(row["mtime"])
+            steps.apply_volatile(lookup[hexid], row)
+    return step
+
+
+def _load_step(conn, uuid):
+    """
+    Rebuild a step and its sub-tree, as database._load_step
+
+    Args:
+        conn (sqlite3.Connection):  Connection
+        uuid (uuid.UUID):           UUID of the root step
+
+    Returns:
+        step (step.Step, None):     Retrieved step
+    """
+    rows = query_subtree(conn, uuid)
+    if len(rows) == 0:
+        return None
+    if len(rows) == 1 and rows[0][-1]:
+        return _load_pickled(conn, uuid)
+    return steps.workflow_from_rows(map(_row, rows))
+
+
+def query_step_by_uuid(db_path=None, uuid=None):
+    """
+    Args:
+        db_path (str):              SQLite database URL
+        uuid (uuid.UUID)            UUID of step to extract
+
+    Returns:
+        step (step.Step)            Retrieved step
+    """
+    with connect(db_path) as conn:
+        return _load_step(conn, uuid)
+
+
+def query_step_by_path(db_path=None, path=None):
+    """
+    Args:
+        db_path (str):              SQLite database URL
+        path (pathlib.Path)         Path of the step to extract
+
+    Returns:
+        step (step.Step)            Retrieved step
+    """
+    with connect(db_path) as conn:
+        ids = conn.execute(SELECT_IDS_BY_PATH, (str(path),)).fetchall()
+        if len(ids) > 1:
+            raise Exception(f'More than one object with the path "{path}"')
+        return _load_step(conn, _uuid(ids[0][0])) if ids else None
@@ -0,0 +1,194 @@
+"""
+Incremental JSON parsing
+
+Yields a flat stream of parse events rather than building the whole document, so
+large files can be searched in bounded memory. Uses ijson when it is installed,
+otherwise a pure stdlib tokenizer with the same event names.
+"""
+
+import json
+import json.decoder
+import re
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+BUFFER_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?")
+_NUMBER_CHARS = re.compile(r"[-+0-9.eE]+")
+_LITERALS = {
+    "true": ("boolean", True),
+    "false": ("boolean", False),
+    "null": ("null", None),
+}
+
+
+def basic_parse(fname, buffer_size=BUFFER_SIZE):
+    """
+    Iterate over the parse events of a JSON file
+
+    Events are (event, value) tuples as produced by ijson.basic_parse:
+    start_map, map_key, end_map, start_array, end_array, string, number,
+    boolean and null.
+
+    Args:
+        fname (pathlib.Path):       JSON file
+        buffer_size (int):          Bytes read per chunk
+
+    Yields:
+        event (tuple):              (event, value)
+    """
+    if ijson is not None:
+        with open(fname, "rb") as fobj:
+            yield from ijson.basic_parse(fobj, buf_size=buffer_size, use_float=True)
+    else:
+        with open(fname, "r", encoding="utf-8") as fobj:
+            yield from _basic_parse(fobj, buffer_size)
+
+
+def _basic_parse(fobj, buffer_size=BUFFER_SIZE):
+    """
+    Stdlib fallback for basic_parse over an open text file
+
+    Only the current chunk plus any token spanning the chunk boundary is held in
+    memory.
+
+    Args:
+        fobj (io.TextIOBase):       Open file
+        buffer_size (int):          Characters read per chunk
+
+    Yields:
+        event (tuple):              (event, value)
+    """
+    buf = ""
+    pos = 0
+    eof = False
+    containers = []
+    expect_key = False
+
+    while True:
+        pos = _WHITESPACE.match(buf, pos).end()
+        if pos >= len(buf):
+            if eof:
+                break
+            chunk = fobj.read(buffer_size)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+
+        char = buf[pos]
+        if char == "{":
+            containers.append("map")
+            expect_key = True
+            pos += 1
+            yield ("start_map", None)
+        elif char == "}":
+            containers.pop()
+            expect_key = False
+            pos += 1
+            yield ("end_map", None)
+        elif char == "[":
+            containers.append("array")
+            pos += 1
+            yield ("start_array", None)
+        elif char == "]":
+            containers.pop()
+            pos += 1
+            yield ("end_array", None)
+        elif char == ",":
+            expect_key = containers[-1] == "map"
+            pos += 1
+        elif char == ":":
+            pos += 1
+        else:
+            # Scalars may be cut by the end of the buffer; read more and retry
+            try:
+                event, value, end = _parse_scalar(buf, pos, eof)
+            except (json.JSONDecodeError, _Incomplete):
+                if eof:
+                    raise
+                chunk = fobj.read(buffer_size)
+                eof = not chunk
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+            if event == "string" and expect_key:
+                event = "map_key"
+            expect_key = False
+            pos = end
+            yield (event, value)
+
+
+class _Incomplete(Exception):
+    """
+    A scalar token runs up to the end of the buffer and may continue
+    """
+
+
+def _parse_scalar(buf, pos, eof):
+    """
+    Parse a string, number or literal starting at `pos`
+
+    Args:
+        buf (str):          Buffer
+        pos (int):          Start of the token
+        eof (bool):         No more data follows the buffer
+
+    Returns:
+        event (str):        Event name
+        value (object):     Parsed value
+        end (int):          End of the token
+    """
+    if buf[pos] == '"':
+        value, end = json.decoder.scanstring(buf, pos + 1)
+        return "string", value, end
+
+    match = _NUMBER_CHARS.match(buf, pos)
+    if match is not None:
+        end = match.end()
+        if end == len(buf) and not eof:
+            raise _Incomplete()
+        token = match.group()
+        if _NUMBER.fullmatch(token) is None:
+            raise json.JSONDecodeError("Invalid number", buf, pos)
+        value = float(token) if any(char in token for char in ".eE") else int(token)
+        return "number", value, end
+
+    for literal, (event, value) in _LITERALS.items():
+        if buf.startswith(literal, pos):
+            return event, value, pos + len(literal)
+        if not eof and len(buf) - pos < len(literal) and literal.startswith(buf[pos:]):
+            raise _Incomplete()
+
+    raise json.JSONDecodeError("Unexpected character", buf, pos)
+
+
+def build_value(events, event, value):
+    """
+    Materialise the JSON value starting with (event, value) from an event stream
+
+    Args:
+        events (iterator):          Remaining events
+        event (str):                First event of the value
+        value (object):             First value of the value
+
+    Returns:
+        value (object):             Python object
+    """
+    if event == "start_map":
+        obj = {}
+        for event, value in events:
+            if event == "end_map":
+                return obj
+            obj[value] = build_value(events, *next(events))
+    elif event == "start_array":
+        obj = []
+        for event, value in events:
+            if event == "end_array":
+                return obj
+            obj.append(build_value(events, event, value))
+    return value
@@ -0,0 +1,219 @@
+"""
+Status roll-up from tasks to their parent workflows
+
+A workflow's status is derived from its direct children:
+
+    * no children:              unchanged
+    * any child failed:         failed
+    * all children completed:   completed
+    * all children unstarted:   unstarted
+    * any child running:        running
+    * any child pending:        pending
+    * otherwise (a mix):        running
+"""
+
+import numpy as np
+
+import viz.columnar as columnar
+import viz.steps as steps
+
+
+def derive_status(child_counts, current):
+    """
+    Workflow status codes from the status counts of their direct children
+
+    Args:
+        child_counts (np.ndarray):  (workflows, statuses) direct child counts
+        current (np.ndarray):       Current status codes, kept for workflows
+                                    without children
+
+    Returns:
+        status (np.ndarray):        Derived status codes
+    """
+    code = steps.status_code
+    total = child_counts.sum(axis=1)
+    return np.select(
+        [
+            total == 0,
+            child_counts[:, code("failed")] > 0,
+            child_counts[:, code("completed")] == total,
+            child_counts[:, code("unstarted")] == total,
+            child_counts[:, code("running")] > 0,
+            child_counts[:, code("pending")] > 0,
+        ],
+        [
+            current,
+            code("failed"),
+            code("completed"),
+            code("unstarted"),
+            code("running"),
+            code("pending"),
+        ],
+        default=code("running"),
+    ).astype(current.dtype)
+
+
+class StatusRollup:
+    """
+    Derive every workflow status from its children, and keep it up to date
+
+    Like Workflow.index, the roll-up does not follow changes to the tree
+    structure; call recompute() after adding or moving steps.
+
+    Attrs:
+        wf (steps.Workflow):            Root workflow
+        columns (ColumnarWorkflow):     Columns of the tree
+        child_counts (np.ndarray):      (rows, statuses) direct child counts
+        task_counts (np.ndarray):       (rows, statuses) task counts in each
+                                        sub-tree
+    """
+
+    def __init__(self, wf):
+        """
+        Initialise the roll-up and bring every workflow status up to date
+
+        Args:
+            wf (steps.Workflow):        Root workflow
+
+        Returns:
+            None
+        """
+        self.wf = wf
+        self.recompute()
+
+    def recompute(self):
+        """
+        Recompute all workflow statuses and counts bottom-up, one depth level
+        at a time
+
+        Args:
+
+        Returns:
+            changed (list):             Workflows whose status changed
+        """
+        cols = self.columns = columnar.ColumnarWorkflow.from_workflow(self.wf)
+        self._rows = {uuid: row for row, uuid in enumerate(cols.uuids)}
+        nrows = len(cols)
+        nstatuses = len(steps.STATUSES)
+        self.child_counts = np.zeros((nrows, nstatuses), dtype=np.int64)
+        self.task_counts = np.zeros((nrows, nstatuses), dtype=np.int64)
+
+        tasks = np.flatnonzero(~cols.is_workflow)
+        self.task_counts[tasks, cols.status[tasks]] = 1
+
+        original = cols.status.copy()
+        for depth in range(int(cols.depth.max(initial=0)), 0, -1):
+            # Children at this depth are final, so their parents can be derived
+            rows = np.flatnonzero(cols.depth == depth)
+            parents = cols.parent[rows]
+            np.add.at(self.child_counts, (parents, cols.status[rows]), 1)
+            np.add.at(self.task_counts, parents, self.task_counts[rows])
+            parents = np.unique(parents)
+            cols.status[parents] = derive_status(
+                self.child_counts[parents], cols.status[parents]
+            )
+
+        changed = np.flatnonzero(cols.status != original)
+        for row in changed:
+            cols.objects[row].status = steps.STATUSES[cols.status[row]]
+        return [cols.objects[row] for row in changed]
+
+    def counts(self, step=None):
+        """
+        Number of tasks in each status below a step
+
+        Args:
+            step (steps.Step):          Step, the root workflow if None
+
+        Returns:
+            counts (dict):              Status to count, for statuses present
+        """
+        row = 0 if step is None else self._rows[step.uuid.int]
+        return {
+            steps.STATUSES[code]: int(count)
+            for code, count in enumerate(self.task_counts[row])
+            if count
+        }
+
+    def _grow(self, code):
+        """
+        Widen the count arrays for a status registered after recompute()
+
+        Args:
+            code (int):                 Status code
+
+        Returns:
+            None
+        """
+        extra = code + 1 - self.child_counts.shape[1]
+        if extra > 0:
+            self.child_counts = np.pad(self.child_counts, ((0, 0), (0, extra)))
+            self.task_counts = np.pad(self.task_counts, ((0, 0), (0, extra)))
+
+    def update(self, task, status, db_path=None):
+        """
+        Set the status of a single task and roll it up its ancestor chain
+
+        Only the task's ancestors are touched: their task counts always change,
+        their statuses only until one is left unchanged. Workflow statuses are
+        derived, so workflows are refused.
+
+        Args:
+            task (steps.Task):          Task in the rolled-up workflow
+            status (str):               New status
+            db_path (str):              If given, upsert the changed steps into
+                                        this database
+
+        Returns:
+            changed (list):             Steps whose status changed, the task
+                                        first then its ancestors
+        """
+        if isinstance(task, steps.Workflow):
+            raise Exception(
+                f'Cannot set the status of workflow "{task.name}", it is rolled up from its children'
+            )
+        cols = self.columns
+        row = self._rows[task.uuid.int]
+        old, new = int(cols.status[row]), steps.status_code(status)
+        if old == new:
+            return []
+        self._grow(new)
+
+        task.status = status
+        cols.status[row] = new
+        self.task_counts[row, old] -= 1
+        self.task_counts[row, new] += 1
+        changed = [task]
+
+        # (old, new) status of the child whose parent is being updated
+        child = (old, new)
+        parent = cols.parent[row]
+        while parent >= 0:
+            self.task_counts[parent, old] -= 1
+            self.task_counts[parent, new] += 1
+            if child is not None:
+                self.child_counts[parent, child[0]] -= 1
+                self.child_counts[parent, child[1]] += 1
+                before = int(cols.status[parent])
+                after = int(
+                    derive_status(
+                        self.child_counts[parent : parent + 1],
+                        cols.status[parent : parent + 1],
+                    )[0]
+                )
+                if after != before:
+                    cols.status[parent] = after
+                    step = cols.objects[parent]
+                    step.status = steps.STATUSES[after]
+                    changed.append(step)
+                    child = (before, after)
+                else:
+                    child = None
+            parent = cols.parent[parent]
+
+        if db_path is not None:
+            # SQLAlchemy is only needed, and imported, to write back
+            import viz.database as database
+
+            database.upsert_steps(db_path, changed)
+        return changed
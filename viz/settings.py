@@ -1,13 +1,14 @@
 """ """
 
 import argparse
-import json
 import pathlib
 import uuid
 
-import viz.database as database
-import viz.steps as steps
 
+# Default database; match viz.database.RDBMS/DATABASE, which is only imported (with
+# SQLAlchemy) when a database cannot be read directly
+RDBMS = "sqlite"
+DATABASE = pathlib.Path("orchestrator.db")
 
 STATUS2COLOUR = {
     "unstarted": "grey62",
@@ -48,7 +49,23 @@ class Settings:
 # === TO REPLACE WITH core.Settings instance ==============================================
 
 
-def get_args(argv):
+def _non_negative(value):
+    """
+    argparse type of options that count rows/nodes
+
+    Args:
+        value (str):        Option value
+
+    Returns:
+        value (int):        Non-negative integer
+    """
+    value = int(value)
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"{value} is negative")
+    return value
+
+
+def get_args(argv, command=None):
     """
     CLI args for visualisation
 
@@ -60,11 +77,19 @@ def get_args(argv):
     5. JSON + UUID
     5. JSON + path (potentially non-unique!)
 
+    Only the options of the given command are accepted, so e.g. the table
+    rejects --max-depth rather than ignoring it.
+
     Args:
+        argv (list):        List of arguments
+        command (str):      "table" or "tree" for their view options, None for
+                            the workflow options only
 
     Returns:
-        None
+        args (argparse.Namespace):  Arguments
     """
+    if command not in (None, "table", "tree"):
+        raise Exception(f'Command "{command}" not recognised')
     parser = argparse.ArgumentParser(description="CLI options for visualisation")
 
     parser.add_argument(
@@ -80,7 +105,7 @@ def get_args(argv):
         "-f",
         "--fname",
         type=pathlib.Path,
-        default=database.DATABASE,
+        default=DATABASE,
         help="Path to the status object (DB/Pickle/JSON)",
     )
 
@@ -99,9 +124,106 @@ def get_args(argv):
         default=None,
     )
 
+    parser.add_argument(
+        "--allow-pickle",
+        action="store_true",
+        help="Load legacy pickled steps from the database; only for trusted databases",
+    )
+
+    if command is not None:
+        view = parser.add_argument_group(f"{command} options")
+
+        view.add_argument(
+            "--offset",
+            type=_non_negative,
+            default=0,
+            help="Number of rows/nodes skipped before the first one shown",
+        )
+
+        view.add_argument(
+            "--limit",
+            type=_non_negative,
+            default=None,
+            help="Maximum number of rows/nodes shown",
+        )
+
+        view.add_argument(
+            "-w",
+            "--watch",
+            action="store_true",
+            help="Keep the view open and update it as the database changes (db only)",
+        )
+
+        view.add_argument(
+            "-r",
+            "--refresh",
+            type=float,
+            default=5.0,
+            help="Seconds between polls of the database in --watch mode",
+        )
+
+    if command == "tree":
+        view.add_argument(
+            "--max-depth",
+            type=_non_negative,
+            default=None,
+            help="Deepest level of the tree shown; deeper sub-workflows are summarised",
+        )
+
+        view.add_argument(
+            "--collapse-completed",
+            action="store_true",
+            help="Show fully completed sub-workflows as one line with their counts",
+        )
+
+    if command == "table":
+        view.add_argument(
+            "--format",
+            type=str,
+            default="rich",
+            choices=["rich", "csv", "tsv", "jsonl", "parquet"],
+            help="Table output format; anything but rich is plain, machine-readable data",
+        )
+
+        view.add_argument(
+            "-o",
+            "--output",
+            type=pathlib.Path,
+            default=None,
+            help="File to write --format output to (default stdout)",
+        )
+
+        view.add_argument(
+            "--stream",
+            action="store_true",
+            help="Print table rows in chunks as they are formatted",
+        )
+
+        view.add_argument(
+            "--pager",
+            action="store_true",
+            help="Stream the table through $PAGER",
+        )
+
     # Parse arguments
     args = parser.parse_args(argv)
 
+    # Options that only apply to some modes are refused elsewhere
+    if command is not None:
+        if args.watch and args.source != "db":
+            parser.error("--watch is only supported with a database source")
+        if args.watch and args.refresh <= 0:
+            parser.error("--refresh must be positive")
+    if command == "table":
+        if args.format == "rich" and args.output is not None:
+            parser.error("--output needs a --format other than rich")
+        if args.format != "rich":
+            for option in ("watch", "stream", "pager"):
+                if getattr(args, option):
+                    parser.error(f"--{option} is only supported with --format rich")
+        if args.watch and (args.stream or args.pager):
+            parser.error("--watch cannot be combined with --stream or --pager")
+
     if isinstance(args.uuid, str):
         args.uuid = uuid.UUID(args.uuid)
 
@@ -122,63 +244,45 @@ def load_wf(args):
 
     # In order preference, db, pkl, json, unless explicit
 
+    # Only the modules needed by the source are imported
+
     # Main database method - query via UUID or path trivially as it's flat
     if args.source == "db":
+        import viz.codecs as codecs
+        import viz.fastdb as fastdb
+
+        if args.allow_pickle:
+            codecs.ALLOW_PICKLE = True
+
         if not args.fname.is_file():
             raise Exception(f'Database at "{args.fname}" not found')
+        # SQLite files are read directly with sqlite3, anything else via the ORM
+        db_path = f"{RDBMS}:///{args.fname}"
+        if fastdb.supported(db_path):
+            backend = fastdb
+        else:
+            import viz.database as backend
         if args.uuid is not None:
-            workflow = database.query_step_by_uuid(
-                db_path=f"{database.RDBMS}:///{args.fname}", uuid=args.uuid
-            )
+            workflow = backend.query_step_by_uuid(db_path=db_path, uuid=args.uuid)
         elif args.path is not None:
-            workflow = database.query_step_by_path(
-                db_path=f"{database.RDBMS}:///{args.fname}", path=str(args.path)
-            )
+            workflow = backend.query_step_by_path(db_path=db_path, path=str(args.path))
 
-    # Secondary method - use the pickle file, loop through top level
+    # Secondary method - use the pickle file, any depth via the workflow index
     elif args.source == "pkl":
+        import viz.steps as steps
+
         if not args.fname.is_file():
             raise Exception(f'Pickle file at "{args.fname}" not found')
         obj = steps.load_workflow_pickle(args.fname)
-        if args.uuid is not None:
-            if obj.uuid == args.uuid:
-                workflow = obj
-            else:
-                for step in obj.steps:
-                    if step.uuid == args.uuid:
-                        workflow = step
-        elif args.path is not None:
-            if obj.path == args.path:
-                workflow = obj
-            else:
-                for step in obj.steps:
-                    if step.path == args.path:
-                        workflow = step
-        else:
-            workflow = obj
+        workflow = obj.index.find(uuid=args.uuid, path=args.path)
 
-    # Secondary method - use the JSON file, loop through top level
+    # Secondary method - stream the JSON file, only building the requested sub-tree
     elif args.source == "json":
+        import viz.steps as steps
+
         if not args.fname.is_file():
             raise Exception(f'JSON file at "{args.fname}" not found')
-        with open(args.fname, "r") as fobj:
-            obj = json.load(fobj)
-        if args.uuid is not None:
-            if obj.uuid == args.uuid:
-                workflow = obj
-            else:
-                for step in obj.steps:
-                    if step.uuid == args.uuid:
-                        workflow = step
-        elif args.path is not None:
-            if obj.path == args.path:
-                workflow = obj
-            else:
-                for step in obj.steps:
-                    if step.path == args.path:
-                        workflow = step
-        else:
-            workflow = obj
+        workflow = steps.load_workflow_json(args.fname, uuid=args.uuid, path=args.path)
 
     # Catch other source types
     else:
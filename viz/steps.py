@@ -3,14 +3,20 @@ These are a series of dummy functions to mimic a real workflow from Orchestrator
 """
 
 import datetime
+import json
+import os
 import pathlib
 import pickle
 import random
+import sys
 import uuid
 
-import viz.database as database
+import viz.jsonstream as jsonstream
 
 
+JSON_FORMAT = "orchestrator-workflow"
+JSON_VERSION = 1
+
 STATUS = [
     "unstarted",
     "pending",
@@ -19,6 +25,119 @@ STATUS = [
     "completed",
 ]
 
+# Statuses are stored on steps as small integer codes; unknown statuses are
+# registered on first use
+STATUSES = list(STATUS)
+_STATUS2CODE = {status: code for code, status in enumerate(STATUSES)}
+
+# Times are stored as integer microseconds since this (naive) epoch
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+# Scalar columns of a stored step (viz.database.Step), in table order, kept here
+# so readers that bypass SQLAlchemy share them
+COLUMNS = (
+    "id",
+    "name",
+    "status",
+    "path",
+    "ctime",
+    "mtime",
+    "parent_id",
+    "depth",
+    "position",
+    "type",
+    "flow_type",
+    "scheduler_type",
+    "partition",
+    "nodes",
+    "ppn",
+    "procs",
+    "wallclock",
+    "wallclock_expired",
+    "wallclock_remaining",
+)
+# Scalar columns that change over a step's lifetime, refreshed by upsert_steps
+VOLATILE_COLUMNS = ("status", "mtime", "wallclock_expired", "wallclock_remaining")
+
+
+def status_code(status):
+    """
+    Integer code of a status, registering it if unseen
+
+    Args:
+        status (str):       Status
+
+    Returns:
+        code (int):         Index into STATUSES
+    """
+    code = _STATUS2CODE.get(status)
+    if code is None:
+        code = _STATUS2CODE.setdefault(status, len(STATUSES))
+        if code == len(STATUSES):
+            STATUSES.append(status)
+    return code
+
+
+def _to_micros(value):
+    """
+    Convert a naive datetime to integer microseconds since the epoch
+
+    Args:
+        value (datetime.datetime, None):    Datetime
+
+    Returns:
+        value (int, datetime.datetime, None):   Microseconds, or the value itself
+                                                if it is None or timezone aware
+    """
+    if value is None or value.tzinfo is not None:
+        return value
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _from_micros(value):
+    """
+    Inverse of _to_micros
+
+    Args:
+        value (int, datetime.datetime, None):   Stored time
+
+    Returns:
+        value (datetime.datetime, None):        Datetime
+    """
+    if isinstance(value, int):
+        return _EPOCH + datetime.timedelta(microseconds=value)
+    return value
+
+
+def _restore_state(obj, state):
+    """
+    Restore pickled state onto a slotted object
+
+    Handles both the current (slot dict) state and the __dict__ state of
+    pickles written before the classes were slotted.
+
+    Args:
+        obj (object):           Instance being unpickled
+        state (dict, tuple):    Pickled state
+
+    Returns:
+        None
+    """
+    if isinstance(state, tuple):
+        state = {**(state[0] or {}), **(state[1] or {})}
+    for key, value in state.items():
+        # Previously instance attributes, now class attributes/derived
+        if key == "_index" or (key == "type" and isinstance(obj, Step)):
+            continue
+        # Slotted pickles before UUIDs were kept as objects
+        if key == "_uuid" and isinstance(value, int):
+            value = uuid.UUID(int=value)
+        # Status codes are process-local, so statuses are pickled by name
+        if key == "_status" and isinstance(value, str):
+            value = status_code(value)
+        setattr(obj, key, value)
+
 
 class Scheduler:
     """
@@ -33,6 +152,17 @@ class Scheduler:
         wallclock (int):    Wallclock [s]
     """
 
+    __slots__ = (
+        "type",
+        "partition",
+        "nodes",
+        "ppn",
+        "procs",
+        "wallclock",
+        "wallclock_remaining",
+        "wallclock_expired",
+    )
+
     def __init__(self):
         """
         Initialise Scheduler
@@ -51,6 +181,12 @@ class Scheduler:
         self.wallclock_remaining = None
         self.wallclock_expired = None
 
+    def __getstate__(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __setstate__(self, state):
+        _restore_state(self, state)
+
     @property
     def table(self):
         """
@@ -72,6 +208,12 @@ class Step:
     """
     Step base instance
 
+    Slotted, with compact internal storage behind the public attributes: the
+    status is an integer code, times integer microseconds and, once linked by
+    Workflow.fix_paths, the path only the final component relative to the
+    parent. Paths are still values: changing a workflow's path does not move
+    the steps below it.
+
     Attrs:
         name (str):                 Step name
         status (str):               Step status
@@ -83,6 +225,19 @@ class Step:
         scheduler (scheduler):      Scheduler object
     """
 
+    __slots__ = (
+        "_name",
+        "_status",
+        "_path",
+        "_parent",
+        "_uuid",
+        "_ctime",
+        "_mtime",
+        "scheduler",
+        "parent_flow_type",
+    )
+    type = None
+
     def __init__(self, name, status):
         """
         Initialise Step
@@ -96,6 +251,7 @@ class Step:
         """
         self.name = name
         self.status = status
+        self._parent = None
         self.path = pathlib.Path().resolve() / self.name.replace(" ", "_").lower()
         self.uuid = uuid.uuid4()
         self.ctime = datetime.datetime.now()
@@ -103,6 +259,138 @@ class Step:
         self.scheduler = None
         self.parent_flow_type = "serial"
 
+    def __getstate__(self):
+        """
+        Slot values, with an absolute path in place of the parent link so a
+        pickled step never drags its parent workflow along, and the status by
+        name rather than by its process-local code
+        """
+        state = {}
+        for cls in type(self).__mro__:
+            for key in getattr(cls, "__slots__", ()):
+                if key not in ("_index", "_parent", "_abspath", "__weakref__") and hasattr(self, key):
+                    state[key] = getattr(self, key)
+        state["_status"] = self.status
+        state["_path"] = self.path
+        return state
+
+    def __setstate__(self, state):
+        self._parent = None
+        _restore_state(self, state)
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        self._name = sys.intern(value) if isinstance(value, str) else value
+
+    @property
+    def status(self):
+        return STATUSES[self._status]
+
+    @status.setter
+    def status(self, value):
+        self._status = status_code(value)
+
+    @property
+    def status_code(self):
+        """
+        Integer code of the status, an index into STATUSES
+
+        Returns:
+            code (int):                 Status code
+        """
+        return self._status
+
+    @property
+    def parent(self):
+        """
+        Workflow the step is linked to by Workflow.fix_paths, None if unlinked
+
+        Returns:
+            parent (Workflow, None):    Parent workflow
+        """
+        return self._parent
+
+    @property
+    def path_segment(self):
+        """
+        Final path component, when the path is stored relative to the parent
+
+        Returns:
+            segment (str, None):        Component below parent.path, None if the
+                                        path is stored in full
+        """
+        path = self._path
+        return path if type(path) is str else None
+
+    @property
+    def path(self):
+        path = self._path
+        if type(path) is str:
+            # The parent workflow caches its own path, so this is one join
+            return self._parent.path / path
+        return path
+
+    @path.setter
+    def path(self, value):
+        value = pathlib.Path(value)
+        parent = self._parent
+        if parent is not None and value.parent == parent.path:
+            self._path = sys.intern(value.name)
+        else:
+            self._path = value
+
+    @property
+    def uuid(self):
+        return self._uuid
+
+    @uuid.setter
+    def uuid(self, value):
+        self._uuid = value
+
+    @property
+    def ctime(self):
+        return _from_micros(self._ctime)
+
+    @ctime.setter
+    def ctime(self, value):
+        self._ctime = _to_micros(value)
+
+    @property
+    def mtime(self):
+        return _from_micros(self._mtime)
+
+    @mtime.setter
+    def mtime(self, value):
+        self._mtime = _to_micros(value)
+
+    @property
+    def ctime_micros(self):
+        """
+        Creation time as stored, integer microseconds since the (naive) epoch
+
+        Returns:
+            micros (int, None):         Microseconds, None if unset or timezone
+                                        aware (use ctime)
+        """
+        value = self._ctime
+        return value if type(value) is int else None
+
+    @property
+    def mtime_micros(self):
+        """
+        Modification time as stored, as ctime_micros
+
+        Returns:
+            micros (int, None):         Microseconds, None if unset or timezone
+                                        aware (use mtime)
+        """
+        value = self._mtime
+        return value if type(value) is int else None
+
 
 class Task(Step):
     """
@@ -119,6 +407,9 @@ class Task(Step):
         scheduler (scheduler):      Scheduler object
     """
 
+    __slots__ = ()
+    type = "task"
+
     def __init__(self, name, status):
         """
         Initialise Task
@@ -131,7 +422,7 @@ class Task(Step):
             None
         """
         super().__init__(name, status)
-        self.type = "task"
+
 
 class Workflow(Step):
     """
@@ -148,7 +439,11 @@ class Workflow(Step):
         scheduler (scheduler):      Scheduler object
     """
 
-    def __init__(self, name, status="unstarted", steps=[]):
+    # Weakly referenceable, e.g. as keys of per-parent caches
+    __slots__ = ("steps", "flow_type", "_index", "_abspath", "__weakref__")
+    type = "workflow"
+
+    def __init__(self, name, status="unstarted", steps=None):
         """
         Initialise workflow
 
@@ -161,9 +456,73 @@ class Workflow(Step):
             None
         """
         super().__init__(name, status)
-        self.steps = steps
+        self.steps = steps if steps is not None else []
         self.flow_type = 'serial'
-        self.type = "workflow"
+        self._index = None
+
+    def __setstate__(self, state):
+        """
+        Restore a pickled workflow, without an index
+        """
+        self._index = None
+        self._abspath = None
+        super().__setstate__(state)
+        for step in self.steps:
+            _link(self, step)
+
+    @property
+    def path(self):
+        """
+        Path of the workflow, resolved once and cached for its children
+
+        Returns:
+            path (pathlib.Path):        Path
+        """
+        path = self._abspath
+        if path is None:
+            path = self._abspath = Step.path.fget(self)
+        return path
+
+    @path.setter
+    def path(self, value):
+        value = pathlib.Path(value)
+        # Unset while __init__ runs
+        children = getattr(self, "steps", None)
+        if children:
+            old = self.path
+            if value != old:
+                # Children keep their own (absolute) paths
+                for child in children:
+                    if type(child._path) is str:
+                        child._path = old / child._path
+        Step.path.fset(self, value)
+        self._abspath = None
+
+    @property
+    def index(self):
+        """
+        Lookup tables for every step below this workflow, built on first use
+
+        The index is not updated when steps are added or moved; call reindex()
+        after changing the tree structure.
+
+        Returns:
+            index (WorkflowIndex):      Index
+        """
+        if self._index is None:
+            self._index = WorkflowIndex(self)
+        return self._index
+
+    def reindex(self):
+        """
+        Discard the cached index after the tree structure has changed
+
+        Args:
+
+        Returns:
+            None
+        """
+        self._index = None
 
     def fix_paths(self):
         """
@@ -175,7 +534,288 @@ class Workflow(Step):
             None
         """
         for step in self.steps:
-            step.path = self.path / step.name.replace(" ", "_").lower()
+            _link(self, step, self.path / step.name.replace(" ", "_").lower())
+
+
+class WorkflowIndex:
+    """
+    UUID, path and parent lookups for every step in a workflow
+
+    Built in a single traversal, so any step at any depth resolves in O(1). The
+    steps are also kept in pre-order, the row order of the table view, so a
+    window of rows is a slice rather than a walk.
+
+    Attrs:
+        root (Workflow):            Indexed workflow
+        steps (list):               Every step, in pre-order, root first
+        rows (dict):                UUID to position in steps
+        by_uuid (dict):             UUID to step
+        by_path (dict):             Path string to list of steps, built on first
+                                    use
+        parents (dict):             UUID to parent workflow (None for the root)
+    """
+
+    def __init__(self, wf):
+        """
+        Initialise WorkflowIndex
+
+        Args:
+            wf (Workflow):          Workflow to index
+
+        Returns:
+            None
+        """
+        self.root = wf
+        self.steps = []
+        self.rows = {}
+        self.by_uuid = {}
+        self.parents = {}
+        self._by_path = None
+
+        for row, (step, parent, _, _) in enumerate(walk(wf)):
+            self.steps.append(step)
+            self.rows[step.uuid] = row
+            self.by_uuid[step.uuid] = step
+            self.parents[step.uuid] = parent
+
+    def __len__(self):
+        return len(self.steps)
+
+    @property
+    def by_path(self):
+        """
+        Path string to list of steps, formatted on first use only
+
+        Returns:
+            by_path (dict):         Path string to list of steps
+        """
+        if self._by_path is None:
+            self._by_path = {}
+            for step in self.steps:
+                self._by_path.setdefault(str(step.path), []).append(step)
+        return self._by_path
+
+    def find(self, uuid=None, path=None):
+        """
+        Find a step by UUID or path
+
+        Args:
+            uuid (uuid.UUID, None):         UUID of the step
+            path (pathlib.Path, None):      Path of the step
+
+        Returns:
+            step (Step, None):              Step, or None if not found
+        """
+        if uuid is not None:
+            return self.by_uuid.get(uuid)
+        if path is not None:
+            matches = self.by_path.get(str(path), [])
+            if len(matches) > 1:
+                raise Exception(f'More than one object with the path "{path}"')
+            return matches[0] if matches else None
+        return self.root
+
+    def parent(self, step):
+        """
+        Parent workflow of a step, None for the root
+
+        Args:
+            step (Step):            Step
+
+        Returns:
+            parent (Workflow, None):    Parent
+        """
+        return self.parents[step.uuid]
+
+    def ancestors(self, step):
+        """
+        Walk from a step's parent up to the root
+
+        Args:
+            step (Step):            Step
+
+        Yields:
+            parent (Workflow):      Ancestors, nearest first
+        """
+        parent = self.parents[step.uuid]
+        while parent is not None:
+            yield parent
+            parent = self.parents[parent.uuid]
+
+    def depth(self, step):
+        """
+        Number of ancestors of a step
+
+        Args:
+            step (Step):            Step
+
+        Returns:
+            depth (int):            Depth, 0 for the root
+        """
+        return sum(1 for _ in self.ancestors(step))
+
+
+def walk(wf):
+    """
+    Walk a (sub)workflow depth-first, with where each step sits in the tree
+
+    Args:
+        wf (Step):                  Root step
+
+    Yields:
+        step (Step):                Step, in pre-order
+        parent (Workflow, None):    Parent, None for the root
+        depth (int):                Depth below the root
+        position (int):             Index in the parent's steps
+    """
+    stack = [(wf, None, 0, 0)]
+    while stack:
+        node = stack.pop()
+        yield node
+        step, _, depth, _ = node
+        if isinstance(step, Workflow):
+            stack.extend(
+                (child, step, depth + 1, position)
+                for position, child in reversed(list(enumerate(step.steps)))
+            )
+
+
+def iter_steps(wf):
+    """
+    Walk a (sub)workflow depth-first, yielding every step including the root
+
+    Args:
+        wf (Step):                  Root step
+
+    Yields:
+        step (Step):                Step, in pre-order
+    """
+    for step, _, _, _ in walk(wf):
+        yield step
+
+
+def _link(parent, step, path=None):
+    """
+    Point a child at its parent workflow, so its path is stored relative to it
+
+    Args:
+        parent (Workflow):      Parent workflow
+        step (Step):            Child step
+        path (pathlib.Path):    New path of the child, None to keep its path
+
+    Returns:
+        None
+    """
+    # Resolved against the current parent (and cached, for a workflow) first
+    current = step.path
+    step._parent = parent
+    step.path = current if path is None else path
+
+
+ROW2CLASS = {
+    "task": Task,
+    "workflow": Workflow,
+}
+
+
+def step_from_row(row, parent=None, parent_path=None):
+    """
+    Rebuild a single step (without children) from its database columns
+
+    Args:
+        row (mapping):          Column name to value
+        parent (Workflow):      Parent workflow to link to, if any
+        parent_path (str):      Stored path of the parent, so a path directly
+                                below it is kept as its final component without
+                                being parsed
+
+    Returns:
+        step (Step):            Step, Task or Workflow instance
+    """
+    cls = ROW2CLASS.get(row["type"], Step)
+    step = cls.__new__(cls)
+    step._parent = parent
+    step.name = row["name"]
+    step.status = row["status"]
+    head, _, name = row["path"].rpartition(os.sep)
+    if parent is not None and name and head == parent_path:
+        step._path = sys.intern(name)
+    else:
+        step._path = pathlib.Path(row["path"])
+    step.uuid = row["id"]
+    step.ctime = row["ctime"]
+    step.mtime = row["mtime"]
+    step.parent_flow_type = "serial"
+    if cls is Workflow:
+        step.steps = []
+        step.flow_type = row["flow_type"] or "serial"
+        step._index = None
+        step._abspath = None
+
+    step.scheduler = None
+    if row["scheduler_type"] is not None:
+        scheduler = Scheduler()
+        scheduler.type = row["scheduler_type"]
+        scheduler.partition = row["partition"]
+        scheduler.nodes = row["nodes"]
+        scheduler.ppn = row["ppn"]
+        scheduler.procs = row["procs"]
+        scheduler.wallclock = row["wallclock"]
+        scheduler.wallclock_expired = row["wallclock_expired"]
+        scheduler.wallclock_remaining = row["wallclock_remaining"]
+        step.scheduler = scheduler
+    return step
+
+
+def workflow_from_rows(rows):
+    """
+    Rebuild a (sub)workflow from database rows
+
+    Args:
+        rows (list):            Row mappings, ordered parents first then by
+                                position, with the root first
+
+    Returns:
+        wf (Step):              Root step
+    """
+    # uuid -> (step, stored path)
+    lookup = {}
+    root = None
+    for row in rows:
+        if root is None:
+            step = root = step_from_row(row)
+        else:
+            parent, parent_path = lookup[row["parent_id"]]
+            step = step_from_row(row, parent, parent_path)
+            step.parent_flow_type = parent.flow_type
+            parent.steps.append(step)
+        lookup[row["id"]] = (step, row["path"])
+    return root
+
+
+def apply_volatile(step, row):
+    """
+    Overwrite the volatile attributes of a step with column values
+
+    Args:
+        step (step.Step):           Step
+        row (mapping):              Row with VOLATILE_COLUMNS
+
+    Returns:
+        changed (bool):             Whether any attribute changed
+    """
+    changed = step.status != row["status"] or step.mtime != row["mtime"]
+    step.status = row["status"]
+    step.mtime = row["mtime"]
+    scheduler = step.scheduler
+    if scheduler is not None:
+        changed = changed or (
+            scheduler.wallclock_expired != row["wallclock_expired"]
+            or scheduler.wallclock_remaining != row["wallclock_remaining"]
+        )
+        scheduler.wallclock_expired = row["wallclock_expired"]
+        scheduler.wallclock_remaining = row["wallclock_remaining"]
+    return changed
 
 
 # ========================================================================================================================
@@ -239,20 +879,40 @@ def make_tmp_workflow():
                 roll = random.randint(0, 3)
                 status = STATUS[roll]
             tasks.append(make_tmp_task(step, status))
-        wf.steps.append(
-            Workflow(
-                model,
-                steps=tasks,
-                status="completed"
-                if all([t.status == "completed" for t in tasks])
-                else "failed",
-            )
-        )
+        wf.steps.append(Workflow(model, steps=tasks))
         wf.steps[-1].fix_paths()
 
     wf.fix_paths()
 
     wf.steps[2].steps.append(Task("new step", status="unstarted"))
+
+    # Workflow statuses follow from their tasks
+    import viz.rollup as rollup
+
+    rollup.StatusRollup(wf)
+    return wf
+
+
+def make_tmp_sweep(n_workflows=100, n_tasks=100):
+    """
+    Make a large, flat parameter sweep for benchmarking
+
+    Args:
+        n_workflows (int):      Number of sub-workflows
+        n_tasks (int):          Number of tasks per sub-workflow
+
+    Returns:
+        wf (workflow.Workflow):         Temp workflow object
+    """
+    wf = Workflow("sweep")
+    for i in range(n_workflows):
+        tasks = [
+            make_tmp_task(f"step {j}", random.choice(STATUS)) for j in range(n_tasks)
+        ]
+        wf.steps.append(Workflow(f"model {i}", steps=tasks))
+    wf.fix_paths()
+    for step in wf.steps:
+        step.fix_paths()
     return wf
 
 
@@ -273,7 +933,245 @@ def load_workflow_pickle(fname):
     return obj
 
 
+def step_to_dict(step):
+    """
+    JSON-serialisable fields of a single step, without its children
+
+    Schema (version 1), keys in this order:
+        type (str, None):           "task", "workflow" or None for a bare Step
+        uuid (str):                 UUID hex
+        path (str):                 Path
+        name (str):                 Name
+        status (str):               Status
+        ctime (str):                Creation time, ISO 8601
+        mtime (str):                Modification time, ISO 8601
+        parent_flow_type (str):     Flow type of the parent
+        flow_type (str):            Workflows only, "serial" or "parallel"
+        scheduler (dict, None):     Scheduler attributes
+        steps (list):               Workflows only, child steps, always last
+
+    Args:
+        step (Step):            Step
+
+    Returns:
+        node (dict):            Step fields
+    """
+    node = {
+        "type": getattr(step, "type", None),
+        "uuid": step.uuid.hex,
+        "path": str(step.path),
+        "name": step.name,
+        "status": step.status,
+        "ctime": step.ctime.isoformat(),
+        "mtime": step.mtime.isoformat(),
+        "parent_flow_type": step.parent_flow_type,
+    }
+    if isinstance(step, Workflow):
+        node["flow_type"] = step.flow_type
+    scheduler = step.scheduler
+    node["scheduler"] = None if scheduler is None else {
+        "type": scheduler.type,
+        "partition": scheduler.partition,
+        "nodes": scheduler.nodes,
+        "ppn": scheduler.ppn,
+        "procs": scheduler.procs,
+        "wallclock": scheduler.wallclock,
+        "wallclock_remaining": scheduler.wallclock_remaining,
+        "wallclock_expired": scheduler.wallclock_expired,
+    }
+    return node
+
+
+def step_from_dict(node):
+    """
+    Rebuild a step, and any children, from its JSON fields
+
+    Args:
+        node (dict):            Step fields, see step_to_dict
+
+    Returns:
+        step (Step):            Step, Task or Workflow instance
+    """
+    scheduler = node.get("scheduler") or {}
+    step = step_from_row(
+        {
+            "id": uuid.UUID(node["uuid"]),
+            "name": node["name"],
+            "status": node["status"],
+            "path": node["path"],
+            "ctime": datetime.datetime.fromisoformat(node["ctime"]),
+            "mtime": datetime.datetime.fromisoformat(node["mtime"]),
+            "type": node.get("type"),
+            "flow_type": node.get("flow_type"),
+            "scheduler_type": scheduler.get("type"),
+            "partition": scheduler.get("partition"),
+            "nodes": scheduler.get("nodes"),
+            "ppn": scheduler.get("ppn"),
+            "procs": scheduler.get("procs"),
+            "wallclock": scheduler.get("wallclock"),
+            "wallclock_expired": scheduler.get("wallclock_expired"),
+            "wallclock_remaining": scheduler.get("wallclock_remaining"),
+        }
+    )
+    step.parent_flow_type = node.get("parent_flow_type", "serial")
+    for child in node.get("steps", []):
+        step.steps.append(step_from_dict(child))
+        _link(step, step.steps[-1])
+    return step
+
+
+def _iter_json(step):
+    """
+    Serialise a step and its children as JSON text, one node at a time
+
+    Args:
+        step (Step):            Step
+
+    Yields:
+        text (str):             JSON fragments
+    """
+    text = json.dumps(step_to_dict(step), separators=(",", ":"))
+    if not isinstance(step, Workflow):
+        yield text
+        return
+    yield text[:-1] + ',"steps":['
+    for index, child in enumerate(step.steps):
+        if index:
+            yield ","
+        yield from _iter_json(child)
+    yield "]}"
+
+
+def dump_workflow_json(obj, fname):
+    """
+    Dump workflow to JSON file
+
+    The document is {"format": JSON_FORMAT, "version": JSON_VERSION, "workflow":
+    <node>}, with nodes as described in step_to_dict. It is written node by node,
+    so no full copy of the document is built in memory.
+    """
+    with open(fname, "w", encoding="utf-8") as fobj:
+        fobj.write(f'{{"format":"{JSON_FORMAT}","version":{JSON_VERSION},"workflow":')
+        fobj.writelines(_iter_json(obj))
+        fobj.write("}")
+
+
+def _check_json_header(fmt, version):
+    """
+    Refuse documents that are not workflows, or newer than this reader
+
+    Args:
+        fmt (str, None):        Document "format"
+        version (int, None):    Document "version"
+
+    Returns:
+        None
+    """
+    if fmt != JSON_FORMAT:
+        raise Exception(f'Not a workflow JSON file, format "{fmt}" is not "{JSON_FORMAT}"')
+    if not isinstance(version, (int, float)) or version > JSON_VERSION:
+        raise Exception(
+            f"Workflow JSON version {version} is newer than the supported version {JSON_VERSION}"
+        )
+
+
+def _search_json_node(events, match, matches, limit):
+    """
+    Search a node (whose start_map has been consumed) for matching steps
+
+    A node's scalar fields precede its "steps", so by the time the children are
+    reached it is known whether this node matches: if so its sub-tree is
+    materialised, otherwise only the children are searched and then discarded.
+
+    Args:
+        events (iterator):      Parse events
+        match (callable):       Called with the node fields, returns True/False, or
+                                None if the fields needed are not known yet
+        matches (list):         Matching node fields including children, appended to
+        limit (int):            Stop once this many matches are found
+
+    Returns:
+        done (bool):            limit reached, the remaining events are unread
+    """
+    node = {}
+    for event, key in events:
+        if event == "end_map":
+            break
+
+        event, value = next(events)
+        if key != "steps" or event != "start_array":
+            node[key] = jsonstream.build_value(events, event, value)
+        elif match(node) is False:
+            for event, value in events:
+                if event == "end_array":
+                    break
+                if _search_json_node(events, match, matches, limit):
+                    return True
+            node["steps"] = []
+        else:
+            # Matched, or keys out of order so it cannot be decided yet
+            node["steps"] = jsonstream.build_value(events, event, value)
+
+    # The node, then any children built before they could be ruled out
+    stack = [node]
+    while stack:
+        child = stack.pop()
+        if match(child):
+            matches.append(child)
+            if len(matches) >= limit:
+                return True
+        stack.extend(reversed(child.get("steps", [])))
+    return False
+
+
+def load_workflow_json(fname, uuid=None, path=None):
+    """
+    Load workflow, or the sub-tree at a UUID/path, from JSON file
+
+    With a UUID or path the file is streamed and only the matching sub-tree is
+    built. A UUID lookup stops at the match; a path lookup reads on to make sure
+    the path is unique, as the pickle and database loaders do.
+
+    Args:
+        fname (pathlib.Path):           JSON file
+        uuid (uuid.UUID, None):         UUID of the step to load
+        path (pathlib.Path, None):      Path of the step to load
+
+    Returns:
+        step (Step, None):              Loaded step, None if not found
+    """
+    if uuid is None and path is None:
+        with open(fname, "r", encoding="utf-8") as fobj:
+            document = json.load(fobj)
+        _check_json_header(document.get("format"), document.get("version"))
+        return step_from_dict(document["workflow"])
+
+    key, target = ("uuid", uuid.hex) if uuid is not None else ("path", str(path))
+
+    def match(node):
+        return node[key] == target if key in node else None
+
+    header = {}
+    matches = []
+    events = iter(jsonstream.basic_parse(fname))
+    for event, value in events:
+        if event == "map_key" and value == "workflow":
+            # dump_workflow_json writes the header first
+            _check_json_header(header.get("format"), header.get("version"))
+            next(events)
+            _search_json_node(events, match, matches, 1 if key == "uuid" else 2)
+            break
+        elif event == "map_key":
+            header[value] = jsonstream.build_value(events, *next(events))
+
+    if len(matches) > 1:
+        raise Exception(f'More than one object with the path "{path}"')
+    return step_from_dict(matches[0]) if matches else None
+
+
 def add_steps_iteratively(wf):
+    import viz.database as database
+
     database.add_step(step=wf)
     for step in wf.steps:
         if step.type == "workflow":
@@ -283,9 +1181,11 @@ def add_steps_iteratively(wf):
 
 def main():
     """Dump tmp workflow."""
+    import viz.database as database
+
     wf = make_tmp_workflow()
     database.setup_database()
-    add_steps_iteratively(wf)
+    database.add_workflow(wf=wf)
     # print(wf.uuid)
 
 
@@ -2,8 +2,18 @@
 Table visualisation of workflow
 """
 
+import contextlib
+import datetime
+import functools
+import itertools
+import operator
+import os
+import shlex
+import subprocess
 import sys
+import weakref
 
+import rich.box
 import rich.console
 import rich.table
 
@@ -21,16 +31,49 @@ COLUMN2COLUMNTITLE = {
     "scheduler": "Scheduler",
 }
 
+# Widths of fixed-format columns; others are measured on a sample of rows
+COLUMN2WIDTH = {
+    "uuid": 32,
+    "ctime": 19,
+    "mtime": 19,
+}
+
+# Rows per printed chunk, and rows sampled for column widths, when streaming
+CHUNK_SIZE = 1000
+SAMPLE_SIZE = 1000
+
+PAGER = "less -R"
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
 
 class Table:
     """
     Show the Workflow in Table view
 
+    When streaming, rows are formatted and printed in chunks with fixed column
+    widths instead of being collected into one rich.table.Table, so the first
+    rows appear straight away and memory does not grow with the workflow.
+
     Attrs:
         wf (workflow.Workflow):         workflow.Workflow instance
+        offset (int):                   Number of rows skipped
+        limit (int):                    Maximum number of rows, None for all
+        stream (bool):                  Print rows in chunks as they are formatted
+        pager (bool):                   Pipe the streamed output through $PAGER
     """
 
-    def __init__(self, wf, columns=None, options=settings.Settings()):
+    def __init__(
+        self,
+        wf,
+        columns=None,
+        options=settings.Settings(),
+        show=True,
+        offset=0,
+        limit=None,
+        stream=False,
+        pager=False,
+    ):
         """
         Initialise table
 
@@ -38,17 +81,34 @@ class Table:
             wf (workflow.Workflow):         workflow.Workflow instance
             columns (list):                 List of column names to print
             options (settings.Settings)     Visualisation options
+            show (bool):                    Print the table straight away
+            offset (int):                   Number of rows skipped
+            limit (int):                    Maximum number of rows, None for all
+            stream (bool):                  Print rows in chunks as they are
+                                            formatted, without building the table
+            pager (bool):                   Pipe the streamed output through
+                                            $PAGER (implies stream)
 
         Returns:
             None
         """
         self.wf = wf
         self._columns = columns if columns is not None else options.columns
+        self._formatters = compile_formatters(self._columns)
         self._settings = options
+        self.offset = offset
+        self.limit = limit
+        self.stream = stream or pager
+        self.pager = pager
+        # uuid -> formatted cells
+        self._cells = {}
 
-        self.initialise_table()
-        self.build_table(self.wf.steps)
-        self.print()
+        if not self.stream:
+            self.initialise_table()
+            self.build_table()
+            self.build_summary()
+        if show:
+            self.print()
 
     def initialise_table(self):
         """
@@ -63,6 +123,40 @@ class Table:
         for column in self._columns:
             self.table.add_column(COLUMN2COLUMNTITLE[column])
 
+    def build_summary(self):
+        """
+        Add status counts, completed fraction and CPU hours as the table caption
+
+        Args:
+
+        Returns:
+            None
+        """
+        self.table.caption = self.summary()
+
+    def summary(self):
+        """
+        Status counts, completed fraction and CPU hours of the workflow
+
+        Args:
+
+        Returns:
+            summary (str):      Rich markup
+        """
+        # NumPy is only imported once the table is shown
+        import viz.columnar as columnar
+
+        summary = columnar.ColumnarWorkflow.from_workflow(self.wf).summary()
+        counts = ", ".join(
+            f"[{settings.STATUS2COLOUR.get(status, 'white')}]{count} {status}[/]"
+            for status, count in summary["counts"].items()
+        )
+        return (
+            f"{summary['tasks']} tasks: {counts} | "
+            f"{summary['completed']:.1%} completed | "
+            f"{summary['cpuhours']:.1f} CPU hours"
+        )
+
     def print(self):
         """
         Print the table
@@ -72,38 +166,337 @@ class Table:
         Returns:
             None
         """
+        if self.pager:
+            with pager_console(self._settings.colour) as console:
+                self.print_stream(console)
+            return
+
         console = rich.console.Console(color_system=self._settings.colour)
-        console.print(self.table)
+        if self.stream:
+            self.print_stream(console)
+        else:
+            console.print(self.renderable())
+
+    def column_widths(self, sample, max_width=None):
+        """
+        Fixed column widths, from the column format or a sample of rows
+
+        Args:
+            sample (list):      Formatted rows
+            max_width (int):    Console width; sampled columns are narrowed in
+                                proportion to fit, down to their title
+
+        Returns:
+            widths (list):      Width per column
+        """
+        widths = []
+        sampled = []
+        for index, column in enumerate(self._columns):
+            width = len(COLUMN2COLUMNTITLE[column])
+            if column == "status":
+                width = max(width, *(len(status) for status in steps.STATUSES))
+            elif column in COLUMN2WIDTH:
+                width = max(width, COLUMN2WIDTH[column])
+            else:
+                sampled.append(index)
+                for row in sample:
+                    for line in str(row[index]).splitlines():
+                        width = max(width, len(line))
+            widths.append(width)
+
+        # Each column is padded by one character either side, plus a separator
+        excess = sum(widths) + 3 * len(widths) - (max_width or sys.maxsize)
+        flexible = sum(widths[index] for index in sampled)
+        if excess > 0 and flexible:
+            for index in sampled:
+                title = len(COLUMN2COLUMNTITLE[self._columns[index]])
+                cut = -(-excess * widths[index] // flexible)
+                widths[index] = max(title, widths[index] - cut)
+        return widths
+
+    def chunk_table(self, widths, header=False):
+        """
+        Empty rich.Table for one chunk of streamed rows
+
+        Chunks share their column widths and have no outer edge, so consecutive
+        chunks print as one continuous table.
+
+        Args:
+            widths (list):      Width per column
+            header (bool):      Show the title and column headers
+
+        Returns:
+            table (rich.table.Table):   Table
+        """
+        table = rich.table.Table(
+            title=self.wf.name if header else None,
+            show_header=header,
+            show_edge=False,
+            box=rich.box.SIMPLE_HEAD,
+        )
+        for column, width in zip(self._columns, widths):
+            table.add_column(
+                COLUMN2COLUMNTITLE[column],
+                width=width,
+                no_wrap=column != "scheduler",
+                overflow="ellipsis",
+            )
+        return table
+
+    def print_stream(self, console, chunk_size=CHUNK_SIZE):
+        """
+        Format and print rows in chunks, then the summary
+
+        Column widths are fixed from the first SAMPLE_SIZE rows, so only one
+        chunk of formatted rows is held at a time.
+
+        Args:
+            console (rich.console.Console):     Console
+            chunk_size (int):                   Rows per chunk
+
+        Returns:
+            None
+        """
+        rows = (self.format_row(step) for step in self.iter_window())
+        sample = list(itertools.islice(rows, SAMPLE_SIZE))
+        widths = self.column_widths(sample, console.width)
+        rows = itertools.chain(sample, rows)
+        del sample
+
+        header = True
+        while chunk := list(itertools.islice(rows, chunk_size)):
+            table = self.chunk_table(widths, header=header)
+            for row in chunk:
+                table.add_row(*row)
+            console.print(table)
+            header = False
+        console.print(self.summary())
+
+    @property
+    def colour(self):
+        """
+        Colour system of the console
+
+        Returns:
+            colour (str, None):         rich colour system, None for no colour
+        """
+        return self._settings.colour
+
+    def renderable(self):
+        """
+        Renderable of the table, e.g. for rich.live.Live
+
+        Args:
+
+        Returns:
+            table (rich.table.Table):   Table
+        """
+        return self.table
+
+    def refresh(self, changed=None):
+        """
+        Rebuild the table after steps changed, only re-formatting those steps
+
+        Args:
+            changed (iterable):             Steps that changed; if None, every
+                                            step is re-formatted and the
+                                            workflow re-indexed
 
-    def build_table(self, stps):
+        Returns:
+            None
         """
-        For a given (sub)workflow, add rows to the table for each step
-        If the step is a workflow, call this function iteratively
+        # Formatters cache per-parent values, e.g. paths
+        self._formatters = compile_formatters(self._columns)
+        if changed is None:
+            self._cells = {}
+            self.wf.reindex()
+        else:
+            for step in changed:
+                self._cells.pop(step.uuid, None)
+        self.initialise_table()
+        self.build_table()
+        self.build_summary()
+
+    def iter_window(self, stps=None):
+        """
+        Steps in table order (depth first, including nested workflows),
+        restricted to the offset/limit window
 
         Args:
-            stps (list):        List of Step instances
+            stps (list):        List of Step instances, None for every step
+                                below the workflow, sliced from its index
+
+        Yields:
+            step (steps.Step):  Step
+        """
+        stop = None if self.limit is None else self.offset + self.limit
+        if stps is None:
+            # Row 0 of the index is the workflow itself
+            yield from self.wf.index.steps[1 + self.offset : None if stop is None else 1 + stop]
+            return
+        ordered = itertools.chain.from_iterable(steps.iter_steps(step) for step in stps)
+        yield from itertools.islice(ordered, self.offset, stop)
+
+    def build_table(self, stps=None):
+        """
+        For a given (sub)workflow, add rows to the table for each step,
+        including the steps of nested workflows
+
+        Args:
+            stps (list):        List of Step instances, None for the workflow's
 
         Returns:
             None
         """
-        for step in stps:
-            rows = []
-            for column in self._columns:
-                if column == "status":
-                    rows.append(f"[{settings.STATUS2COLOUR[step.status]}]{step.status}")
-                elif column == "uuid":
-                    rows.append(step.uuid.hex)
-                elif column in ("ctime", "mtime"):
-                    rows.append(getattr(step, column).strftime("%Y-%m-%d %H:%M:%S"))
-                elif column == 'scheduler':
-                    rows.append(step.scheduler.table if step.scheduler else None)
-                else:
-                    rows.append(str(getattr(step, column)))
+        for step in self.iter_window(stps):
+            rows = self._cells.get(step.uuid)
+            if rows is None:
+                rows = self._cells[step.uuid] = self.format_row(step)
 
             self.table.add_row(*rows)
 
-            if isinstance(step, steps.Workflow):
-                self.build_table(step.steps)
+    def format_row(self, step):
+        """
+        Format the cells of a step's row
+
+        Args:
+            step (steps.Step):  Step
+
+        Returns:
+            rows (list):        Cell per column
+        """
+        return [formatter(step) for formatter in self._formatters]
+
+
+def _status_formatter():
+    """
+    Status cell formatter, with the markup of each status built once
+
+    Returns:
+        formatter (callable):   Step to cell
+    """
+    markup = {}
+
+    def status(step):
+        value = step.status
+        cell = markup.get(value)
+        if cell is None:
+            cell = markup[value] = f"[{settings.STATUS2COLOUR.get(value, 'white')}]{value}"
+        return cell
+
+    return status
+
+
+def _time_formatter(column):
+    """
+    ctime/mtime cell formatter
+
+    Times are stored as integer microseconds, so cells are cached per whole
+    second and strftime only runs once for each distinct second.
+
+    Args:
+        column (str):           "ctime" or "mtime"
+
+    Returns:
+        formatter (callable):   Step to cell
+    """
+    micros = operator.attrgetter(f"{column}_micros")
+    value = operator.attrgetter(column)
+
+    @functools.lru_cache(maxsize=4096)
+    def second(seconds):
+        return (steps._EPOCH + datetime.timedelta(seconds=seconds)).strftime(TIME_FORMAT)
+
+    def time(step):
+        stored = micros(step)
+        if stored is not None:
+            return second(stored // 1_000_000)
+        stored = value(step)
+        return stored.strftime(TIME_FORMAT) if stored is not None else ""
+
+    return time
+
+
+def _path_formatter():
+    """
+    Path cell formatter, reusing the formatted path of each parent
+
+    Parents are held weakly, so a dropped workflow never hands its prefix to a
+    new one; Table.refresh compiles a fresh formatter for moved workflows.
+
+    Returns:
+        formatter (callable):   Step to cell
+    """
+    parents = weakref.WeakKeyDictionary()
+
+    def path(step):
+        parent = step.parent
+        segment = step.path_segment
+        if parent is None or segment is None:
+            return str(step.path)
+        prefix = parents.get(parent)
+        if prefix is None:
+            prefix = parents[parent] = str(parent.path)
+        return f"{prefix}{os.sep}{segment}"
+
+    return path
+
+
+def compile_formatters(columns):
+    """
+    Resolve each column to its cell formatter once, instead of dispatching on
+    the column name for every cell
+
+    Args:
+        columns (list):         Column names
+
+    Returns:
+        formatters (list):      Callable per column, step to cell
+    """
+    formatters = []
+    for column in columns:
+        if column == "name":
+            formatters.append(operator.attrgetter("name"))
+        elif column == "status":
+            formatters.append(_status_formatter())
+        elif column == "path":
+            formatters.append(_path_formatter())
+        elif column == "uuid":
+            formatters.append(lambda step: step.uuid.hex)
+        elif column in ("ctime", "mtime"):
+            formatters.append(_time_formatter(column))
+        elif column == "scheduler":
+            formatters.append(lambda step: step.scheduler.table if step.scheduler else None)
+        else:
+            formatters.append(lambda step, column=column: str(getattr(step, column)))
+    return formatters
+
+
+@contextlib.contextmanager
+def pager_console(colour="standard"):
+    """
+    Console writing into $PAGER (default "less -R") as output is produced
+
+    Args:
+        colour (str):       Colour system
+
+    Yields:
+        console (rich.console.Console):     Console
+    """
+    command = shlex.split(os.environ.get("PAGER") or PAGER)
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, text=True)
+    console = rich.console.Console(
+        file=process.stdin, color_system=colour, force_terminal=True
+    )
+    try:
+        yield console
+    except BrokenPipeError:
+        # The pager was quit before all rows were written
+        pass
+    finally:
+        with contextlib.suppress(BrokenPipeError):
+            process.stdin.close()
+        process.wait()
 
 
 def main(argv=sys.argv[1:]):
@@ -114,9 +507,34 @@ def main(argv=sys.argv[1:]):
     Returns:
         None
     """
-    args = settings.get_args(argv)
+    args = settings.get_args(argv, "table")
     wf = settings.load_wf(args)
-    Table(wf)
+    if args.format != "rich":
+        import viz.export as export
+
+        export.export(
+            wf,
+            args.format,
+            output=args.output,
+            columns=settings.Settings().columns,
+            offset=args.offset,
+            limit=args.limit,
+        )
+        return
+
+    options = dict(
+        offset=args.offset,
+        limit=args.limit,
+        stream=args.stream,
+        pager=args.pager,
+    )
+    if args.watch:
+        import viz.watch as watch
+
+        options.update(stream=False, pager=False)
+        watch.watch(Table(wf, show=False, **options), args)
+    else:
+        Table(wf, **options)
 
 
 if __name__ == "__main__":
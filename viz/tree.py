@@ -3,39 +3,119 @@ Tree visualisation of workflow
 """
 
 import sys
+
 import rich
-import rich.layout
+import rich.table
 import rich.tree
 
 import viz.settings as settings
 import viz.steps as steps
 
 
+def _numpy():
+    """
+    NumPy, imported on first use; plain trees never need it
+
+    Returns:
+        numpy (module):     NumPy
+    """
+    import numpy
+
+    return numpy
+
+
 class Tree:
     """
     Show the Workflow in Tree view
 
+    Rendered branches are cached per step and keyed on (status, mtime), so
+    refresh() only touches the steps that changed rather than the whole tree.
+
+    With a depth limit, collapsing or a window the tree is instead built from a
+    columnar copy of the workflow, and only the visible nodes are turned into
+    rich renderables.
+
     Attrs:
         wf (workflow.Workflow):         workflow.Workflow instance
         tree (rich.tree.Tree):          rich.tree.Tree instance
+        max_depth (int):                Deepest level shown, None for all
+        collapse_completed (bool):      Show completed sub-workflows as one line
+        offset (int):                   First visible node shown
+        limit (int):                    Number of nodes shown, None for all
+        columns (ColumnarWorkflow):     Columns of the workflow when windowed
+        nvisible (int):                 Number of visible nodes when windowed
     """
 
-    def __init__(self, wf, options=settings.Settings()):
+    def __init__(
+        self,
+        wf,
+        options=settings.Settings(),
+        show=True,
+        max_depth=None,
+        collapse_completed=False,
+        offset=0,
+        limit=None,
+    ):
         """
         Initialise Tree
 
         Args:
             wf (workflow.Workflow):         workflow.Workflow instance
+            options (settings.Settings)     Visualisation options
+            show (bool):                    Print the tree straight away
+            max_depth (int):                Deepest level shown, None for all
+            collapse_completed (bool):      Show completed sub-workflows as one
+                                            line with their counts
+            offset (int):                   First visible node shown
+            limit (int):                    Number of nodes shown, None for all
 
         Returns:
             None
         """
         self.wf = wf
         self.settings = options
+        self.max_depth = max_depth
+        self.collapse_completed = collapse_completed
+        self.offset = offset
+        self.limit = limit
+        self.columns = None
+        self.nvisible = None
+        # uuid -> (key, branch, child uuids)
+        self._branches = {}
 
         self.initialise_tree()
-        self.tree = self.build_tree(self.wf, self.tree)
-        self.print(self.tree)
+        if self.windowed:
+            self.build_columns()
+            self.build_window()
+        else:
+            self.tree = self.build_tree(self.wf, self.tree)
+        if show:
+            self.print(self.tree)
+
+    @property
+    def colour(self):
+        """
+        Colour system of the console
+
+        Returns:
+            colour (str, None):             rich colour system, None for no colour
+        """
+        return self.settings.colour
+
+    @property
+    def windowed(self):
+        """
+        Whether only part of the tree is rendered
+
+        Returns:
+            windowed (bool):                Depth limit, collapsing or window set
+        """
+        return (
+            self.max_depth is not None
+            or self.collapse_completed
+            or bool(self.offset)
+            or self.limit is not None
+        )
 
     def initialise_tree(self):
         """
@@ -48,6 +128,19 @@ class Tree:
         """
         self.tree = rich.tree.Tree(self.wf.name)
 
+    @staticmethod
+    def label(step):
+        """
+        Rendered label of a step
+
+        Args:
+            step (steps.Step):              Step
+
+        Returns:
+            label (str):                    Rich markup
+        """
+        return f"[{settings.STATUS2COLOUR.get(step.status, 'white')}]{step.name}"
+
     def build_tree(self, wf, tree):
         """
         Iteratively build the workflow tree
@@ -60,12 +153,213 @@ class Tree:
             tree (rich.tree.Tree):          updated Tree instance
 
         """
-        for step in wf.steps:
-            branch = tree.add(f"[{settings.STATUS2COLOUR[step.status]}]{step.name}")
-            if isinstance(step, steps.Workflow):
-                self.build_tree(step, branch)
+        tree.children = [self.build_branch(step) for step in wf.steps]
         return tree
-    
+
+    def build_branch(self, step):
+        """
+        Rendered branch of a step, reused from the cache if it is unchanged
+
+        Args:
+            step (steps.Step):              Step
+
+        Returns:
+            branch (rich.tree.Tree):        Branch, with any children
+        """
+        key = (step.status, step.mtime)
+        children = tuple(child.uuid for child in step.steps) if isinstance(step, steps.Workflow) else ()
+        cached = self._branches.get(step.uuid)
+        if cached is not None and cached[0] == key and cached[2] == children:
+            # Descendants are updated in place, so this branch stays valid
+            if isinstance(step, steps.Workflow):
+                for child in step.steps:
+                    self.build_branch(child)
+            return cached[1]
+
+        branch = cached[1] if cached is not None else rich.tree.Tree("")
+        branch.label = self.label(step)
+        if isinstance(step, steps.Workflow):
+            self.build_tree(step, branch)
+        self._branches[step.uuid] = (key, branch, children)
+        return branch
+
+    def refresh(self, changed=None):
+        """
+        Bring the rendered tree up to date after steps changed
+
+        Branches are updated in place, so the ancestors of a changed step keep
+        their cached renderables.
+
+        Args:
+            changed (iterable):             Steps that changed; if None, every
+                                            step's key is compared instead
+
+        Returns:
+            None
+        """
+        if self.windowed:
+            self.refresh_window(changed)
+            return
+
+        if changed is None:
+            self.wf.reindex()
+            self.build_tree(self.wf, self.tree)
+            return
+
+        for step in changed:
+            if step is self.wf:
+                self.build_tree(self.wf, self.tree)
+                continue
+            cached = self._branches.get(step.uuid)
+            if cached is None:
+                # Not rendered before, so the structure changed: compare everything
+                self.build_tree(self.wf, self.tree)
+                return
+            _, branch, children = cached
+            branch.label = self.label(step)
+            if isinstance(step, steps.Workflow):
+                children = tuple(child.uuid for child in step.steps)
+                if children != cached[2]:
+                    self.build_tree(step, branch)
+            self._branches[step.uuid] = ((step.status, step.mtime), branch, children)
+
+    def build_columns(self):
+        """
+        Take a columnar copy of the workflow for windowed rendering
+
+        Args:
+
+        Returns:
+            None
+        """
+        # NumPy is only imported for windowed rendering
+        import viz.columnar as columnar
+
+        self.columns = columnar.ColumnarWorkflow.from_workflow(self.wf)
+
+    def _subtree_sums(self, values):
+        """
+        Sum of values over every row's sub-tree, from one prefix sum
+
+        Args:
+            values (np.ndarray):            Value per row
+
+        Returns:
+            sums (np.ndarray):              Sum per row
+        """
+        np = _numpy()
+        cols = self.columns
+        cumsum = np.concatenate(([0], np.cumsum(values)))
+        rows = np.arange(len(cols))
+        return cumsum[rows + cols.size] - cumsum[rows]
+
+    def visible_rows(self):
+        """
+        Rows shown after depth limiting and collapsing, before windowing
+
+        Args:
+
+        Returns:
+            visible (np.ndarray):           Visible rows, in order, without the root
+            folded (np.ndarray):            bool, row is shown as a summary line
+        """
+        np = _numpy()
+        cols = self.columns
+        folded = np.zeros(len(cols), dtype=bool)
+        if self.max_depth is not None:
+            folded |= cols.is_workflow & (cols.depth >= self.max_depth)
+        if self.collapse_completed:
+            tasks = ~cols.is_workflow
+            ntasks = self._subtree_sums(tasks)
+            completed = self._subtree_sums(tasks & (cols.status == steps.status_code("completed")))
+            folded |= cols.is_workflow & (ntasks > 0) & (completed == ntasks)
+        folded[0] = False
+
+        # Hide everything strictly inside a folded sub-tree
+        rows = np.flatnonzero(folded)
+        diff = np.zeros(len(cols) + 1, dtype=np.int64)
+        np.add.at(diff, rows + 1, 1)
+        np.add.at(diff, rows + cols.size[rows], -1)
+        hidden = np.cumsum(diff[:-1]) > 0
+        return np.flatnonzero(~hidden)[1:], folded
+
+    def row_label(self, row, folded=False):
+        """
+        Rendered label of a row of the columnar copy
+
+        Args:
+            row (int):                      Row
+            folded (bool):                  Summarise the hidden sub-tree
+
+        Returns:
+            label (str):                    Rich markup
+        """
+        cols = self.columns
+        status = steps.STATUSES[cols.status[row]]
+        label = f"[{settings.STATUS2COLOUR.get(status, 'white')}]{cols.names[row]}"
+        if folded:
+            counts = ", ".join(
+                f"{count} {status}" for status, count in cols.status_counts(row).items()
+            )
+            label += f" [dim]({counts or 'empty'})"
+        return label
+
+    def build_window(self):
+        """
+        Build the rich tree for the visible window only
+
+        Ancestors of the first node in the window are added for context.
+
+        Args:
+
+        Returns:
+            None
+        """
+        cols = self.columns
+        visible, folded = self.visible_rows()
+        self.nvisible = len(visible)
+        stop = None if self.limit is None else self.offset + self.limit
+        window = visible[self.offset : stop]
+
+        nodes = {0: self.tree}
+
+        def attach(row):
+            parent = int(cols.parent[row])
+            if parent not in nodes:
+                attach(parent)
+            nodes[row] = nodes[parent].add(self.row_label(row, folded[row]))
+
+        for row in window:
+            attach(int(row))
+
+    def refresh_window(self, changed=None):
+        """
+        Patch changed statuses into the columnar copy and rebuild the window
+
+        Args:
+            changed (iterable):             Steps that changed; if None, the
+                                            workflow is re-indexed and the
+                                            columnar copy rebuilt
+
+        Returns:
+            None
+        """
+        if changed is not None:
+            # Columnar rows are in the same pre-order as the workflow index
+            rows = self.wf.index.rows
+            for step in changed:
+                row = rows.get(step.uuid)
+                if row is None:
+                    # Structure changed
+                    changed = None
+                    break
+                self.columns.status[row] = steps.status_code(step.status)
+        if changed is None:
+            self.wf.reindex()
+            self.build_columns()
+        self.initialise_tree()
+        self.build_window()
+
     def build_legend(self):
         """
         Add legend describing the colour/bold info
@@ -81,7 +375,25 @@ class Tree:
         table.add_row(f"[bold]Format[/bold]")
         table.add_row(f"[italic]italic[/italic]", "Parallel")
         table.add_row(f"standard", "Serial")
-        
+
+        if self.columns is not None:
+            summary = self.columns.summary()
+        else:
+            import viz.columnar as columnar
+
+            summary = columnar.ColumnarWorkflow.from_workflow(self.wf).summary()
+        table.add_row(f"")
+        table.add_row(f"[bold]Summary[/bold]")
+        table.add_row("Tasks", str(summary["tasks"]))
+        for status, count in summary["counts"].items():
+            colour = settings.STATUS2COLOUR.get(status, "white")
+            table.add_row(f"[{colour}]{status}[/{colour}]", str(count))
+        table.add_row("Completed", f"{summary['completed']:.1%}")
+        table.add_row("CPU hours", f"{summary['cpuhours']:.1f}")
+        if self.nvisible is not None:
+            stop = self.nvisible if self.limit is None else min(self.offset + self.limit, self.nvisible)
+            table.add_row("Showing", f"{min(self.offset + 1, stop)}-{stop} of {self.nvisible}")
+
         return table
 
     def print(self, wf):
@@ -94,20 +406,26 @@ class Tree:
         Returns:
             None
         """
-        layout = rich.layout.Layout()
+        console = rich.console.Console(color_system=self.settings.colour)
+        console.print(self.renderable())
 
-        layout.split_row(
-            rich.layout.Layout(name="tree"),
-            rich.layout.Layout(name="legend"),
-        )
+    def renderable(self):
+        """
+        Renderable of the tree and legend, e.g. for rich.live.Live
 
-        layout["tree"].ratio = 2
+        A grid rather than a Layout, so the tree is never cropped to the
+        terminal height.
 
-        layout["tree"].update(self.tree)
-        layout["legend"].update(self.build_legend())
+        Args:
 
-        console = rich.console.Console(color_system=self.settings.colour)
-        console.print(layout, crop=True)
+        Returns:
+            grid (rich.table.Table):        Tree and legend side by side
+        """
+        grid = rich.table.Table.grid(expand=True)
+        grid.add_column(ratio=2)
+        grid.add_column(ratio=1)
+        grid.add_row(self.tree, self.build_legend())
+        return grid
 
 
 def main(argv=sys.argv[1:]):
@@ -118,9 +436,20 @@ def main(argv=sys.argv[1:]):
     Returns:
         None
     """
-    args = settings.get_args(argv)
+    args = settings.get_args(argv, "tree")
     wf = settings.load_wf(args)
-    Tree(wf)
+    options = dict(
+        max_depth=args.max_depth,
+        collapse_completed=args.collapse_completed,
+        offset=args.offset,
+        limit=args.limit,
+    )
+    if args.watch:
+        import viz.watch as watch
+
+        watch.watch(Tree(wf, show=False, **options), args)
+    else:
+        Tree(wf, **options)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,105 @@
+"""
+Live-updating views driven by polling the database for changed steps
+"""
+
+import time
+
+import rich.console
+import rich.live
+
+import viz.database as database
+import viz.rollup as rollup
+import viz.steps as steps
+
+
+def apply_rows(wf, rows, roll):
+    """
+    Patch the steps of a workflow with polled rows
+
+    Task statuses go through the roll-up, so their ancestors follow; the
+    stored status of a workflow is ignored, as it is derived from its tasks.
+
+    Args:
+        wf (steps.Workflow):        Workflow shown
+        rows (list):                Row mappings of id and VOLATILE_COLUMNS
+        roll (rollup.StatusRollup): Roll-up of wf
+
+    Returns:
+        changed (list):             Steps whose attributes changed
+    """
+    changed = {}
+    for row in rows:
+        # Rows outside the shown (sub)workflow are ignored
+        step = wf.index.find(uuid=row["id"])
+        if step is None:
+            continue
+        status = row["status"]
+        if steps.apply_volatile(step, {**row, "status": step.status}):
+            changed[step.uuid] = step
+        if not isinstance(step, steps.Workflow):
+            for stp in roll.update(step, status):
+                changed[stp.uuid] = stp
+    return list(changed.values())
+
+
+def last_modified(wf):
+    """
+    Latest mtime of the steps in a workflow
+
+    Args:
+        wf (steps.Workflow):        Workflow
+
+    Returns:
+        mtime (datetime.datetime):  Latest mtime, None if no step has one
+    """
+    mtimes = [step.mtime for step in wf.index.by_uuid.values() if step.mtime is not None]
+    return max(mtimes, default=None)
+
+
+def watch(view, args, max_iterations=None, console=None):
+    """
+    Show a view and keep it up to date until interrupted
+
+    Each poll only fetches rows modified since the last one seen, patches them
+    into the in-memory workflow and refreshes just those steps in the view.
+
+    Args:
+        view (Tree, Table):             View with wf, colour, refresh() and
+                                        renderable()
+        args (argparse.Namespace):      Arguments, with source, fname and refresh
+        max_iterations (int):           Stop after this many polls (for testing)
+        console (rich.console.Console): Console to render to, by default one
+                                        with the view's colour system
+
+    Returns:
+        None
+    """
+    if args.source != "db":
+        raise Exception("--watch is only supported with a database source")
+    wf = view.wf
+    if not isinstance(wf, steps.Workflow):
+        raise Exception(f'--watch needs a workflow, "{wf.name}" is a {wf.type or "step"}')
+    db_path = f"{database.RDBMS}:///{args.fname}"
+    if console is None:
+        console = rich.console.Console(color_system=view.colour)
+
+    # Stored workflow statuses may lag their tasks; the roll-up brings them up to
+    # date on construction, so the whole view is refreshed once
+    roll = rollup.StatusRollup(wf)
+    view.refresh(None)
+    since = last_modified(wf)
+    iteration = 0
+    with rich.live.Live(view.renderable(), console=console, auto_refresh=False) as live:
+        try:
+            while max_iterations is None or iteration < max_iterations:
+                time.sleep(args.refresh)
+                iteration += 1
+                rows = database.query_steps_modified_since(db_path, since)
+                if rows:
+                    since = max(since, rows[-1]["mtime"]) if since else rows[-1]["mtime"]
+                changed = apply_rows(wf, rows, roll)
+                if changed:
+                    view.refresh(changed)
+                    live.update(view.renderable(), refresh=True)
+        except KeyboardInterrupt:
+            pass